@@ -0,0 +1,3 @@
+"""
+Microbenchmarks for the host's own message dispatch overhead
+"""
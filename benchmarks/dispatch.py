@@ -0,0 +1,184 @@
+"""
+Benchmarks process._process_messages for each dispatch mode and worker count.
+
+Usage (from the project root):
+
+    python -m benchmarks.dispatch --messages 2000 --threads 1,4,16
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import process  # pylint: disable=C0413
+from factories import Config, get_service_processor  # pylint: disable=C0413
+from benchmarks.fake_adapter import FakeMessageAdapter  # pylint: disable=C0413
+
+PROCESSORS = {
+    "noop": "NoopProcessor",
+    "sleep": "SleepProcessor",
+    "spin": "SpinProcessor",
+}
+MODES = ["inline", "thread", "process"]
+PROJECT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# How often the RSS of a scenario's processes is sampled, in seconds
+RSS_SAMPLE_INTERVAL = 0.02
+
+
+def _max_rss_mb() -> float:
+    """Peak RSS of this process plus that of its largest exited child, in MB"""
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss +
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+
+
+def _tree_rss_mb(pid: int) -> float:
+    """Current RSS of pid and all its descendants in MB, 0 without Linux's /proc"""
+    total_kb, pids = 0, [pid]
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/status", encoding="UTF-8") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children", encoding="UTF-8") as children:
+                    pids.extend(int(child) for child in children.read().split())
+        except OSError:
+            # Exited meanwhile, or no /proc
+            continue
+    return total_kb / 1024
+
+
+def _percentile(values: list, percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _make_config(processor_type: str, mode: str, num_threads: int,
+                 sleep_ms: float, spin_iterations: int) -> Config:
+    config = Config()
+    config.env_vars = {
+        "PROCESSOR_MODULE": "benchmarks.processors",
+        "PROCESSOR_TYPE": processor_type,
+        "QUEUE_NAME_PREFIX": "bench_",
+        f"{processor_type}_QUEUE_NAME": "queue",
+    }
+    config.messaging_type = "RabbitMqConnection"
+    config.processor_type = processor_type
+    config.execution_pool = mode
+    config.num_threads = num_threads
+    if processor_type != "NoopProcessor":
+        config.service_constructor_params = (sleep_ms, spin_iterations)
+    return config
+
+
+def run_benchmark(processor: str, mode: str, num_threads: int, num_messages: int,
+                  sleep_ms: float = 5, spin_iterations: int = 20000) -> dict:
+    """Runs num_messages through _process_messages and returns its measurements"""
+    config = _make_config(PROCESSORS[processor], mode, num_threads, sleep_ms, spin_iterations)
+    service_processor = None if mode == "process" else get_service_processor(config)
+    adapter = FakeMessageAdapter(num_messages)
+
+    with patch.object(process, "get_message_adapter", return_value=adapter):
+        started_at = time.perf_counter()
+        process._process_messages(config, service_processor)  # pylint: disable=W0212
+        elapsed = time.perf_counter() - started_at
+
+    return {
+        "processor": processor,
+        "mode": mode,
+        "threads": num_threads,
+        "messages": len(adapter.latencies),
+        "msgs_per_sec": len(adapter.latencies) / elapsed,
+        "p50_ms": _percentile(adapter.latencies, 50) * 1000,
+        "p99_ms": _percentile(adapter.latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(adapter.latencies) * 1000,
+    }
+
+
+def run_isolated(processor: str, mode: str, num_threads: int, num_messages: int,
+                 sleep_ms: float = 5, spin_iterations: int = 20000) -> dict:
+    """
+    Runs run_benchmark in a fresh interpreter, so earlier scenarios don't
+    count towards its memory. rss_mb is the peak RSS of that interpreter and
+    its worker processes together.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        result_path = os.path.join(directory, "result.json")
+        child = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.dispatch",
+             "--scenario", f"{processor},{mode},{num_threads}", "--result-file", result_path,
+             "--messages", str(num_messages), "--sleep-ms", str(sleep_ms),
+             "--spin-iterations", str(spin_iterations)],
+            cwd=PROJECT_ROOT)
+        peak_rss_mb = 0.0
+        while child.poll() is None:
+            peak_rss_mb = max(peak_rss_mb, _tree_rss_mb(child.pid))
+            time.sleep(RSS_SAMPLE_INTERVAL)
+        if child.returncode != 0:
+            raise RuntimeError(f"Benchmark {processor} {mode} {num_threads} exited with "
+                               f"{child.returncode}")
+        with open(result_path, encoding="UTF-8") as result_file:
+            result = json.load(result_file)
+    # Without /proc, fall back to what the interpreter measured of itself
+    result["rss_mb"] = max(peak_rss_mb, result["rss_mb"])
+    return result
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--processors", default=",".join(PROCESSORS))
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--threads", default="1,4,16")
+    parser.add_argument("--sleep-ms", type=float, default=5)
+    parser.add_argument("--spin-iterations", type=int, default=20000)
+    # Used by run_isolated to run one processor,mode,threads scenario
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def _run_scenario(args):
+    processor, mode, num_threads = args.scenario.split(",")
+    result = run_benchmark(processor, mode, int(num_threads), args.messages,
+                           args.sleep_ms, args.spin_iterations)
+    result["rss_mb"] = _max_rss_mb()
+    with open(args.result_file, "w", encoding="UTF-8") as result_file:
+        json.dump(result, result_file)
+
+
+def main(argv=None):
+    """Runs every requested scenario and prints a result table"""
+    args = _parse_args(argv)
+    if args.scenario:
+        _run_scenario(args)
+        return
+    thread_counts = [int(value) for value in args.threads.split(",")]
+    header = (f"{'processor':<10}{'mode':<9}{'threads':>8}{'msgs/s':>12}"
+              f"{'p50 ms':>10}{'p99 ms':>10}{'rss MB':>9}")
+    print(header)
+    print("-" * len(header))
+    for processor in args.processors.split(","):
+        for mode in args.modes.split(","):
+            # Inline dispatch always runs on the consumer thread
+            for num_threads in ([1] if mode == "inline" else thread_counts):
+                result = run_isolated(processor, mode, num_threads, args.messages,
+                                      args.sleep_ms, args.spin_iterations)
+                print(f"{result['processor']:<10}{result['mode']:<9}{result['threads']:>8}"
+                      f"{result['msgs_per_sec']:>12.1f}{result['p50_ms']:>10.3f}"
+                      f"{result['p99_ms']:>10.3f}{result['rss_mb']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
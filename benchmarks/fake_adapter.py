@@ -0,0 +1,58 @@
+"""
+In-memory message adapter that records per-message latency
+"""
+import threading
+import time
+
+from rococo.messaging.base import MessageAdapter
+from adapters import Delivery, InFlightCounter
+
+
+class FakeMessageAdapter(MessageAdapter):
+    """
+    Serves a fixed number of preloaded messages and returns once every one
+    of them has been settled. Latency is measured from the moment a message
+    is handed to the host until it is acked.
+    """
+
+    def __init__(self, num_messages: int):
+        super().__init__()
+        self.num_messages = num_messages
+        self.latencies = []
+        self._latencies_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def send_message(self, queue_name: str, message: dict):
+        raise NotImplementedError("FakeMessageAdapter only serves preloaded messages")
+
+    def _record(self, started_at: float):
+        with self._latencies_lock:
+            self.latencies.append(time.perf_counter() - started_at)
+
+    def consume_messages(self, queue_name: str, callback_function: callable = None):
+        for index in range(self.num_messages):
+            started_at = time.perf_counter()
+            callback_function({"index": index})
+            self._record(started_at)
+
+    def consume_deliveries(self, queue_name: str, on_delivery, prefetch_count: int = 1,
+                           **_consume_params):
+        """Hands out deliveries while keeping at most prefetch_count unsettled"""
+        in_flight = InFlightCounter()
+        for index in range(self.num_messages):
+            in_flight.wait_below(prefetch_count)
+            started_at = time.perf_counter()
+
+            def _on_settled(*_args, started_at=started_at):
+                self._record(started_at)
+                in_flight.decrement()
+
+            in_flight.increment()
+            on_delivery(Delivery({"index": index}, on_ack=_on_settled, on_nack=_on_settled,
+                                 queue_name=queue_name))
+        in_flight.wait_below(1)
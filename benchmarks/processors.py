@@ -0,0 +1,38 @@
+"""
+Synthetic service processors used by the dispatch benchmarks
+"""
+import time
+
+from rococo.messaging import BaseServiceProcessor
+
+
+class NoopProcessor(BaseServiceProcessor):  # pylint: disable=R0903
+    """Processor that does nothing, measuring pure host overhead"""
+
+    def process(self, message):
+        return None
+
+
+class SleepProcessor(BaseServiceProcessor):  # pylint: disable=R0903
+    """Processor that simulates an I/O-bound call by sleeping"""
+
+    def __init__(self, sleep_ms: float = 5, _spin_iterations: int = 0):
+        super().__init__()
+        self.sleep_seconds = sleep_ms / 1000
+
+    def process(self, message):
+        time.sleep(self.sleep_seconds)
+
+
+class SpinProcessor(BaseServiceProcessor):  # pylint: disable=R0903
+    """Processor that simulates CPU-bound work by spinning in pure Python"""
+
+    def __init__(self, _sleep_ms: float = 0, spin_iterations: int = 20000):
+        super().__init__()
+        self.spin_iterations = spin_iterations
+
+    def process(self, message):
+        total = 0
+        for value in range(self.spin_iterations):
+            total += value * value
+        return total
@@ -0,0 +1,21 @@
+"""
+Host message adapters that expose deliveries with explicit ack/nack
+
+The adapters are imported on first use, so a host only loads the client
+library of the broker it talks to.
+"""
+import importlib
+
+from .delivery import Delivery, InFlightCounter, drain, consume_in_threads
+
+_ADAPTER_MODULES = {
+    "HostRabbitMqConnection": ".rabbitmq",
+    "HostSqsConnection": ".sqs",
+    "LocalQueueConnection": ".local_queue",
+}
+
+
+def __getattr__(name):
+    if name in _ADAPTER_MODULES:
+        return getattr(importlib.import_module(_ADAPTER_MODULES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
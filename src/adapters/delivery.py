@@ -0,0 +1,159 @@
+"""
+Broker-neutral view of a received message
+"""
+import threading
+import time
+from typing import Callable, List, Tuple
+
+from logger import Logger
+
+logger = Logger().get_logger()
+
+
+class Delivery:
+    """
+    A message received from a queue that must be settled exactly once,
+    either with ack(), nack(), retry() or dead_letter(). Settling is
+    thread-safe, so a delivery can be handed to a worker thread and settled
+    there. attempt counts deliveries of the message, starting at 1, as far as
+    the broker can tell.
+    """
+
+    def __init__(self, body, on_ack, on_nack, queue_name=None, message_id=None,
+                 redelivered=False, attempt=1, on_retry=None, on_dead_letter=None):
+        self.body = body
+        self.queue_name = queue_name
+        self.message_id = message_id
+        self.redelivered = redelivered
+        self.attempt = attempt
+        self.received_at = time.monotonic()
+        self._on_ack = on_ack
+        self._on_nack = on_nack
+        self._on_retry = on_retry
+        self._on_dead_letter = on_dead_letter
+        self._settled = False
+        self._lock = threading.Lock()
+
+    @property
+    def settled(self) -> bool:
+        """Whether ack() or nack() has already been called"""
+        return self._settled
+
+    def _settle(self) -> bool:
+        with self._lock:
+            if self._settled:
+                return False
+            self._settled = True
+            return True
+
+    def ack(self):
+        """Acknowledges the message so the broker drops it"""
+        if self._settle():
+            self._on_ack()
+
+    def nack(self, requeue: bool = True):
+        """Rejects the message, returning it to the queue if requeue is set"""
+        if self._settle():
+            self._on_nack(requeue)
+
+    def retry(self, delay: float):
+        """
+        Returns the message to the queue to be delivered again after delay
+        seconds, or right away when the adapter can't delay it.
+        """
+        if self._settle():
+            if self._on_retry is None:
+                self._on_nack(True)
+            else:
+                self._on_retry(delay)
+
+    def dead_letter(self, queue_name: str):
+        """Moves the message to queue_name, or drops it when the adapter can't"""
+        if self._settle():
+            if self._on_dead_letter is None:
+                logger.error("Dropping message %s, dead-lettering isn't supported",
+                             self.message_id)
+                self._on_nack(False)
+            else:
+                self._on_dead_letter(queue_name)
+
+
+class InFlightCounter:
+    """Thread-safe count of deliveries handed out but not yet settled"""
+
+    def __init__(self):
+        self._count = 0
+        self._condition = threading.Condition()
+
+    @property
+    def value(self) -> int:
+        """Current number of unsettled deliveries"""
+        return self._count
+
+    def increment(self):
+        """Records a new unsettled delivery"""
+        with self._condition:
+            self._count += 1
+
+    def decrement(self):
+        """Records a settled delivery and wakes up waiters"""
+        with self._condition:
+            self._count -= 1
+            self._condition.notify_all()
+
+    def wait_below(self, limit: int, timeout: float = None) -> bool:
+        """Blocks until fewer than limit deliveries are in flight"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._count < limit, timeout)
+
+
+def drain(in_flight: InFlightCounter, shutdown) -> bool:
+    """Waits for in-flight deliveries to settle until the shutdown grace period ends"""
+    logger.info("Stopped consuming, waiting for %s in-flight messages...", in_flight.value)
+    if in_flight.wait_below(1, timeout=shutdown.remaining()):
+        return True
+    logger.warning("%s messages still in flight after the grace period will be redelivered",
+                   in_flight.value)
+    return False
+
+
+def consume_in_threads(consume: Callable, subscriptions: List[Tuple], **consume_params):
+    """
+    Runs consume(queue_name, on_delivery, prefetch_count, **consume_params) for
+    every subscription on its own thread and returns once all of them have.
+    consume may also be a list with one callable per subscription. When one
+    of them raises, the shutdown coordinator in consume_params, if any, stops
+    the others, and the exception is raised again so the host exits rather
+    than go on without consuming that queue.
+    """
+    consumers = consume if isinstance(consume, list) else [consume] * len(subscriptions)
+    errors = []
+    finished = threading.Semaphore(0)
+
+    def _consume(consumer, *subscription):
+        try:
+            consumer(*subscription, **consume_params)
+        except Exception as e:  # pylint: disable=W0718
+            logger.exception("Stopped consuming %s", subscription[0])
+            errors.append(e)
+        finally:
+            finished.release()
+
+    threads = [
+        threading.Thread(target=_consume, args=(consumer, *subscription),
+                         name=f"consumer-{subscription[0]}", daemon=True)
+        for consumer, subscription in zip(consumers, subscriptions)
+    ]
+    for thread in threads:
+        thread.start()
+    for _ in threads:
+        finished.acquire()
+        if errors:
+            break
+    if errors:
+        shutdown = consume_params.get("shutdown")
+        if shutdown is not None:
+            shutdown.request()
+            for thread in threads:
+                thread.join(shutdown.remaining())
+        raise errors[0]
@@ -0,0 +1,372 @@
+"""
+Local loopback message adapter for running processors without a broker
+"""
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Optional
+
+from dotenv import dotenv_values
+from logger import Logger
+from .delivery import Delivery, InFlightCounter, drain, consume_in_threads
+
+logger = Logger().get_logger()
+
+_HOSTNAME = socket.gethostname()
+# Tells this process from an earlier one with the same PID, e.g. PID 1 in a restarted container
+_START_ID = uuid.uuid4().hex[:8]
+
+
+class MemoryQueue:
+    """In-process queue with unacked tracking and redelivery"""
+
+    def __init__(self):
+        self._ready = deque()
+        self._unacked = {}
+        self._attempts = {}
+        self._ids = itertools.count(1)
+        self._condition = threading.Condition()
+
+    def put(self, body: str):
+        """Appends a message body to the queue"""
+        with self._condition:
+            self._ready.append((str(next(self._ids)), body, False))
+            self._condition.notify()
+
+    def get(self, timeout: float) -> Optional[tuple]:
+        """Takes the next message as (message_id, body, redelivered), None on timeout"""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._ready, timeout):
+                return None
+            entry = self._ready.popleft()
+            self._unacked[entry[0]] = entry
+            return entry
+
+    def attempt(self, message_id: str) -> int:
+        """Number of times an unacked message has been delivered"""
+        with self._condition:
+            return self._attempts.get(message_id, 1)
+
+    def ack(self, message_id: str):
+        """Drops an unacked message"""
+        with self._condition:
+            self._unacked.pop(message_id, None)
+            self._attempts.pop(message_id, None)
+
+    def nack(self, message_id: str, requeue: bool):
+        """Returns an unacked message to the head of the queue, or drops it"""
+        with self._condition:
+            entry = self._unacked.pop(message_id, None)
+            if entry is not None and requeue:
+                self._attempts[message_id] = self._attempts.get(message_id, 1) + 1
+                self._ready.appendleft((entry[0], entry[1], True))
+                self._condition.notify()
+            else:
+                self._attempts.pop(message_id, None)
+
+    def __len__(self):
+        return len(self._ready)
+
+
+class FileQueue:
+    """
+    Directory-backed queue shared by every process on the host. Each message
+    is one file: consuming moves it from ready/ into
+    unacked/<hostname>-<pid>-<start id>/, acking deletes it and nacking moves
+    it back. Messages left unacked by a process on this host that no longer
+    runs, including an earlier run with the same PID, are redelivered.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, directory: str):
+        self._ready_dir = os.path.join(directory, "ready")
+        self._unacked_root = os.path.join(directory, "unacked")
+        self._unacked_dir = os.path.join(self._unacked_root,
+                                         f"{_HOSTNAME}-{os.getpid()}-{_START_ID}")
+        os.makedirs(self._ready_dir, exist_ok=True)
+        os.makedirs(self._unacked_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._attempts = {}
+        self._recover_abandoned()
+
+    @staticmethod
+    def _abandoned(owner: str) -> bool:
+        """Whether the consumer owning unacked/<owner> has exited, as far as this host can tell"""
+        parts = owner.rsplit("-", 2)
+        if len(parts) != 3 or not parts[1].isdigit() or parts[0] != _HOSTNAME:
+            return False
+        pid, start_id = int(parts[1]), parts[2]
+        if pid == os.getpid():
+            return start_id != _START_ID
+        return not _process_alive(pid)
+
+    def _recover_abandoned(self):
+        """
+        Moves messages held by dead consumer processes back to ready/. Each
+        is first claimed into unacked/ of this process, so that consumers
+        starting together don't both requeue it.
+        """
+        for owner in os.listdir(self._unacked_root):
+            if not self._abandoned(owner):
+                continue
+            abandoned_dir = os.path.join(self._unacked_root, owner)
+            try:
+                names = os.listdir(abandoned_dir)
+            except FileNotFoundError:
+                # Recovered by another consumer
+                continue
+            for name in names:
+                abandoned_path = os.path.join(abandoned_dir, name)
+                if name.endswith(".tmp"):
+                    # Left by a requeue cut short, the message itself is still there
+                    _remove_if_exists(abandoned_path)
+                    continue
+                claimed_path = os.path.join(self._unacked_dir, name)
+                try:
+                    os.rename(abandoned_path, claimed_path)
+                except FileNotFoundError:
+                    continue
+                self._requeue(claimed_path, name)
+            try:
+                os.rmdir(abandoned_dir)
+            except OSError:
+                # Removed, or still being emptied, by another consumer
+                pass
+
+    def _requeue(self, path: str, name: str):
+        with open(path, encoding="UTF-8") as message_file:
+            record = json.load(message_file)
+        record["redelivered"] = True
+        record["attempt"] = record.get("attempt", 1) + 1
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="UTF-8") as message_file:
+            json.dump(record, message_file)
+        os.replace(tmp_path, os.path.join(self._ready_dir, name))
+        os.remove(path)
+
+    def put(self, body: str):
+        """Writes a message body atomically into ready/"""
+        name = f"{time.time_ns():020d}-{uuid.uuid4().hex}.json"
+        tmp_path = os.path.join(self._ready_dir, "." + name)
+        with open(tmp_path, "w", encoding="UTF-8") as message_file:
+            json.dump({"body": body, "redelivered": False}, message_file)
+        os.replace(tmp_path, os.path.join(self._ready_dir, name))
+
+    def _claim(self) -> Optional[tuple]:
+        for name in sorted(os.listdir(self._ready_dir)):
+            if name.startswith("."):
+                continue
+            claimed_path = os.path.join(self._unacked_dir, name)
+            try:
+                os.rename(os.path.join(self._ready_dir, name), claimed_path)
+            except FileNotFoundError:
+                # Claimed by another consumer
+                continue
+            with open(claimed_path, encoding="UTF-8") as message_file:
+                record = json.load(message_file)
+            self._attempts[name] = record.get("attempt", 1)
+            return name, record["body"], record["redelivered"]
+        return None
+
+    def get(self, timeout: float) -> Optional[tuple]:
+        """Claims the oldest ready message as (message_id, body, redelivered)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                entry = self._claim()
+            if entry is not None or time.monotonic() >= deadline:
+                return entry
+            time.sleep(self.POLL_INTERVAL)
+
+    def attempt(self, message_id: str) -> int:
+        """Number of times a claimed message has been delivered"""
+        return self._attempts.get(message_id, 1)
+
+    def ack(self, message_id: str):
+        """Deletes a claimed message"""
+        self._attempts.pop(message_id, None)
+        _remove_if_exists(os.path.join(self._unacked_dir, message_id))
+
+    def nack(self, message_id: str, requeue: bool):
+        """Moves a claimed message back to ready/, or deletes it"""
+        if requeue:
+            self._attempts.pop(message_id, None)
+            self._requeue(os.path.join(self._unacked_dir, message_id), message_id)
+        else:
+            self.ack(message_id)
+
+    def __len__(self):
+        return len([name for name in os.listdir(self._ready_dir) if not name.startswith(".")])
+
+
+def _remove_if_exists(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class LocalQueueConnection:
+    """
+    Message adapter backed by a local queue instead of a broker. Without a
+    queue_dir, queues live in memory and are shared by every connection in
+    the process. With a queue_dir, they are directories shared by every
+    process on the host. It implements rococo's MessageAdapter interface
+    without subclassing it, as importing rococo.messaging loads the pika and
+    boto3 clients too.
+    """
+
+    _memory_queues = {}
+    _memory_queues_lock = threading.Lock()
+
+    def __init__(self, queue_dir: str = None, consume_config_file_path: str = None):
+        self._queue_dir = queue_dir
+        self._consume_config_file_path = consume_config_file_path
+        self._file_queues = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def _read_consume_config(self):
+        if self._consume_config_file_path is None:
+            return {}
+        return dotenv_values(self._consume_config_file_path)
+
+    def get_queue(self, queue_name: str):
+        """Returns the MemoryQueue or FileQueue for queue_name"""
+        if self._queue_dir is None:
+            with self._memory_queues_lock:
+                return self._memory_queues.setdefault(queue_name, MemoryQueue())
+        if queue_name not in self._file_queues:
+            self._file_queues[queue_name] = FileQueue(os.path.join(self._queue_dir, queue_name))
+        return self._file_queues[queue_name]
+
+    def send_message(self, queue_name: str, message: dict):
+        """
+        Sends a message to the specified queue.
+
+        Args:
+            queue_name (str): The name of the queue to send the message to.
+            message (dict): The message to send.
+        """
+        self.get_queue(queue_name).put(json.dumps(message))
+
+    def consume_messages(self, queue_name: str, callback_function: callable = None):
+        """
+        Consumes messages from the specified queue, acking each one after the
+        callback returns.
+
+        Args:
+            queue_name (str): The name of the queue to consume messages from.
+            callback_function (callable): The function to call when a message is received.
+        """
+
+        def _on_delivery(delivery):
+            try:
+                if callback_function is not None:
+                    callback_function(delivery.body)
+            except Exception:  # pylint: disable=W0718
+                logger.exception("Error processing message...")
+            delivery.ack()
+
+        self.consume_deliveries(queue_name, _on_delivery)
+
+    def consume_deliveries(self, queue_name: str,
+                           on_delivery: Callable[[Delivery], None],
+                           prefetch_count: int = 1,
+                           shutdown=None):
+        """
+        Consumes messages from the specified queue, passing each one as a
+        Delivery to on_delivery. Nacked messages are redelivered.
+
+        Args:
+            queue_name (str): The name of the queue to consume messages from.
+            on_delivery (callable): Called on the consumer thread for each delivery.
+            prefetch_count (int): Maximum number of unsettled deliveries.
+            shutdown (ShutdownCoordinator): Once it is requested, stops consuming
+                and waits for in-flight deliveries before returning.
+        """
+        queue = self.get_queue(queue_name)
+        in_flight = InFlightCounter()
+        logger.info("Listening to local queue %s with prefetch %s...", queue_name, prefetch_count)
+
+        while True:
+            if shutdown is not None and shutdown.requested:
+                drain(in_flight, shutdown)
+                return
+            if not in_flight.wait_below(prefetch_count, timeout=1):
+                continue
+            entry = queue.get(timeout=1)
+            if entry is not None and shutdown is not None and shutdown.requested:
+                queue.nack(entry[0], requeue=True)
+                continue
+            if entry is None:
+                if (in_flight.value == 0 and
+                        self._read_consume_config().get('EXIT_WHEN_FINISHED') == '1'):
+                    logger.info("Local queue %s is empty and EXIT_WHEN_FINISHED=1, exiting!",
+                                queue_name)
+                    return
+                continue
+
+            message_id, body, redelivered = entry
+            try:
+                message = json.loads(body)
+            except ValueError:
+                logger.exception("Dropping undecodable message on %s", queue_name)
+                queue.nack(message_id, requeue=False)
+                continue
+
+            def _on_ack(message_id=message_id):
+                in_flight.decrement()
+                queue.ack(message_id)
+
+            def _on_nack(requeue, message_id=message_id):
+                in_flight.decrement()
+                queue.nack(message_id, requeue)
+
+            def _on_retry(delay, message_id=message_id):
+                in_flight.decrement()
+                # The message stays unacked until then, so it survives a restart
+                timer = threading.Timer(delay, queue.nack, (message_id, True))
+                timer.daemon = True
+                timer.start()
+
+            def _on_dead_letter(dead_letter_queue, message_id=message_id, body=body):
+                in_flight.decrement()
+                self.get_queue(dead_letter_queue).put(body)
+                queue.ack(message_id)
+
+            in_flight.increment()
+            on_delivery(Delivery(message, on_ack=_on_ack, on_nack=_on_nack,
+                                 queue_name=queue_name, message_id=message_id,
+                                 redelivered=redelivered, attempt=queue.attempt(message_id),
+                                 on_retry=_on_retry, on_dead_letter=_on_dead_letter))
+
+    def consume_queues(self, subscriptions, **consume_params):
+        """
+        Consumes several queues, each on its own thread.
+
+        Args:
+            subscriptions (list): (queue_name, on_delivery, prefetch_count) tuples.
+            consume_params: Passed on to consume_deliveries.
+        """
+        consume_in_threads(self.consume_deliveries, subscriptions, **consume_params)
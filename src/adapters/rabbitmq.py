@@ -0,0 +1,234 @@
+"""
+Host RabbitMQ adapter
+"""
+import functools
+import json
+from typing import Callable
+
+import pika
+from rococo.messaging import RabbitMqConnection
+from logger import Logger
+from .delivery import Delivery, InFlightCounter
+
+logger = Logger().get_logger()
+
+# Header counting how many times a message has been delivered by the host
+ATTEMPT_HEADER = "x-attempt"
+
+
+class HostRabbitMqConnection(RabbitMqConnection):
+    """
+    RabbitMQ connection that hands each delivery to the host and lets the
+    host decide when to ack or nack it. A delayed retry republishes the
+    message to <queue>.retry.<attempt>, where it expires back into the queue.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._declared_queues = set()
+
+    def _declare_once(self, channel, queue_name: str, arguments: dict = None):
+        """Declares a durable queue the first time it is published to"""
+        if queue_name not in self._declared_queues:
+            channel.queue_declare(queue=queue_name, durable=True, arguments=arguments)
+            self._declared_queues.add(queue_name)
+
+    def _run_on_consumer_thread(self, channel, operation, *args, **kwargs):
+        """Schedules a channel operation on the thread that owns the connection."""
+
+        def _call():
+            if channel.is_open:
+                operation(*args, **kwargs)
+
+        connection = self._connection
+        if connection is not None and connection.is_open:
+            connection.add_callback_threadsafe(_call)
+
+    def _make_delivery(self, channel, method, properties, body, queue_name,
+                       in_flight: InFlightCounter) -> Delivery:
+        delivery_tag = method.delivery_tag
+
+        # The ack is scheduled before the count drops so that a drain that
+        # sees nothing in flight also sees every pending ack.
+        def _on_ack():
+            self._run_on_consumer_thread(channel, channel.basic_ack, delivery_tag)
+            in_flight.decrement()
+
+        def _on_nack(requeue):
+            self._run_on_consumer_thread(channel, channel.basic_nack, delivery_tag,
+                                         requeue=requeue)
+            in_flight.decrement()
+
+        headers = getattr(properties, 'headers', None) or {}
+        attempt = int(headers.get(ATTEMPT_HEADER, 1))
+
+        def _republish(target_queue, arguments=None, expiration=None, **extra_headers):
+            """Publishes a copy of the message to target_queue and acks the original"""
+            self._declare_once(channel, target_queue, arguments)
+            channel.basic_publish(
+                exchange='', routing_key=target_queue, body=body,
+                properties=pika.BasicProperties(
+                    content_type=properties.content_type, delivery_mode=2,
+                    message_id=properties.message_id, expiration=expiration,
+                    headers={**headers, **extra_headers}))
+            channel.basic_ack(delivery_tag)
+
+        def _on_retry(delay):
+            self._run_on_consumer_thread(
+                channel, _republish, f"{queue_name}.retry.{attempt}",
+                arguments={"x-dead-letter-exchange": "",
+                           "x-dead-letter-routing-key": queue_name},
+                expiration=str(int(delay * 1000)),
+                **{ATTEMPT_HEADER: attempt + 1})
+            in_flight.decrement()
+
+        def _on_dead_letter(dead_letter_queue):
+            self._run_on_consumer_thread(channel, _republish, dead_letter_queue,
+                                         **{"x-original-queue": queue_name})
+            in_flight.decrement()
+
+        message = json.loads(body.decode())
+        in_flight.increment()
+        return Delivery(
+            body=message,
+            on_ack=_on_ack,
+            on_nack=_on_nack,
+            queue_name=queue_name,
+            message_id=getattr(properties, 'message_id', None),
+            redelivered=method.redelivered,
+            attempt=attempt,
+            on_retry=_on_retry,
+            on_dead_letter=_on_dead_letter
+        )
+
+    def _drain(self, in_flight: InFlightCounter, shutdown):
+        """Keeps the connection serving acks until nothing is in flight or the grace period ends"""
+        logger.info("Stopped consuming, waiting for %s in-flight messages...", in_flight.value)
+        while in_flight.value > 0 and shutdown.remaining() > 0:
+            self._connection.process_data_events(time_limit=min(0.1, shutdown.remaining()))
+        self._connection.process_data_events(time_limit=0)
+        if in_flight.value > 0:
+            logger.warning("%s messages still in flight after the grace period "
+                           "will be redelivered", in_flight.value)
+
+    def consume_deliveries(self, queue_name: str,
+                           on_delivery: Callable[[Delivery], None],
+                           prefetch_count: int = 1,
+                           shutdown=None):
+        """
+        Consumes messages from the specified queue, passing each one as a
+        Delivery to on_delivery. The consumer thread is the only thread that
+        touches the channel: acks and nacks issued from other threads are
+        scheduled back onto it.
+
+        Args:
+            queue_name (str): The name of the queue to consume messages from.
+            on_delivery (callable): Called on the consumer thread for each delivery.
+            prefetch_count (int): Maximum number of unacked deliveries.
+            shutdown (ShutdownCoordinator): Once it is requested, stops consuming
+                and waits for in-flight deliveries before returning.
+        """
+        in_flight = InFlightCounter()
+        # Wake up every second when a shutdown has to be noticed promptly
+        inactivity_timeout = 5 if shutdown is None else 1
+        while True:
+            try:
+                if not self._channel.is_open or not self._connection.is_open:
+                    logger.info("Reconnecting...")
+                    self._connect()
+                channel = self._channel
+                channel.basic_qos(prefetch_count=prefetch_count)
+                channel.queue_declare(queue=queue_name, durable=True)
+                logger.info("Listening to RabbitMQ queue %s on %s:%s with prefetch %s...",
+                            queue_name, self._host, self._port, prefetch_count)
+                for method, properties, body in channel.consume(
+                        queue=queue_name, inactivity_timeout=inactivity_timeout):
+                    if shutdown is not None and shutdown.requested:
+                        if method is not None:
+                            channel.basic_nack(method.delivery_tag, requeue=True)
+                        # Cancelling also requeues the messages pika has buffered
+                        channel.cancel()
+                        self._drain(in_flight, shutdown)
+                        return
+                    if method is None:
+                        if (in_flight.value == 0 and
+                                self._read_consume_config().get('EXIT_WHEN_FINISHED') == '1'):
+                            logger.info("Reached inactivity timeout with nothing in flight "
+                                        "and EXIT_WHEN_FINISHED=1, exiting!")
+                            return
+                        continue
+                    try:
+                        delivery = self._make_delivery(channel, method, properties, body,
+                                                       queue_name, in_flight)
+                    except ValueError:
+                        logger.exception("Rejecting undecodable message on %s", queue_name)
+                        channel.basic_nack(method.delivery_tag, requeue=False)
+                        continue
+                    on_delivery(delivery)
+            except (pika.exceptions.AMQPConnectionError,
+                    pika.exceptions.ChannelClosedByBroker):
+                continue
+
+    def consume_queues(self, subscriptions, shutdown=None):
+        """
+        Consumes several queues over the one channel, with a consumer and a
+        prefetch window per queue. Deliveries are handed over on the consumer
+        thread, like consume_deliveries.
+
+        Args:
+            subscriptions (list): (queue_name, on_delivery, prefetch_count) tuples.
+            shutdown (ShutdownCoordinator): Once it is requested, cancels every
+                consumer and waits for in-flight deliveries before returning.
+        """
+        in_flight = InFlightCounter()
+        time_limit = 5 if shutdown is None else 1
+        received = [0]
+
+        def _on_message(channel, method, properties, body, queue_name, on_delivery):
+            received[0] += 1
+            if shutdown is not None and shutdown.requested:
+                channel.basic_nack(method.delivery_tag, requeue=True)
+                return
+            try:
+                delivery = self._make_delivery(channel, method, properties, body,
+                                               queue_name, in_flight)
+            except ValueError:
+                logger.exception("Rejecting undecodable message on %s", queue_name)
+                channel.basic_nack(method.delivery_tag, requeue=False)
+                return
+            on_delivery(delivery)
+
+        while True:
+            try:
+                if not self._channel.is_open or not self._connection.is_open:
+                    logger.info("Reconnecting...")
+                    self._connect()
+                channel = self._channel
+                consumer_tags = []
+                for queue_name, on_delivery, prefetch_count in subscriptions:
+                    # basic_qos applies to the consumers started after it
+                    channel.basic_qos(prefetch_count=prefetch_count)
+                    channel.queue_declare(queue=queue_name, durable=True)
+                    consumer_tags.append(channel.basic_consume(
+                        queue=queue_name,
+                        on_message_callback=functools.partial(
+                            _on_message, queue_name=queue_name, on_delivery=on_delivery)))
+                    logger.info("Listening to RabbitMQ queue %s on %s:%s with prefetch %s...",
+                                queue_name, self._host, self._port, prefetch_count)
+                while True:
+                    if shutdown is not None and shutdown.requested:
+                        # Cancelling also requeues the messages pika has buffered
+                        for consumer_tag in consumer_tags:
+                            channel.basic_cancel(consumer_tag)
+                        self._drain(in_flight, shutdown)
+                        return
+                    received_before = received[0]
+                    self._connection.process_data_events(time_limit=time_limit)
+                    if (received[0] == received_before and in_flight.value == 0 and
+                            self._read_consume_config().get('EXIT_WHEN_FINISHED') == '1'):
+                        logger.info("Reached inactivity timeout with nothing in flight "
+                                    "and EXIT_WHEN_FINISHED=1, exiting!")
+                        return
+            except (pika.exceptions.AMQPConnectionError,
+                    pika.exceptions.ChannelClosedByBroker):
+                continue
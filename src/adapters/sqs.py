@@ -0,0 +1,174 @@
+"""
+Host SQS adapter
+"""
+import json
+import math
+import threading
+from typing import Callable
+
+from rococo.messaging import SqsConnection
+from logger import Logger
+from .delivery import Delivery, InFlightCounter, drain, consume_in_threads
+
+logger = Logger().get_logger()
+
+SQS_MAX_MESSAGES_PER_RECEIVE = 10
+# Longest visibility timeout SQS accepts, in seconds
+SQS_MAX_VISIBILITY_TIMEOUT = 43200
+
+
+class HostSqsConnection(SqsConnection):
+    """
+    SQS connection that hands each message to the host and lets the host
+    decide when to delete it (ack) or make it visible again (nack). Retries
+    are delayed with the visibility timeout.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._queue_urls = {}
+        self._queue_urls_lock = threading.Lock()
+
+    def _queue_url(self, queue_name: str) -> str:
+        """
+        Returns the URL of queue_name, creating the queue the first time.
+        Deliveries are settled on worker threads, so this goes through the
+        low-level client, which unlike the resource is thread-safe.
+        """
+        with self._queue_urls_lock:
+            if queue_name not in self._queue_urls:
+                self._queue_urls[queue_name] = self._sqs.meta.client.create_queue(
+                    QueueName=queue_name)['QueueUrl']
+            return self._queue_urls[queue_name]
+
+    def _make_delivery(self, queue, message, queue_name,
+                       in_flight: InFlightCounter) -> Delivery:
+        client = self._sqs.meta.client
+        receipt_handle = message.receipt_handle
+
+        # A settle counts as done only once SQS has it, so a drain waits for it
+        def _on_ack():
+            try:
+                client.delete_message(QueueUrl=queue.url, ReceiptHandle=receipt_handle)
+            finally:
+                in_flight.decrement()
+
+        def _on_nack(requeue):
+            try:
+                if requeue:
+                    client.change_message_visibility(QueueUrl=queue.url,
+                                                     ReceiptHandle=receipt_handle,
+                                                     VisibilityTimeout=0)
+                else:
+                    client.delete_message(QueueUrl=queue.url, ReceiptHandle=receipt_handle)
+            finally:
+                in_flight.decrement()
+
+        def _on_retry(delay):
+            try:
+                client.change_message_visibility(
+                    QueueUrl=queue.url, ReceiptHandle=receipt_handle,
+                    VisibilityTimeout=min(math.ceil(delay), SQS_MAX_VISIBILITY_TIMEOUT))
+            finally:
+                in_flight.decrement()
+
+        def _on_dead_letter(dead_letter_queue):
+            try:
+                client.send_message(QueueUrl=self._queue_url(dead_letter_queue),
+                                    MessageBody=message.body)
+                client.delete_message(QueueUrl=queue.url, ReceiptHandle=receipt_handle)
+            finally:
+                in_flight.decrement()
+
+        body = json.loads(message.body)
+        attributes = message.attributes or {}
+        receive_count = int(attributes.get('ApproximateReceiveCount', 1))
+        in_flight.increment()
+        return Delivery(
+            body=body,
+            on_ack=_on_ack,
+            on_nack=_on_nack,
+            queue_name=queue_name,
+            message_id=message.message_id,
+            redelivered=receive_count > 1,
+            attempt=receive_count,
+            on_retry=_on_retry,
+            on_dead_letter=_on_dead_letter
+        )
+
+    def consume_deliveries(self, queue_name: str,
+                           on_delivery: Callable[[Delivery], None],
+                           prefetch_count: int = 1,
+                           max_messages_per_receive: int = SQS_MAX_MESSAGES_PER_RECEIVE,
+                           wait_time_seconds: int = 20,
+                           shutdown=None):
+        """
+        Consumes messages from the specified SQS queue, passing each one as a
+        Delivery to on_delivery. No more than prefetch_count messages are
+        received without having been settled.
+
+        Args:
+            queue_name (str): The name of the queue to consume messages from.
+            on_delivery (callable): Called on the consumer thread for each delivery.
+            prefetch_count (int): Maximum number of unsettled messages.
+            max_messages_per_receive (int): Largest batch fetched by one receive call.
+            wait_time_seconds (int): Long polling wait of each receive call.
+            shutdown (ShutdownCoordinator): Once it is requested, stops receiving
+                and waits for in-flight deliveries before returning.
+        """
+        logger.info("Connecting to SQS queue: %s...", queue_name)
+        queue = self._sqs.create_queue(QueueName=queue_name)
+        in_flight = InFlightCounter()
+        if shutdown is not None:
+            # A receive in progress delays the drain, keep it within half the grace
+            # period, but long poll for at least a second so it doesn't busy-loop
+            wait_time_seconds = min(wait_time_seconds,
+                                    max(1, int(shutdown.grace_seconds / 2)))
+
+        while True:
+            if shutdown is not None and shutdown.requested:
+                drain(in_flight, shutdown)
+                return
+            if not in_flight.wait_below(prefetch_count, timeout=1):
+                continue
+            free_slots = prefetch_count - in_flight.value
+            responses = queue.receive_messages(
+                AttributeNames=['All'],
+                MaxNumberOfMessages=max(1, min(free_slots, max_messages_per_receive)),
+                WaitTimeSeconds=wait_time_seconds
+            )
+            if not responses:
+                if (in_flight.value == 0 and
+                        self._read_consume_config().get('EXIT_WHEN_FINISHED') == '1'):
+                    logger.info("EXIT_WHEN_FINISHED=1 and no messages left in queue. Exiting...")
+                    return
+                continue
+
+            for message in responses:
+                if shutdown is not None and shutdown.requested:
+                    message.change_visibility(VisibilityTimeout=0)
+                    continue
+                try:
+                    delivery = self._make_delivery(queue, message, queue_name, in_flight)
+                except ValueError:
+                    logger.exception("Deleting undecodable message on %s", queue_name)
+                    message.delete()
+                    continue
+                on_delivery(delivery)
+
+    def consume_queues(self, subscriptions, **consume_params):
+        """
+        Consumes several queues, each with its own receive loop. boto3
+        resources aren't thread-safe, so every loop gets its own connection.
+
+        Args:
+            subscriptions (list): (queue_name, on_delivery, prefetch_count) tuples.
+            consume_params: Passed on to consume_deliveries.
+        """
+        connections = [
+            type(self)(self._aws_access_key_id, self._aws_access_key_secret,
+                       self._region_name, self._consume_config_file_path)
+            for _ in subscriptions
+        ]
+        consume_in_threads([connection.consume_deliveries for connection in connections],
+                           subscriptions, **consume_params)
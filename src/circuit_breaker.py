@@ -0,0 +1,200 @@
+"""
+Circuit breaker pausing processing while a processor keeps failing
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from logger import Logger
+from dispatch import get_current_deliveries
+
+logger = Logger().get_logger()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """
+    Trips open when at least failure_ratio of the calls in the last
+    window_seconds failed, once there were min_calls of them. While open,
+    calls wait instead of running. Their workers stay busy, so the host stops
+    pulling from the broker once its prefetch window is full, and nothing is
+    nacked back and forth. A SharedPool leaves the deliveries queued instead,
+    so the breaker doesn't hold workers other queues could use. After
+    open_seconds the breaker is half-open and lets one call at a time through
+    as a probe. probes successes in a row close it, and a failed probe opens
+    it again.
+    """
+
+    def __init__(self, name: str, failure_ratio: float, window_seconds: float = 60,
+                 min_calls: int = 10, open_seconds: float = 30, probes: int = 3,
+                 shutdown=None):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.probes = probes
+        self.state = CLOSED
+        self._coordinator = shutdown
+        # [second, calls, failures] for each second of the window
+        self._buckets = deque()
+        self._opened_at = None
+        self._probing = False
+        self._probe_successes = 0
+        self._condition = threading.Condition()
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self._opened_at = now
+        self._buckets.clear()
+        self._probing = False
+        self._probe_successes = 0
+
+    def _record(self, now: float, failed: bool):
+        second = int(now)
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        self._buckets[-1][1] += 1
+        self._buckets[-1][2] += failed
+        while self._buckets[0][0] <= now - self.window_seconds:
+            self._buckets.popleft()
+        calls = sum(bucket[1] for bucket in self._buckets)
+        failures = sum(bucket[2] for bucket in self._buckets)
+        if calls >= self.min_calls and failures >= self.failure_ratio * calls:
+            logger.warning("%s failed %s of its last %s calls, pausing for %s seconds",
+                           self.name, failures, calls, self.open_seconds)
+            self._open(now)
+
+    def _try_acquire(self, now: float) -> Optional[float]:
+        """None when a call may go ahead, otherwise the seconds to wait before asking again"""
+        if self.state == OPEN:
+            remaining = self._opened_at + self.open_seconds - now
+            if remaining > 0:
+                return remaining
+            logger.info("%s is half-open, probing with one call at a time", self.name)
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return self.open_seconds
+            self._probing = True
+        return None
+
+    def _wait_time(self) -> Optional[float]:
+        wait = self._try_acquire(time.monotonic())
+        if wait is not None and self._coordinator is not None:
+            # Check for a shutdown every second
+            wait = min(wait, 1.0)
+        return wait
+
+    def _stopping(self) -> bool:
+        return self._coordinator is not None and self._coordinator.requested
+
+    @property
+    def closed(self) -> bool:
+        """Whether calls run without the breaker holding them"""
+        return self.state == CLOSED
+
+    def paused_for(self) -> Optional[float]:
+        """
+        Seconds until a call may go ahead, or None if one may now. Unlike
+        acquire, it doesn't wait or take the half-open probe.
+        """
+        with self._condition:
+            if self.state == OPEN:
+                remaining = self._opened_at + self.open_seconds - time.monotonic()
+                return remaining if remaining > 0 else None
+            if self.state == HALF_OPEN and self._probing:
+                return self.open_seconds
+            return None
+
+    def acquire(self) -> Optional[bool]:
+        """
+        Waits until a call may go ahead. Returns whether it is a probe, or
+        None if a shutdown was requested while waiting.
+        """
+        with self._condition:
+            while True:
+                state = self.state
+                wait = self._wait_time()
+                if wait is None:
+                    return state != CLOSED
+                if self._stopping():
+                    return None
+                self._condition.wait(wait)
+
+    async def acquire_async(self) -> Optional[bool]:
+        """Like acquire, waiting on the event loop"""
+        import asyncio  # pylint: disable=C0415
+        while True:
+            with self._condition:
+                state = self.state
+                wait = self._wait_time()
+            if wait is None:
+                return state != CLOSED
+            if self._stopping():
+                return None
+            await asyncio.sleep(min(wait, 1.0))
+
+    def release(self, probe: bool, failed: bool):
+        """Records the outcome of a call that acquire let through"""
+        with self._condition:
+            now = time.monotonic()
+            if probe:
+                self._probing = False
+                if failed:
+                    logger.warning("%s probe failed, pausing for %s seconds",
+                                   self.name, self.open_seconds)
+                    self._open(now)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.probes:
+                        logger.info("%s recovered, resuming", self.name)
+                        self.state = CLOSED
+            elif self.state == CLOSED:
+                self._record(now, failed)
+            self._condition.notify_all()
+
+    @staticmethod
+    def _requeue_current():
+        """Hands the deliveries a call was holding back to the broker"""
+        for delivery in get_current_deliveries():
+            delivery.nack(requeue=True)
+
+    def wrap(self, process: Callable) -> Callable:
+        """Wraps a process callable, sync or async, with the breaker"""
+        if inspect.iscoroutinefunction(process):
+            @functools.wraps(process)
+            async def _guarded_async(*args, **kwargs):
+                probe = await self.acquire_async()
+                if probe is None:
+                    self._requeue_current()
+                    return None
+                try:
+                    result = await process(*args, **kwargs)
+                except Exception:
+                    self.release(probe, failed=True)
+                    raise
+                self.release(probe, failed=False)
+                return result
+            return _guarded_async
+
+        @functools.wraps(process)
+        def _guarded(*args, **kwargs):
+            probe = self.acquire()
+            if probe is None:
+                self._requeue_current()
+                return None
+            try:
+                result = process(*args, **kwargs)
+            except Exception:
+                self.release(probe, failed=True)
+                raise
+            self.release(probe, failed=False)
+            return result
+        return _guarded
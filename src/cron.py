@@ -0,0 +1,93 @@
+"""
+Runs cron jobs off the scheduler thread
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from logger import Logger
+
+logger = Logger().get_logger()
+
+
+class CronRunner:
+    """
+    Runs a cron job on worker threads, so a slow run doesn't hold up the
+    schedule. At most max_instances runs overlap. A tick that comes while they
+    are all busy waits for one to finish, and is skipped once it is more than
+    misfire_grace_seconds late. With coalesce, the waiting ticks collapse into
+    a single run. Otherwise up to max_instances ticks wait and further ones
+    are skipped, so a job slower than its schedule doesn't build a backlog.
+    """
+
+    def __init__(self, process: Callable, max_instances: int = 1, coalesce: bool = True,
+                 misfire_grace_seconds: Optional[float] = None):
+        self._process = process
+        self._max_instances = max_instances
+        self._coalesce = coalesce
+        self._misfire_grace_seconds = misfire_grace_seconds
+        self._executor = ThreadPoolExecutor(max_instances, thread_name_prefix="cron")
+        self._waiting = deque()
+        self._running = 0
+        self._stopped = False
+        self._condition = threading.Condition()
+
+    @property
+    def running(self) -> int:
+        """Number of runs in progress"""
+        return self._running
+
+    def __call__(self):
+        """Starts a run now, or queues it when max_instances runs are in progress"""
+        with self._condition:
+            if self._stopped:
+                return
+            if self._running < self._max_instances:
+                self._running += 1
+                self._executor.submit(self._run)
+            elif self._coalesce and self._waiting:
+                logger.warning("Cron job is still running, coalescing the missed run")
+                self._waiting[-1] = time.monotonic()
+            elif len(self._waiting) >= self._max_instances:
+                logger.warning("Cron job is still running and %s runs are waiting, skipping "
+                               "this run", len(self._waiting))
+            else:
+                logger.warning("Cron job is still running, the next run will wait for it")
+                self._waiting.append(time.monotonic())
+
+    def _next_waiting(self) -> bool:
+        """Pops waiting ticks until one is still within the grace period"""
+        now = time.monotonic()
+        while self._waiting:
+            late = now - self._waiting.popleft()
+            if self._misfire_grace_seconds is None or late <= self._misfire_grace_seconds:
+                return True
+            logger.warning("Skipping cron run that is %.1f s late, CRON_MISFIRE_GRACE_SECONDS is %s",
+                           late, self._misfire_grace_seconds)
+        return False
+
+    def _run(self):
+        while True:
+            try:
+                self._process()
+            except Exception:  # pylint: disable=W0718
+                logger.exception("Cron job failed")
+            with self._condition:
+                if not self._next_waiting():
+                    self._running -= 1
+                    self._condition.notify_all()
+                    return
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ignores further ticks, drops waiting ones and waits up to timeout for
+        running jobs. Returns False if some are still running.
+        """
+        with self._condition:
+            self._stopped = True
+            self._waiting.clear()
+            finished = self._condition.wait_for(lambda: self._running == 0, timeout)
+        self._executor.shutdown(wait=False)
+        return finished
@@ -0,0 +1,230 @@
+"""
+Skipping of messages that have already been processed
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from logger import Logger
+from dispatch import get_current_delivery
+
+logger = Logger().get_logger()
+
+
+class MemoryDedupStore:
+    """In-process LRU of keys, each remembered for ttl seconds"""
+
+    def __init__(self, ttl: float, max_entries: int = 100000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._expires_at = OrderedDict()
+        self._lock = threading.Lock()
+
+    def contains(self, key: str) -> bool:
+        """Whether key was added less than ttl seconds ago"""
+        with self._lock:
+            expires_at = self._expires_at.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._expires_at[key]
+                return False
+            self._expires_at.move_to_end(key)
+            return True
+
+    def reserve(self, key: str) -> bool:
+        """Adds key unless it is already there, returns whether it was added"""
+        with self._lock:
+            expires_at = self._expires_at.get(key)
+            if expires_at is not None and expires_at > time.monotonic():
+                self._expires_at.move_to_end(key)
+                return False
+            self._add(key)
+            return True
+
+    def add(self, key: str):
+        """Remembers key, evicting the least recently seen keys beyond max_entries"""
+        with self._lock:
+            self._add(key)
+
+    def _add(self, key: str):
+        self._expires_at[key] = time.monotonic() + self.ttl
+        self._expires_at.move_to_end(key)
+        while len(self._expires_at) > self.max_entries:
+            self._expires_at.popitem(last=False)
+
+    def discard(self, key: str):
+        """Forgets key"""
+        with self._lock:
+            self._expires_at.pop(key, None)
+
+
+class SqliteDedupStore:
+    """
+    Keys kept in a SQLite file for ttl seconds, so they survive restarts and
+    are shared by every host process on the machine.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, ttl: float):
+        import sqlite3  # pylint: disable=C0415
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+        self._lock = threading.Lock()
+        self._adds = 0
+
+    def contains(self, key: str) -> bool:
+        """Whether key was added less than ttl seconds ago"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM seen WHERE key = ? AND expires_at > ?",
+                (key, time.time())).fetchone()
+        return row is not None
+
+    def reserve(self, key: str) -> bool:
+        """
+        Adds key unless it is already there, returns whether it was added. The
+        check and the insert are one transaction, so of several host processes
+        reserving the same key only one gets it.
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute("DELETE FROM seen WHERE key = ? AND expires_at <= ?",
+                                         (key, now))
+                added = self._connection.execute(
+                    "INSERT OR IGNORE INTO seen (key, expires_at) VALUES (?, ?)",
+                    (key, now + self.ttl)).rowcount == 1
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+            if added:
+                self._count_add(now)
+        return added
+
+    def add(self, key: str):
+        """Remembers key, purging expired keys every PURGE_EVERY additions"""
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO seen (key, expires_at) VALUES (?, ?)",
+                (key, now + self.ttl))
+            self._count_add(now)
+
+    def _count_add(self, now: float):
+        self._adds += 1
+        if self._adds % self.PURGE_EVERY == 0:
+            self._connection.execute("DELETE FROM seen WHERE expires_at <= ?", (now,))
+
+    def discard(self, key: str):
+        """Forgets key"""
+        with self._lock:
+            self._connection.execute("DELETE FROM seen WHERE key = ?", (key,))
+
+
+def content_key(message) -> str:
+    """SHA-256 of the message's canonical JSON"""
+    encoded = json.dumps(message, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class Deduplicator:
+    """
+    Skips messages whose key is in the store. The key is reserved before
+    process runs, so a duplicate on another worker is skipped too, and
+    forgotten again if process raises, so failed messages can still be
+    retried. With key="message_id", messages without an id are processed
+    without deduplication.
+    """
+
+    def __init__(self, store, key: str = "message_id"):
+        self.store = store
+        self.key = key
+        self._warned_no_id = False
+
+    def key_for(self, message) -> Optional[str]:
+        """Returns the dedup key of the message being processed, None if it has none"""
+        if self.key != "message_id":
+            return content_key(message)
+        delivery = get_current_delivery()
+        if delivery is not None and delivery.message_id is not None:
+            return f"{delivery.queue_name}:{delivery.message_id}"
+        if not self._warned_no_id:
+            self._warned_no_id = True
+            logger.warning("Messages without a message id are not deduplicated. "
+                           "Set DEDUP_KEY=content to key them by content")
+        return None
+
+    def _reserve(self, key: str) -> bool:
+        try:
+            return self.store.reserve(key)
+        except Exception:  # pylint: disable=W0718
+            # A broken store must not stop processing
+            logger.exception("Error reading dedup store, processing message anyway")
+            return True
+
+    def _remember(self, key: str):
+        try:
+            self.store.add(key)
+        except Exception:  # pylint: disable=W0718
+            logger.exception("Error writing dedup store")
+
+    def _forget(self, key: str):
+        try:
+            self.store.discard(key)
+        except Exception:  # pylint: disable=W0718
+            logger.exception("Error writing dedup store, the failed message may be skipped")
+
+    def wrap(self, process: Callable) -> Callable:
+        """Wraps a process(message) callable, sync or async, with the dedup check"""
+        if inspect.iscoroutinefunction(process):
+            @functools.wraps(process)
+            async def _deduplicated_async(message):
+                key = self.key_for(message)
+                if key is None:
+                    return await process(message)
+                if not self._reserve(key):
+                    logger.info("Skipping duplicate message %s", key)
+                    return None
+                try:
+                    result = await process(message)
+                except BaseException:
+                    self._forget(key)
+                    raise
+                self._remember(key)
+                return result
+            return _deduplicated_async
+
+        @functools.wraps(process)
+        def _deduplicated(message):
+            key = self.key_for(message)
+            if key is None:
+                return process(message)
+            if not self._reserve(key):
+                logger.info("Skipping duplicate message %s", key)
+                return None
+            try:
+                result = process(message)
+            except BaseException:
+                self._forget(key)
+                raise
+            self._remember(key)
+            return result
+        return _deduplicated
+
@@ -0,0 +1,26 @@
+"""
+Dispatch of received messages to the service processor
+
+ProcessPool and AsyncPool are imported on first use, so only hosts that
+run them load multiprocessing and asyncio.
+"""
+import importlib
+
+from .context import get_current_delivery, get_current_deliveries
+from .worker_pool import WorkerPool
+from .batcher import Batcher
+from .retry import RetryPolicy
+from .shared_pool import SharedPool
+from .scheduling import WeightedFair, StrictPriority, SCHEDULING_POLICIES
+from .adaptive import AdaptiveLimiter
+
+_POOL_MODULES = {
+    "ProcessPool": ".process_pool",
+    "AsyncPool": ".async_pool",
+}
+
+
+def __getattr__(name):
+    if name in _POOL_MODULES:
+        return getattr(importlib.import_module(_POOL_MODULES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,91 @@
+"""
+Concurrency limit that adapts to the latency and errors of the processor
+"""
+import threading
+
+from logger import Logger
+
+logger = Logger().get_logger()
+
+
+class AdaptiveLimiter:
+    """
+    Limits how many process calls run at once, between min_limit and
+    max_limit, by additive increase and multiplicative decrease. Completions
+    are looked at in windows of about limit calls. A window whose mean latency
+    is more than latency_tolerance times the baseline, or whose error rate is
+    above max_error_rate, cuts the limit by backoff. Otherwise the limit grows
+    by one, but only if the window actually used it.
+
+    The baseline is the lowest mean latency seen. It creeps up by
+    baseline_drift of the gap every window, so it follows a downstream that
+    has become slower for good.
+    """
+
+    MIN_WINDOW = 5
+
+    def __init__(self, min_limit: int, max_limit: int, latency_tolerance: float = 2.0,
+                 max_error_rate: float = 0.1, backoff: float = 0.75,
+                 baseline_drift: float = 0.01):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.backoff = backoff
+        self.baseline_drift = baseline_drift
+        self.limit = min_limit
+        self.baseline = None
+        self._running = 0
+        self._condition = threading.Condition()
+        self._reset_window()
+
+    def _reset_window(self):
+        self._calls = 0
+        self._errors = 0
+        self._latency_sum = 0.0
+        self._saturated = False
+
+    @property
+    def running(self) -> int:
+        """Number of calls holding a slot"""
+        return self._running
+
+    def acquire(self):
+        """Waits for a free slot under the current limit and takes it"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._running < self.limit)
+            self._running += 1
+            if self._running >= self.limit:
+                self._saturated = True
+
+    def release(self, duration: float, failed: bool = False):
+        """Frees a slot, recording how long the call took and whether it failed"""
+        with self._condition:
+            self._running -= 1
+            self._calls += 1
+            self._errors += failed
+            self._latency_sum += duration
+            if self._calls >= max(self.limit, self.MIN_WINDOW):
+                self._adjust()
+                self._reset_window()
+            self._condition.notify_all()
+
+    def _adjust(self):
+        latency = self._latency_sum / self._calls
+        error_rate = self._errors / self._calls
+        if self.baseline is None:
+            self.baseline = latency
+        if error_rate > self.max_error_rate or latency > self.baseline * self.latency_tolerance:
+            limit = max(self.min_limit, int(self.limit * self.backoff))
+            if limit < self.limit:
+                logger.info("Lowering concurrency to %s: latency %.3fs against a %.3fs "
+                            "baseline, %.0f%% errors", limit, latency, self.baseline,
+                            error_rate * 100)
+            self.limit = limit
+        elif self._saturated and self.limit < self.max_limit:
+            self.limit += 1
+            logger.debug("Raising concurrency to %s", self.limit)
+        if latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += self.baseline_drift * (latency - self.baseline)
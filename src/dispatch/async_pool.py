@@ -0,0 +1,93 @@
+"""
+Event loop dispatch for processors with an async process()
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable
+
+from logger import Logger
+from .context import processing
+from .retry import ack_failed
+
+logger = Logger().get_logger()
+
+
+class AsyncPool:
+    """
+    Runs an async processor's coroutines on a single event loop thread,
+    keeping up to concurrency messages in flight at once. Each delivery is
+    acked once its coroutine has finished, or handed to on_failure if it raised.
+    Settling can be a blocking broker call, so it runs on a thread pool rather
+    than holding up the other coroutines.
+    """
+
+    def __init__(self, coroutine_function: Callable, concurrency: int,
+                 on_failure: Callable = None):
+        self._coroutine_function = coroutine_function
+        self._on_failure = on_failure or ack_failed
+        self.concurrency = concurrency
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name="processor-event-loop", daemon=True)
+        self._settle_executor = ThreadPoolExecutor(thread_name_prefix="processor-settle")
+        self._futures = set()
+        self._futures_lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of deliveries in flight on the event loop"""
+        return self.concurrency
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def start(self):
+        """Starts the event loop thread"""
+        self._thread.start()
+
+    def dispatch(self, delivery):
+        """Schedules a delivery on the event loop without waiting for it"""
+        future = asyncio.run_coroutine_threadsafe(self._run(delivery), self._loop)
+        with self._futures_lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+
+    def shutdown(self, timeout: float = None):
+        """
+        Waits for in-flight coroutines and stops the event loop, leaving it
+        running if they haven't finished after timeout seconds.
+        """
+        with self._futures_lock:
+            pending = list(self._futures)
+        _, not_done = wait(pending, timeout)
+        if not_done:
+            logger.warning("%s coroutines still running after %s seconds", len(not_done), timeout)
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._settle_executor.shutdown()
+
+    def _forget(self, future):
+        with self._futures_lock:
+            self._futures.discard(future)
+
+    async def _settle(self, settle: Callable, *args):
+        await self._loop.run_in_executor(self._settle_executor, settle, *args)
+
+    async def _run(self, delivery):
+        async with self._semaphore:
+            try:
+                with processing(delivery):
+                    await self._coroutine_function(delivery.body)
+            except Exception:  # pylint: disable=W0718
+                logger.exception("Error processing message...")
+                await self._settle(self._on_failure, delivery)
+                return
+        await self._settle(delivery.ack)
@@ -0,0 +1,125 @@
+"""
+Batch dispatch for processors with a process_batch() hook
+"""
+import threading
+import time
+from typing import Callable
+
+from logger import Logger
+from .context import processing
+from .retry import reject_failed
+
+logger = Logger().get_logger()
+
+
+class Batcher:
+    """
+    Accumulates deliveries and hands their bodies to the processor's
+    process_batch(messages) once batch_size messages are pending or the
+    oldest one has waited max_wait_ms. process_batch may return one result
+    per message: a truthy result acks the message and a falsy one is logged
+    and handed to on_failure, which rejects it without requeueing by default.
+    Returning None acks the whole batch, and raising fails all of it.
+    """
+
+    def __init__(self, batch_function: Callable, batch_size: int, max_wait_ms: int,
+                 num_workers: int = 1, on_failure: Callable = None):
+        self._batch_function = batch_function
+        self._on_failure = on_failure or reject_failed
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.num_workers = num_workers
+        self._pending = []
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._workers = []
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of deliveries held, one batch per worker plus one filling up"""
+        return self.batch_size * (self.num_workers + 1)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def start(self):
+        """Starts the threads that flush batches"""
+        self._stopping = False
+        for index in range(self.num_workers):
+            worker = threading.Thread(target=self._work, name=f"batch-worker-{index}",
+                                      daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def dispatch(self, delivery):
+        """Adds a delivery to the pending batch, blocking while the batcher is full"""
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._pending) < self.capacity)
+            self._pending.append(delivery)
+            self._condition.notify_all()
+
+    def shutdown(self, timeout: float = None):
+        """
+        Flushes pending deliveries and waits for the batch threads to exit,
+        giving up after timeout seconds if one is given.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        busy = sum(worker.is_alive() for worker in self._workers)
+        if busy:
+            logger.warning("%s batch workers still processing after %s seconds", busy, timeout)
+        self._workers = []
+
+    def _next_batch(self) -> list:
+        """Waits until a batch is due and takes it, returns [] once stopped and drained"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending or self._stopping)
+            if not self._pending:
+                return []
+            deadline = self._pending[0].received_at + self.max_wait
+            while len(self._pending) < self.batch_size and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            self._condition.notify_all()
+            return batch
+
+    def _work(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            self._run(batch)
+
+    def _run(self, batch: list):
+        try:
+            with processing(*batch):
+                results = self._batch_function([delivery.body for delivery in batch])
+        except Exception:  # pylint: disable=W0718
+            logger.exception("Error processing batch of %s messages...", len(batch))
+            results = [False] * len(batch)
+
+        if results is None:
+            results = [True] * len(batch)
+        elif len(results) != len(batch):
+            logger.error("process_batch returned %s results for %s messages, failing batch",
+                         len(results), len(batch))
+            results = [False] * len(batch)
+
+        for delivery, result in zip(batch, results):
+            if result:
+                delivery.ack()
+            else:
+                logger.error("Batch message %s failed", delivery.message_id)
+                self._on_failure(delivery)
@@ -0,0 +1,28 @@
+"""
+Context of the message currently being processed
+"""
+import contextvars
+from contextlib import contextmanager
+
+_current_deliveries = contextvars.ContextVar("current_deliveries", default=())
+
+
+@contextmanager
+def processing(*deliveries):
+    """Marks deliveries as the ones being processed in the current thread or task"""
+    token = _current_deliveries.set(deliveries)
+    try:
+        yield
+    finally:
+        _current_deliveries.reset(token)
+
+
+def get_current_deliveries() -> tuple:
+    """Returns the deliveries being processed, empty when called outside a pool"""
+    return _current_deliveries.get()
+
+
+def get_current_delivery():
+    """Returns the delivery being processed, or None"""
+    deliveries = _current_deliveries.get()
+    return deliveries[0] if deliveries else None
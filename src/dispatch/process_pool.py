@@ -0,0 +1,111 @@
+"""
+Process pool execution of the service processor
+"""
+import asyncio
+import inspect
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+from logger import Logger
+
+logger = Logger().get_logger()
+
+_worker_processor = None
+
+
+def _init_worker(processor_factory: Callable):
+    """Builds the service processor once in each worker process"""
+    global _worker_processor  # pylint: disable=W0603
+    _worker_processor = processor_factory()
+    if _worker_processor is None:
+        raise RuntimeError("Unable to build the service processor in worker process")
+
+
+def _process_in_worker(message):
+    """Processes message, the result stays in the worker as it may not pickle"""
+    result = _worker_processor.process(message)
+    if inspect.iscoroutine(result):
+        asyncio.run(result)
+
+
+def _noop():
+    return None
+
+
+class ProcessPool:
+    """
+    Runs the service processor in forked worker processes so CPU-bound
+    processors are not serialized by the GIL. Each worker builds its own
+    processor instance and receives message bodies over a pipe.
+    """
+
+    def __init__(self, processor_factory: Callable, num_workers: int):
+        self.num_workers = num_workers
+        self._processor_factory = processor_factory
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+
+    def _new_executor(self, start_method: str = "fork"):
+        return ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(self._processor_factory,)
+        )
+
+    def _replace_broken(self, executor):
+        """
+        Swaps a pool broken by a dead worker for a new one, once per broken
+        pool. By now the host has threads and an open connection, so the new
+        workers are started from a fresh interpreter instead of forked from it.
+        """
+        start_method = ("forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+                        else "spawn")
+        with self._lock:
+            if self._executor is not executor:
+                return
+            logger.error("A worker process died, restarting the process pool")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor(start_method)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def start(self):
+        """Forks the worker processes before any other host thread is started"""
+        self._executor.submit(_noop).result()
+
+    def process(self, message):
+        """
+        Runs message through a worker's processor and waits for it to finish.
+        When a worker dies, every message it had in flight fails with
+        BrokenProcessPool, so the pool is rebuilt and the message is tried
+        once more before the error is raised.
+        """
+        for attempt in range(2):
+            executor = self._executor
+            try:
+                return executor.submit(_process_in_worker, message).result()
+            except BrokenProcessPool:
+                self._replace_broken(executor)
+                if attempt:
+                    raise
+        return None
+
+    def shutdown(self, timeout: float = None):
+        """
+        Waits for running messages and stops the worker processes. With a
+        timeout, the dispatching pool has already waited out the grace period,
+        so queued messages are cancelled and running ones are not waited for.
+        """
+        if timeout is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            return
+        self._executor.shutdown(wait=True)
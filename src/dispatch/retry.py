@@ -0,0 +1,58 @@
+"""
+What happens to a delivery whose processing failed
+"""
+import random
+
+from logger import Logger
+
+logger = Logger().get_logger()
+
+# Caps the backoff exponent so the delay can't overflow
+MAX_BACKOFF_EXPONENT = 32
+
+
+def ack_failed(delivery):
+    """Drops a failed message, as rococo's own consumers do"""
+    delivery.ack()
+
+
+def reject_failed(delivery):
+    """Rejects a failed message without requeueing it, so a broker dead-letter exchange gets it"""
+    delivery.nack(requeue=False)
+
+
+class RetryPolicy:
+    """
+    Retries a failed message with exponential backoff and jitter, then moves
+    it to the dead-letter queue once it has failed max_attempts times. Without
+    a dead-letter queue, the message is dropped instead.
+    """
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float,
+                 dead_letter_queue: str = None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dead_letter_queue = dead_letter_queue
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait before delivering a message that failed attempt again"""
+        delay = min(self.max_delay,
+                    self.base_delay * 2 ** min(attempt - 1, MAX_BACKOFF_EXPONENT))
+        # Keep at least half the delay so retries never come back immediately
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def __call__(self, delivery):
+        if delivery.attempt < self.max_attempts:
+            delay = self.backoff(delivery.attempt)
+            logger.warning("Retrying message %s in %.1f seconds, attempt %s of %s failed",
+                           delivery.message_id, delay, delivery.attempt, self.max_attempts)
+            delivery.retry(delay)
+        elif self.dead_letter_queue is not None:
+            logger.error("Message %s failed %s times, moving it to %s",
+                         delivery.message_id, delivery.attempt, self.dead_letter_queue)
+            delivery.dead_letter(self.dead_letter_queue)
+        else:
+            logger.error("Message %s failed %s times, dropping it",
+                         delivery.message_id, delivery.attempt)
+            delivery.nack(requeue=False)
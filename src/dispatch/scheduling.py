@@ -0,0 +1,59 @@
+"""
+Policies deciding which queue a free worker takes its next delivery from
+"""
+
+
+class WeightedFair:
+    """
+    Shares worker time between queues in proportion to their weights, by
+    start-time fair queuing. Each queue has a virtual time that advances by
+    the time its deliveries took divided by its weight, and the queue with
+    work waiting and the lowest virtual time goes next. A picked delivery is
+    charged an estimate of its cost straight away, so that several workers
+    don't all pick the same queue, and corrected once it completes. A queue
+    that was idle starts from the current virtual time, so it can't bank
+    credit and then hog the workers.
+    """
+
+    # Weight of the latest duration in each queue's cost estimate
+    COST_SMOOTHING = 0.2
+
+    def __init__(self):
+        self._virtual_time = 0.0
+
+    def _candidates(self, ready):
+        return ready
+
+    def pick(self, ready):
+        """Returns the queue state to take a delivery from and the cost charged to it"""
+        for state in ready:
+            state.virtual_time = max(state.virtual_time, self._virtual_time)
+        chosen = min(self._candidates(ready), key=lambda state: state.virtual_time)
+        self._virtual_time = chosen.virtual_time
+        charged = chosen.cost_estimate
+        chosen.virtual_time += charged / chosen.weight
+        return chosen, charged
+
+    def complete(self, state, duration: float, charged: float):
+        """Corrects the charge of a delivery with the time it took"""
+        state.virtual_time += (duration - charged) / state.weight
+        state.cost_estimate += self.COST_SMOOTHING * (duration - state.cost_estimate)
+
+
+class StrictPriority(WeightedFair):
+    """
+    Always serves the queues with the highest priority first, and shares
+    workers between queues of the same priority like WeightedFair. A lower
+    priority queue only runs once the higher ones have nothing waiting, so
+    their concurrency limits are what keeps workers free for it.
+    """
+
+    def _candidates(self, ready):
+        top_priority = max(state.priority for state in ready)
+        return [state for state in ready if state.priority == top_priority]
+
+
+SCHEDULING_POLICIES = {
+    "weighted": WeightedFair,
+    "priority": StrictPriority,
+}
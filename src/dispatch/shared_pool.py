@@ -0,0 +1,175 @@
+"""
+Worker threads shared by the queues of several processors
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from logger import Logger
+from .context import processing
+from .retry import ack_failed
+from .scheduling import WeightedFair
+
+logger = Logger().get_logger()
+
+
+class _QueueState:
+    """Callback, limits and pending deliveries of one queue"""
+
+    def __init__(self, callback: Callable, capacity: int, weight: int, priority: int,
+                 on_failure: Callable, circuit_breaker=None):
+        self.callback = callback
+        self.capacity = capacity
+        self.weight = weight
+        self.priority = priority
+        self.on_failure = on_failure or ack_failed
+        self.circuit_breaker = circuit_breaker
+        self.pending = deque()
+        self.running = 0
+        self.virtual_time = 0.0
+        self.cost_estimate = 1.0
+
+
+class SharedPool:
+    """
+    Runs the callbacks of several queues on one set of worker threads. Each
+    queue holds at most its capacity in deliveries, which is also the broker
+    prefetch for it, so a busy queue can't take every worker. Idle workers
+    ask the scheduling policy which queue to take the next delivery from,
+    WeightedFair by default. While a queue's circuit breaker isn't closed,
+    its deliveries stay queued rather than holding workers, and then run one
+    at a time once the breaker lets a probe through. With an AdaptiveLimiter,
+    only as many workers as its limit run at once.
+    """
+
+    def __init__(self, num_workers: int, shutdown=None, policy=None, limiter=None):
+        self.num_workers = num_workers
+        self._coordinator = shutdown
+        self._limiter = limiter
+        self._policy = policy or WeightedFair()
+        self._queues = {}
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._workers = []
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of deliveries held by the pool, running or queued"""
+        return sum(state.capacity for state in self._queues.values())
+
+    def add_queue(self, queue_name: str, callback: Callable, capacity: int,
+                  weight: int = 1, priority: int = 0, on_failure: Callable = None,
+                  circuit_breaker=None):
+        """
+        Registers the callback deliveries from queue_name are run with, and
+        the circuit breaker that callback is wrapped with, if any.
+        """
+        self._queues[queue_name] = _QueueState(callback, capacity, weight, priority, on_failure,
+                                               circuit_breaker)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def start(self):
+        """Starts the worker threads"""
+        self._stopping = False
+        for index in range(self.num_workers):
+            worker = threading.Thread(target=self._work, name=f"processor-worker-{index}",
+                                      daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def dispatch(self, delivery):
+        """Queues a delivery behind the others from its queue"""
+        with self._condition:
+            self._queues[delivery.queue_name].pending.append(delivery)
+            self._condition.notify()
+
+    def shutdown(self, timeout: float = None):
+        """
+        Lets the workers finish queued deliveries and waits for them to exit,
+        giving up after timeout seconds if one is given.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        busy = sum(worker.is_alive() for worker in self._workers)
+        if busy:
+            logger.warning("%s workers still processing after %s seconds", busy, timeout)
+        self._workers = []
+
+    @staticmethod
+    def _paused_for(state):
+        """
+        Seconds the queue's circuit breaker keeps its deliveries waiting, 0 until
+        its running delivery completes while it isn't closed, or None if they may run.
+        """
+        breaker = state.circuit_breaker
+        if breaker is None:
+            return None
+        paused_for = breaker.paused_for()
+        if paused_for is None and not breaker.closed and state.running:
+            return 0
+        return paused_for
+
+    def _next(self):
+        """Takes the next delivery the policy picks, None once stopped and empty"""
+        with self._condition:
+            while True:
+                ready, timeout = [], None
+                for state in self._queues.values():
+                    if not state.pending:
+                        continue
+                    # Paused deliveries are still drained on shutdown
+                    paused_for = None if self._stopping else self._paused_for(state)
+                    if paused_for is None:
+                        ready.append(state)
+                    elif paused_for > 0:
+                        timeout = paused_for if timeout is None else min(timeout, paused_for)
+                if ready:
+                    break
+                if self._stopping:
+                    return None
+                self._condition.wait(timeout)
+            state, charged = self._policy.pick(ready)
+            state.running += 1
+            return state, state.pending.popleft(), charged
+
+    def _work(self):
+        while True:
+            entry = self._next()
+            if entry is None:
+                return
+            state, delivery, charged = entry
+            if self._coordinator is not None and self._coordinator.requested:
+                delivery.nack(requeue=True)
+                continue
+            if self._limiter is not None:
+                self._limiter.acquire()
+            started_at = time.monotonic()
+            failed = False
+            try:
+                with processing(delivery):
+                    state.callback(delivery.body)
+            except Exception:  # pylint: disable=W0718
+                logger.exception("Error processing message from %s...", delivery.queue_name)
+                state.on_failure(delivery)
+                failed = True
+            else:
+                delivery.ack()
+            duration = time.monotonic() - started_at
+            if self._limiter is not None:
+                self._limiter.release(duration, failed)
+            with self._condition:
+                state.running -= 1
+                self._policy.complete(state, duration, charged)
+                # A paused queue may be able to run again
+                self._condition.notify_all()
@@ -0,0 +1,108 @@
+"""
+Thread pool dispatch of deliveries to the service processor
+"""
+import queue
+import threading
+import time
+from typing import Callable
+
+from logger import Logger
+from .context import processing
+from .retry import ack_failed
+
+logger = Logger().get_logger()
+
+
+class WorkerPool:
+    """
+    Runs the processor callback on a fixed number of worker threads that pull
+    deliveries from a bounded in-process queue. Each delivery is acked only
+    after its callback has returned, or handed to on_failure if it raised.
+    Once the optional ShutdownCoordinator is requested, queued deliveries are
+    nacked back to the broker instead of run. With an AdaptiveLimiter, only
+    as many workers as its limit run at once.
+    """
+
+    def __init__(self, callback: Callable, num_workers: int, queue_size: int = None,
+                 shutdown=None, on_failure: Callable = None, limiter=None):
+        self._callback = callback
+        self._coordinator = shutdown
+        self._limiter = limiter
+        self._on_failure = on_failure or ack_failed
+        self.num_workers = num_workers
+        self.queue_size = num_workers if queue_size is None else queue_size
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._workers = []
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of deliveries held by the pool, running or queued"""
+        return self.num_workers + self.queue_size
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def start(self):
+        """Starts the worker threads"""
+        for index in range(self.num_workers):
+            worker = threading.Thread(target=self._work, name=f"processor-worker-{index}",
+                                      daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def dispatch(self, delivery):
+        """Queues a delivery for processing, blocking while the queue is full"""
+        self._queue.put(delivery)
+
+    def shutdown(self, timeout: float = None):
+        """
+        Lets the workers finish queued deliveries and waits for them to exit,
+        giving up after timeout seconds if one is given.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def _remaining():
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        try:
+            for _ in self._workers:
+                self._queue.put(None, timeout=_remaining())
+        except queue.Full:
+            pass
+        for worker in self._workers:
+            worker.join(_remaining())
+        busy = sum(worker.is_alive() for worker in self._workers)
+        if busy:
+            logger.warning("%s workers still processing after %s seconds", busy, timeout)
+        self._workers = []
+
+    def _work(self):
+        while True:
+            delivery = self._queue.get()
+            if delivery is None:
+                return
+            if self._coordinator is not None and self._coordinator.requested:
+                delivery.nack(requeue=True)
+                continue
+            if self._limiter is None:
+                self._run(delivery)
+                continue
+            self._limiter.acquire()
+            started_at = time.monotonic()
+            succeeded = self._run(delivery)
+            self._limiter.release(time.monotonic() - started_at, failed=not succeeded)
+
+    def _run(self, delivery) -> bool:
+        try:
+            with processing(delivery):
+                self._callback(delivery.body)
+        except Exception:  # pylint: disable=W0718
+            logger.exception("Error processing message...")
+            self._on_failure(delivery)
+            return False
+        delivery.ack()
+        return True
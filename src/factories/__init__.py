@@ -3,4 +3,9 @@ factory for message adapter, service processor and config
 """
 from .message_adapter_factory import get_message_adapter
 from .service_processor_factory import get_service_processor
+from .hooks_factory import get_hooks, get_profiler
+from .dedup_factory import get_deduplicator
+from .rate_limit_factory import get_rate_limiter
+from .circuit_breaker_factory import get_circuit_breaker
+from .leader_election_factory import get_leader_election
 from .config_factory import Config
@@ -0,0 +1,20 @@
+"""
+Circuit breaker factory
+"""
+from typing import Optional
+from circuit_breaker import CircuitBreaker
+from .config_factory import Config
+
+
+def get_circuit_breaker(config: Config, name: str,
+                        shutdown=None) -> Optional[CircuitBreaker]:
+    """
+    Returns the CircuitBreaker for CIRCUIT_BREAKER_FAILURE_RATIO, None when it isn't set
+    """
+    if config.circuit_breaker_failure_ratio is None:
+        return None
+    return CircuitBreaker(name, config.circuit_breaker_failure_ratio,
+                          config.circuit_breaker_window_seconds,
+                          config.circuit_breaker_min_calls,
+                          config.circuit_breaker_open_seconds,
+                          config.circuit_breaker_probes, shutdown)
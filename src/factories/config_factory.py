@@ -1,14 +1,23 @@
 """
 Host Config class
 """
+import copy
+from typing import Optional
+
 from rococo.config import BaseConfig
 from logger import Logger
 
-from apscheduler.triggers.cron import CronTrigger
-
 
 logger = Logger().get_logger()
 
+VALID_MESSAGING_TYPES = ["RabbitMqConnection", "SqsConnection", "LocalQueueConnection"]
+VALID_EXECUTION_POOLS = ["inline", "thread", "process"]
+VALID_DEDUP_STORES = ["memory", "sqlite"]
+VALID_DEDUP_KEYS = ["message_id", "content"]
+VALID_QUEUE_SCHEDULING = ["weighted", "priority"]
+VALID_RATE_LIMIT_BACKENDS = ["memory", "file"]
+VALID_CRON_LEADER_BACKENDS = ["sqlite"]
+
 
 class Config(BaseConfig):
     """
@@ -19,18 +28,69 @@ class Config(BaseConfig):
         super().__init__()
         self.messaging_type = None
         self.processor_type = None
+        self.processor_types = []
+        self.queue_concurrency = None
+        self.queue_weight = 1
+        self.queue_priority = 0
+        self.queue_scheduling = "weighted"
         self.num_threads = 1
+        self.worker_queue_size = None
+        self.execution_pool = "inline"
+        self.concurrency_min = None
+        self.concurrency_max = None
+        self.concurrency_latency_tolerance = 2.0
+        self.concurrency_max_error_rate = 0.1
+        self.async_concurrency = 100
+        self.batch_size = 100
+        self.batch_max_wait_ms = 1000
+        self.metrics_port = None
+        self.hooks_module = None
+        self.shutdown_grace_seconds = None
+        self.retry_max_attempts = None
+        self.retry_base_delay_ms = 1000
+        self.retry_max_delay_ms = 300000
+        self.rate_limit_per_second = None
+        self.rate_limit_burst = None
+        self.rate_limit_backend = "memory"
+        self.rate_limit_file = "/tmp/rococo_service_host_rate_limit.json"
+        self.circuit_breaker_failure_ratio = None
+        self.circuit_breaker_window_seconds = 60.0
+        self.circuit_breaker_min_calls = 10
+        self.circuit_breaker_open_seconds = 30.0
+        self.circuit_breaker_probes = 3
+        self.dedup_store = None
+        self.dedup_key = "message_id"
+        self.dedup_ttl_seconds = 3600
+        self.dedup_max_entries = 100000
+        self.dedup_sqlite_path = "/tmp/rococo_service_host_dedup.sqlite3"
+        self.profile_dir = None
+        self.profile_slowest_percent = 1.0
+        self.profile_sample_rate = 1.0
+        self.startup_profile = False
+        self.reload_on_change = False
+        self.reload_on_sighup = False
+        self.reload_poll_seconds = 2.0
         self.cron_time = ""
         self.cron_expressions = []
         self.run_at_startup = False
+        self.cron_max_instances = 1
+        self.cron_coalesce = True
+        self.cron_misfire_grace_seconds = None
+        self.cron_leader_backend = None
+        self.cron_leader_name = None
+        self.cron_leader_ttl_seconds = 30.0
+        self.cron_shards = None
+        self.cron_leader_sqlite_path = "/tmp/rococo_service_host_leader.sqlite3"
         self.messaging_constructor_params = ()
+        self.prefetch_count = None
+        self.consume_params = {}
         self.service_constructor_params = ()
 
     def _validate_messaging_and_execution_type(self) -> bool:
         """Validate MESSAGING_TYPE and EXECUTION_TYPE environment variables"""
         if (self.get_env_var("EXECUTION_TYPE")
             and self.get_env_var("EXECUTION_TYPE") not in ["CRON"]) and (
-                self.get_env_var("MESSAGING_TYPE") not in ["RabbitMqConnection", "SqsConnection"]):
+                self.get_env_var("MESSAGING_TYPE") not in VALID_MESSAGING_TYPES):
             logger.error("Invalid value for MESSAGING_TYPE env var %s",
                          self.get_env_var("MESSAGING_TYPE"))
             return False
@@ -50,6 +110,8 @@ class Config(BaseConfig):
 
     def _validate_cron_expressions(self) -> bool:
         """Validate CRON_EXPRESSIONS environment variable"""
+        # apscheduler is only imported by containers that use cron expressions
+        from apscheduler.triggers.cron import CronTrigger  # pylint: disable=C0415
         cron_expressions = self.get_env_var("CRON_EXPRESSIONS").split(",")
         for cron_expression in cron_expressions:
             try:
@@ -117,8 +179,8 @@ class Config(BaseConfig):
         return True
 
     def _validate_cron_config(self) -> bool:
-        """Validate CRON configuration"""
-        if self.get_env_var("EXECUTION_TYPE") != "CRON":
+        """Validate CRON configuration, which HYBRID execution uses too"""
+        if self.get_env_var("EXECUTION_TYPE") not in ["CRON", "HYBRID"]:
             return True
 
         if self.get_env_var("CRON_EXPRESSIONS"):
@@ -126,6 +188,69 @@ class Config(BaseConfig):
         else:
             return self._validate_cron_convenience_fields()
 
+    def _setup_cron_job_params(self) -> bool:
+        """Setup how cron runs may overlap, each can be set per processor"""
+        if self.get_optional_env_var("EXECUTION_TYPE") not in ["CRON", "HYBRID"]:
+            return True
+        try:
+            self.cron_max_instances = self._get_processor_number_env_var(
+                "CRON_MAX_INSTANCES", default=self.cron_max_instances)
+            self.cron_misfire_grace_seconds = self._get_processor_number_env_var(
+                "CRON_MISFIRE_GRACE_SECONDS", float)
+        except ValueError:
+            return False
+        coalesce = (self.get_optional_env_var(f"{self.processor_type}_CRON_COALESCE") or
+                    self.get_optional_env_var("CRON_COALESCE"))
+        if coalesce:
+            self.cron_coalesce = coalesce.lower() in ["true", "1"]
+        if self.cron_max_instances < 1:
+            logger.error("Invalid value for CRON_MAX_INSTANCES %s . Expected at least 1",
+                         self.cron_max_instances)
+            return False
+        if self.cron_misfire_grace_seconds is not None and self.cron_misfire_grace_seconds < 0:
+            logger.error("Invalid value for CRON_MISFIRE_GRACE_SECONDS %s . Expected >= 0",
+                         self.cron_misfire_grace_seconds)
+            return False
+        return True
+
+    def _setup_cron_leader_params(self) -> bool:
+        """Setup leader election or sharding between cron replicas, enabled by CRON_LEADER_BACKEND"""
+        if self.get_optional_env_var("EXECUTION_TYPE") not in ["CRON", "HYBRID"]:
+            return True
+        self.cron_leader_backend = self.get_optional_env_var("CRON_LEADER_BACKEND")
+        try:
+            self.cron_shards = self._get_number_env_var("CRON_SHARDS")
+        except ValueError:
+            return False
+        if self.cron_leader_backend is None:
+            if self.cron_shards is not None:
+                logger.error("CRON_SHARDS needs CRON_LEADER_BACKEND to spread shards over replicas")
+                return False
+            return True
+        if self.cron_shards is not None and self.cron_shards < 1:
+            logger.error("Invalid value for CRON_SHARDS %s . Expected at least 1", self.cron_shards)
+            return False
+        if self.cron_leader_backend.lower() in VALID_CRON_LEADER_BACKENDS:
+            self.cron_leader_backend = self.cron_leader_backend.lower()
+        elif "." not in self.cron_leader_backend:
+            logger.error("Invalid CRON_LEADER_BACKEND %s . Expected one of %s or module.ClassName",
+                         self.cron_leader_backend, VALID_CRON_LEADER_BACKENDS)
+            return False
+        self.cron_leader_name = (self.get_optional_env_var("CRON_LEADER_NAME") or
+                                 self.processor_type)
+        self.cron_leader_sqlite_path = (self.get_optional_env_var("CRON_LEADER_SQLITE_PATH") or
+                                        self.cron_leader_sqlite_path)
+        try:
+            self.cron_leader_ttl_seconds = self._get_number_env_var(
+                "CRON_LEADER_TTL_SECONDS", float, default=self.cron_leader_ttl_seconds)
+        except ValueError:
+            return False
+        if self.cron_leader_ttl_seconds <= 0:
+            logger.error("Invalid value for CRON_LEADER_TTL_SECONDS %s . Expected > 0",
+                         self.cron_leader_ttl_seconds)
+            return False
+        return True
+
     def _setup_rabbitmq_params(self) -> bool:
         """Setup RabbitMQ connection parameters"""
         self.messaging_constructor_params = (
@@ -136,17 +261,25 @@ class Config(BaseConfig):
             self.get_env_var('RABBITMQ_VIRTUAL_HOST'),
             self.get_env_var('CONSUME_CONFIG_FILE_PATH')
         )
-        if self.get_env_var("RABBITMQ_NUM_THREADS"):
+        if self.get_optional_env_var("RABBITMQ_NUM_THREADS"):
             try:
                 self.num_threads = int(
-                    self.get_env_var("RABBITMQ_NUM_THREADS"))
+                    self.get_optional_env_var("RABBITMQ_NUM_THREADS"))
             except (TypeError, ValueError):
                 logger.error("Invalid value for RABBITMQ_NUM_THREADS %s . Expected int",
-                             self.get_env_var("RABBITMQ_NUM_THREADS"))
+                             self.get_optional_env_var("RABBITMQ_NUM_THREADS"))
                 return False
+        try:
+            self.prefetch_count = self._get_number_env_var("PREFETCH_COUNT")
+        except ValueError:
+            return False
+        if self.prefetch_count is not None and self.prefetch_count < 1:
+            logger.error("Invalid value for PREFETCH_COUNT %s . Expected at least 1",
+                         self.prefetch_count)
+            return False
         return True
 
-    def _setup_sqs_params(self):
+    def _setup_sqs_params(self) -> bool:
         """Setup SQS connection parameters"""
         self.messaging_constructor_params = (
             self.get_env_var('AWS_ACCESS_KEY_ID'),
@@ -155,6 +288,364 @@ class Config(BaseConfig):
             self.get_env_var('AWS_REGION'),
             self.get_env_var('CONSUME_CONFIG_FILE_PATH')
         )
+        try:
+            max_messages = self._get_number_env_var("MAX_MESSAGES_PER_RECEIVE")
+            wait_time_seconds = self._get_number_env_var("WAIT_TIME_SECONDS")
+        except ValueError:
+            return False
+        if max_messages is not None:
+            if not 1 <= max_messages <= 10:
+                logger.error("Invalid value for MAX_MESSAGES_PER_RECEIVE %s . "
+                             "Expected between 1 and 10", max_messages)
+                return False
+            self.consume_params["max_messages_per_receive"] = max_messages
+        if wait_time_seconds is not None:
+            if not 0 <= wait_time_seconds <= 20:
+                logger.error("Invalid value for WAIT_TIME_SECONDS %s . "
+                             "Expected between 0 and 20", wait_time_seconds)
+                return False
+            self.consume_params["wait_time_seconds"] = wait_time_seconds
+        return True
+
+    def _setup_local_queue_params(self):
+        """Setup local queue parameters, queues are kept in memory without LOCAL_QUEUE_DIR"""
+        self.messaging_constructor_params = (
+            self.get_optional_env_var('LOCAL_QUEUE_DIR'),
+            self.get_env_var('CONSUME_CONFIG_FILE_PATH')
+        )
+
+    def get_optional_env_var(self, var_name: str) -> Optional[str]:
+        """Like get_env_var, without the warning when the variable is not set"""
+        return self.env_vars.get(var_name)
+
+    def _get_number_env_var(self, env_var: str, cast=int, default=None):
+        """
+        Returns env_var converted with cast, or default when it is not set.
+        Logs and raises ValueError when the value can't be converted.
+        """
+        value = self.get_optional_env_var(env_var)
+        if not value:
+            return default
+        try:
+            return cast(value)
+        except (TypeError, ValueError) as e:
+            logger.error("Invalid value for %s %s . Expected %s",
+                         env_var, value, cast.__name__)
+            raise ValueError(f"Invalid value for {env_var}") from e
+
+    def _get_processor_number_env_var(self, env_var: str, cast=int, default=None):
+        """Like _get_number_env_var, but {PROCESSOR_TYPE}_<env_var> takes precedence"""
+        processor_env_var = f"{self.processor_type}_{env_var}"
+        if self.processor_type and self.get_optional_env_var(processor_env_var):
+            return self._get_number_env_var(processor_env_var, cast, default)
+        return self._get_number_env_var(env_var, cast, default)
+
+    def _setup_retry_params(self) -> bool:
+        """Setup the retry policy, enabled by RETRY_MAX_ATTEMPTS"""
+        if self.get_optional_env_var("EXECUTION_TYPE") in ["CRON"]:
+            return True
+        try:
+            self.retry_max_attempts = self._get_processor_number_env_var("RETRY_MAX_ATTEMPTS")
+            self.retry_base_delay_ms = self._get_processor_number_env_var(
+                "RETRY_BASE_DELAY_MS", default=self.retry_base_delay_ms)
+            self.retry_max_delay_ms = self._get_processor_number_env_var(
+                "RETRY_MAX_DELAY_MS", default=self.retry_max_delay_ms)
+        except ValueError:
+            return False
+        if self.retry_max_attempts is not None and self.retry_max_attempts < 1:
+            logger.error("Invalid value for RETRY_MAX_ATTEMPTS %s . Expected at least 1",
+                         self.retry_max_attempts)
+            return False
+        if not 0 <= self.retry_base_delay_ms <= self.retry_max_delay_ms:
+            logger.error("Invalid retry delays RETRY_BASE_DELAY_MS %s and RETRY_MAX_DELAY_MS %s . "
+                         "Expected 0 <= base <= max", self.retry_base_delay_ms,
+                         self.retry_max_delay_ms)
+            return False
+        return True
+
+    def _setup_queue_params(self) -> bool:
+        """Setup the concurrency limit, weight and priority of this processor's queue"""
+        try:
+            self.queue_concurrency = self._get_processor_number_env_var(
+                "CONCURRENCY", default=self.num_threads)
+            self.queue_weight = self._get_processor_number_env_var("WEIGHT", default=1)
+            self.queue_priority = self._get_processor_number_env_var("PRIORITY", default=0)
+        except ValueError:
+            return False
+        if self.queue_concurrency < 1 or self.queue_weight < 1:
+            logger.error("Invalid %s_CONCURRENCY %s or %s_WEIGHT %s . Expected at least 1",
+                         self.processor_type, self.queue_concurrency,
+                         self.processor_type, self.queue_weight)
+            return False
+        return True
+
+    def for_processor(self, processor_type: str) -> Optional["Config"]:
+        """
+        Returns a copy of the config for one of the PROCESSOR_TYPE processors,
+        with its own retry settings, concurrency and weight. None if they are invalid.
+        """
+        processor_config = copy.copy(self)
+        processor_config.processor_type = processor_type
+        processor_config.processor_types = [processor_type]
+        if not processor_config._setup_retry_params():
+            return None
+        if not processor_config._setup_queue_params():
+            return None
+        if not processor_config._setup_circuit_breaker_params():
+            return None
+        return processor_config
+
+    def _setup_multi_queue_params(self) -> bool:
+        """Validate the processors when PROCESSOR_TYPE lists several of them"""
+        if len(self.processor_types) < 2:
+            return True
+        if self.get_optional_env_var("EXECUTION_TYPE") in ["CRON"]:
+            logger.error("PROCESSOR_TYPE lists several processors, which CRON doesn't support")
+            return False
+        if self.execution_pool == "process":
+            logger.error("EXECUTION_POOL=process is not supported with several PROCESSOR_TYPEs")
+            return False
+        self.queue_scheduling = (self.get_optional_env_var("QUEUE_SCHEDULING") or
+                                 self.queue_scheduling).lower()
+        if self.queue_scheduling not in VALID_QUEUE_SCHEDULING:
+            logger.error("Invalid QUEUE_SCHEDULING %s . Expected one of %s",
+                         self.queue_scheduling, VALID_QUEUE_SCHEDULING)
+            return False
+        for processor_type in self.processor_types:
+            if not self.get_optional_env_var(f"{processor_type}_QUEUE_NAME"):
+                logger.error("Missing %s_QUEUE_NAME env var", processor_type)
+                return False
+            if self.for_processor(processor_type) is None:
+                return False
+        return True
+
+    def _setup_circuit_breaker_params(self) -> bool:
+        """Setup the circuit breaker, enabled by CIRCUIT_BREAKER_FAILURE_RATIO"""
+        if self.get_optional_env_var("EXECUTION_TYPE") in ["CRON"]:
+            return True
+        try:
+            self.circuit_breaker_failure_ratio = self._get_processor_number_env_var(
+                "CIRCUIT_BREAKER_FAILURE_RATIO", float)
+            self.circuit_breaker_window_seconds = self._get_processor_number_env_var(
+                "CIRCUIT_BREAKER_WINDOW_SECONDS", float,
+                default=self.circuit_breaker_window_seconds)
+            self.circuit_breaker_min_calls = self._get_processor_number_env_var(
+                "CIRCUIT_BREAKER_MIN_CALLS", default=self.circuit_breaker_min_calls)
+            self.circuit_breaker_open_seconds = self._get_processor_number_env_var(
+                "CIRCUIT_BREAKER_OPEN_SECONDS", float,
+                default=self.circuit_breaker_open_seconds)
+            self.circuit_breaker_probes = self._get_processor_number_env_var(
+                "CIRCUIT_BREAKER_PROBES", default=self.circuit_breaker_probes)
+        except ValueError:
+            return False
+        if self.circuit_breaker_failure_ratio is None:
+            return True
+        if not 0 < self.circuit_breaker_failure_ratio <= 1:
+            logger.error("Invalid CIRCUIT_BREAKER_FAILURE_RATIO %s . Expected (0, 1]",
+                         self.circuit_breaker_failure_ratio)
+            return False
+        if self.circuit_breaker_min_calls < 1 or self.circuit_breaker_probes < 1:
+            logger.error("Invalid CIRCUIT_BREAKER_MIN_CALLS %s or CIRCUIT_BREAKER_PROBES %s . "
+                         "Expected at least 1", self.circuit_breaker_min_calls,
+                         self.circuit_breaker_probes)
+            return False
+        if self.execution_pool == "inline":
+            if self.get_optional_env_var("EXECUTION_POOL"):
+                logger.error("CIRCUIT_BREAKER_FAILURE_RATIO needs EXECUTION_POOL thread or process")
+                return False
+            # A paused call holds a worker, not the consumer thread
+            self.execution_pool = "thread"
+        return True
+
+    def _setup_rate_limit_params(self) -> bool:
+        """Setup the token bucket pacing process calls, enabled by RATE_LIMIT_PER_SECOND"""
+        try:
+            self.rate_limit_per_second = self._get_number_env_var("RATE_LIMIT_PER_SECOND", float)
+            self.rate_limit_burst = self._get_number_env_var("RATE_LIMIT_BURST", float)
+        except ValueError:
+            return False
+        if self.rate_limit_per_second is None:
+            return True
+        if self.rate_limit_per_second <= 0:
+            logger.error("Invalid value for RATE_LIMIT_PER_SECOND %s . Expected > 0",
+                         self.rate_limit_per_second)
+            return False
+        if self.rate_limit_burst is None:
+            self.rate_limit_burst = max(1.0, self.rate_limit_per_second)
+        if self.rate_limit_burst < 1:
+            logger.error("Invalid value for RATE_LIMIT_BURST %s . Expected >= 1",
+                         self.rate_limit_burst)
+            return False
+        self.rate_limit_backend = (self.get_optional_env_var("RATE_LIMIT_BACKEND") or
+                                   self.rate_limit_backend)
+        if self.rate_limit_backend.lower() in VALID_RATE_LIMIT_BACKENDS:
+            self.rate_limit_backend = self.rate_limit_backend.lower()
+        elif "." not in self.rate_limit_backend:
+            logger.error("Invalid RATE_LIMIT_BACKEND %s . Expected one of %s or module.ClassName",
+                         self.rate_limit_backend, VALID_RATE_LIMIT_BACKENDS)
+            return False
+        self.rate_limit_file = (self.get_optional_env_var("RATE_LIMIT_FILE") or
+                                self.rate_limit_file)
+        return True
+
+    def _setup_dedup_params(self) -> bool:
+        """Setup message deduplication, enabled by DEDUP_STORE"""
+        if self.get_optional_env_var("EXECUTION_TYPE") in ["CRON"]:
+            return True
+        self.dedup_store = self.get_optional_env_var("DEDUP_STORE")
+        if self.dedup_store is not None:
+            self.dedup_store = self.dedup_store.lower()
+            if self.dedup_store not in VALID_DEDUP_STORES:
+                logger.error("Invalid DEDUP_STORE %s . Expected one of %s",
+                             self.dedup_store, VALID_DEDUP_STORES)
+                return False
+        self.dedup_key = (self.get_optional_env_var("DEDUP_KEY") or self.dedup_key).lower()
+        if self.dedup_key not in VALID_DEDUP_KEYS:
+            logger.error("Invalid DEDUP_KEY %s . Expected one of %s",
+                         self.dedup_key, VALID_DEDUP_KEYS)
+            return False
+        self.dedup_sqlite_path = (self.get_optional_env_var("DEDUP_SQLITE_PATH") or
+                                  self.dedup_sqlite_path)
+        try:
+            self.dedup_ttl_seconds = self._get_number_env_var(
+                "DEDUP_TTL_SECONDS", float, default=self.dedup_ttl_seconds)
+            self.dedup_max_entries = self._get_number_env_var(
+                "DEDUP_MAX_ENTRIES", default=self.dedup_max_entries)
+        except ValueError:
+            return False
+        return True
+
+    def _setup_worker_params(self) -> bool:
+        """Setup the worker pool that messages are dispatched to"""
+        if self.get_optional_env_var("EXECUTION_TYPE") in ["CRON"]:
+            return True
+
+        try:
+            self.num_threads = self._get_number_env_var("NUM_WORKERS",
+                                                        default=self.num_threads)
+            self.worker_queue_size = self._get_number_env_var("WORKER_QUEUE_SIZE")
+            self.async_concurrency = self._get_number_env_var("ASYNC_CONCURRENCY",
+                                                              default=self.async_concurrency)
+            self.batch_size = self._get_number_env_var("BATCH_SIZE", default=self.batch_size)
+            self.batch_max_wait_ms = self._get_number_env_var("BATCH_MAX_WAIT_MS",
+                                                              default=self.batch_max_wait_ms)
+        except ValueError:
+            return False
+
+        execution_pool = self.get_optional_env_var("EXECUTION_POOL")
+        if execution_pool:
+            execution_pool = execution_pool.lower()
+            if execution_pool not in VALID_EXECUTION_POOLS:
+                logger.error("Invalid value for EXECUTION_POOL env var %s. Expected one of %s",
+                             execution_pool, VALID_EXECUTION_POOLS)
+                return False
+            self.execution_pool = execution_pool
+        else:
+            self.execution_pool = "thread" if self.num_threads > 1 else "inline"
+        return True
+
+    def _setup_concurrency_params(self) -> bool:
+        """Setup the adaptive concurrency limit, enabled by CONCURRENCY_MAX"""
+        if self.get_optional_env_var("EXECUTION_TYPE") in ["CRON"]:
+            return True
+        try:
+            self.concurrency_max = self._get_number_env_var("CONCURRENCY_MAX")
+            self.concurrency_min = self._get_number_env_var("CONCURRENCY_MIN", default=1)
+            self.concurrency_latency_tolerance = self._get_number_env_var(
+                "CONCURRENCY_LATENCY_TOLERANCE", float,
+                default=self.concurrency_latency_tolerance)
+            self.concurrency_max_error_rate = self._get_number_env_var(
+                "CONCURRENCY_MAX_ERROR_RATE", float, default=self.concurrency_max_error_rate)
+        except ValueError:
+            return False
+        if self.concurrency_max is None:
+            self.concurrency_min = None
+            return True
+        if not 1 <= self.concurrency_min <= self.concurrency_max:
+            logger.error("Invalid CONCURRENCY_MIN %s and CONCURRENCY_MAX %s . "
+                         "Expected 1 <= min <= max", self.concurrency_min, self.concurrency_max)
+            return False
+        if self.concurrency_latency_tolerance <= 1:
+            logger.error("Invalid CONCURRENCY_LATENCY_TOLERANCE %s . Expected more than 1",
+                         self.concurrency_latency_tolerance)
+            return False
+        if self.get_optional_env_var("EXECUTION_POOL") and self.execution_pool == "inline":
+            logger.error("CONCURRENCY_MAX needs EXECUTION_POOL thread or process")
+            return False
+        # One worker per slot, the limiter decides how many of them run
+        self.num_threads = self.concurrency_max
+        if self.execution_pool == "inline":
+            self.execution_pool = "thread"
+        return True
+
+    def _setup_metrics_params(self) -> bool:
+        """Setup the port metrics are served on, metrics are disabled without METRICS_PORT"""
+        try:
+            self.metrics_port = self._get_number_env_var("METRICS_PORT")
+        except ValueError:
+            return False
+        return True
+
+    def _setup_shutdown_params(self) -> bool:
+        """Setup SHUTDOWN_GRACE_SECONDS, which enables draining on SIGTERM"""
+        try:
+            self.shutdown_grace_seconds = self._get_number_env_var("SHUTDOWN_GRACE_SECONDS", float)
+        except ValueError:
+            return False
+        if self.shutdown_grace_seconds is not None and self.shutdown_grace_seconds < 0:
+            logger.error("Invalid value for SHUTDOWN_GRACE_SECONDS %s . Expected >= 0",
+                         self.shutdown_grace_seconds)
+            return False
+        return True
+
+    def _setup_hooks_params(self) -> bool:
+        """Setup HOOKS_MODULE and the slow message profiler, enabled by PROFILE_DIR"""
+        self.hooks_module = self.get_optional_env_var("HOOKS_MODULE")
+        self.profile_dir = self.get_optional_env_var("PROFILE_DIR")
+        try:
+            self.profile_slowest_percent = self._get_number_env_var(
+                "PROFILE_SLOWEST_PERCENT", float, default=self.profile_slowest_percent)
+            self.profile_sample_rate = self._get_number_env_var(
+                "PROFILE_SAMPLE_RATE", float, default=self.profile_sample_rate)
+        except ValueError:
+            return False
+        if not 0 < self.profile_slowest_percent <= 100:
+            logger.error("Invalid value for PROFILE_SLOWEST_PERCENT %s . Expected (0, 100]",
+                         self.profile_slowest_percent)
+            return False
+        return True
+
+    def _setup_reload_params(self) -> bool:
+        """Setup hot reload of the processor, on SIGHUP or when its source changes"""
+        self.reload_on_change = (
+            self.get_optional_env_var("RELOAD_ON_CHANGE") or "").lower() in ["true", "1"]
+        self.reload_on_sighup = self.reload_on_change or (
+            self.get_optional_env_var("RELOAD_ON_SIGHUP") or "").lower() in ["true", "1"]
+        try:
+            self.reload_poll_seconds = self._get_number_env_var(
+                "RELOAD_POLL_SECONDS", float, default=self.reload_poll_seconds)
+        except ValueError:
+            return False
+        if self.reload_poll_seconds <= 0:
+            logger.error("Invalid value for RELOAD_POLL_SECONDS %s . Expected > 0",
+                         self.reload_poll_seconds)
+            return False
+        if self.reload_on_sighup and self.execution_pool == "process":
+            logger.warning("Hot reload is not supported with EXECUTION_POOL=process, ignoring it")
+            self.reload_on_change = self.reload_on_sighup = False
+        return True
+
+    def _validate_hybrid_params(self) -> bool:
+        """HYBRID execution runs cron jobs on the processor instance that consumes messages"""
+        if self.get_optional_env_var("EXECUTION_TYPE") != "HYBRID":
+            return True
+        if len(self.processor_types) > 1:
+            logger.error("EXECUTION_TYPE=HYBRID takes a single PROCESSOR_TYPE")
+            return False
+        if self.execution_pool == "process":
+            logger.error("EXECUTION_TYPE=HYBRID is not supported with EXECUTION_POOL=process")
+            return False
+        return True
 
     def _setup_messaging_params(self) -> bool:
         """Setup messaging parameters based on messaging type"""
@@ -165,7 +656,9 @@ class Config(BaseConfig):
         if self.messaging_type == "RabbitMqConnection":
             return self._setup_rabbitmq_params()
         elif self.messaging_type == "SqsConnection":
-            self._setup_sqs_params()
+            return self._setup_sqs_params()
+        elif self.messaging_type == "LocalQueueConnection":
+            self._setup_local_queue_params()
             return True
         else:
             logger.error("Invalid MESSAGING_TYPE %s", self.messaging_type)
@@ -180,12 +673,50 @@ class Config(BaseConfig):
         if not self._validate_cron_config():
             return False
 
-        self.processor_type = self.get_env_var("PROCESSOR_TYPE")
+        self.startup_profile = (
+            self.get_optional_env_var("STARTUP_PROFILE") or "").lower() in ["true", "1"]
+        self.processor_types = [processor_type.strip() for processor_type in
+                                self.get_env_var("PROCESSOR_TYPE").split(",")
+                                if processor_type.strip()]
+        # Each processor's settings are read through for_processor
+        self.processor_type = (self.processor_types[0]
+                               if len(self.processor_types) == 1 else None)
         self.messaging_constructor_params = ()
+        self.prefetch_count = None
+        self.consume_params = {}
         self.num_threads = 1
+        self.execution_pool = "inline"
 
         if not self._setup_messaging_params():
             return False
+        if not self._setup_worker_params():
+            return False
+        if not self._setup_concurrency_params():
+            return False
+        if not self._validate_hybrid_params():
+            return False
+        if not self._setup_metrics_params():
+            return False
+        if not self._setup_hooks_params():
+            return False
+        if not self._setup_shutdown_params():
+            return False
+        if not self._setup_cron_job_params():
+            return False
+        if not self._setup_cron_leader_params():
+            return False
+        if not self._setup_reload_params():
+            return False
+        if not self._setup_retry_params():
+            return False
+        if not self._setup_rate_limit_params():
+            return False
+        if not self._setup_circuit_breaker_params():
+            return False
+        if not self._setup_dedup_params():
+            return False
+        if not self._setup_multi_queue_params():
+            return False
 
         self.service_constructor_params = ()
         return True
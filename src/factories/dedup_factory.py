@@ -0,0 +1,24 @@
+"""
+Deduplicator factory
+"""
+from typing import Optional
+from logger import Logger
+from dedup import Deduplicator, MemoryDedupStore, SqliteDedupStore
+from .config_factory import Config
+
+logger = Logger().get_logger()
+
+
+def get_deduplicator(config: Config) -> Optional[Deduplicator]:
+    """
+    Returns the Deduplicator for DEDUP_STORE, None when it isn't set
+    """
+    if config.dedup_store == "memory":
+        store = MemoryDedupStore(config.dedup_ttl_seconds, config.dedup_max_entries)
+    elif config.dedup_store == "sqlite":
+        store = SqliteDedupStore(config.dedup_sqlite_path, config.dedup_ttl_seconds)
+    else:
+        return None
+    logger.info("Skipping messages whose %s was processed in the last %s seconds",
+                config.dedup_key, config.dedup_ttl_seconds)
+    return Deduplicator(store, config.dedup_key)
@@ -0,0 +1,36 @@
+"""
+Hooks factory
+"""
+import importlib
+from typing import Optional
+import traceback
+from logger import Logger
+from hooks import Hooks, SlowMessageProfiler
+from .config_factory import Config
+
+logger = Logger().get_logger()
+
+
+def get_hooks(config: Config) -> Optional[Hooks]:
+    """
+    Dynamically imports the HOOKS_MODULE, None when it isn't set or can't be imported
+    """
+    if config.hooks_module is None:
+        return None
+    try:
+        module = importlib.import_module(config.hooks_module)
+        return Hooks.from_module(module, config.processor_type)
+    except ImportError as e:
+        logger.error("Error: Hooks module '%s' not found. Error: %s", config.hooks_module, e)
+        logger.error(traceback.format_exc())
+    return None
+
+
+def get_profiler(config: Config) -> Optional[SlowMessageProfiler]:
+    """
+    Returns the slow message profiler when PROFILE_DIR is set
+    """
+    if config.profile_dir is None:
+        return None
+    return SlowMessageProfiler(config.profile_dir, config.profile_slowest_percent,
+                               config.profile_sample_rate)
@@ -0,0 +1,35 @@
+"""
+Cron leader election factory
+"""
+import importlib
+from typing import Optional, Union
+from logger import Logger
+from leader import LeaderElection, ShardedElection, SqliteLeaseStore
+from .config_factory import Config
+
+logger = Logger().get_logger()
+
+
+def get_leader_election(config: Config) -> Optional[Union[LeaderElection, ShardedElection]]:
+    """
+    Returns the LeaderElection for CRON_LEADER_BACKEND, or the ShardedElection
+    when CRON_SHARDS is set too, None when it isn't set. The backend is
+    sqlite or the dotted path of a lease store class built without arguments.
+    """
+    if config.cron_leader_backend is None:
+        return None
+    if config.cron_leader_backend == "sqlite":
+        store = SqliteLeaseStore(config.cron_leader_sqlite_path)
+    else:
+        module_name, class_name = config.cron_leader_backend.rsplit(".", 1)
+        store = getattr(importlib.import_module(module_name), class_name)()
+    if config.cron_shards is not None:
+        logger.info("Spreading %s shards of cron %s over its replicas with %s second leases (%s)",
+                    config.cron_shards, config.cron_leader_name,
+                    config.cron_leader_ttl_seconds, config.cron_leader_backend)
+        return ShardedElection(store, config.cron_leader_name, config.cron_shards,
+                               config.cron_leader_ttl_seconds)
+    logger.info("Electing a leader for cron %s with a %s second lease (%s)",
+                config.cron_leader_name, config.cron_leader_ttl_seconds,
+                config.cron_leader_backend)
+    return LeaderElection(store, config.cron_leader_name, config.cron_leader_ttl_seconds)
@@ -1,22 +1,28 @@
 """
 Message adapter handling
 """
-
-from rococo.messaging.base import MessageAdapter
-from rococo.messaging.rabbitmq import RabbitMqConnection
-from rococo.messaging.sqs import SqsConnection
+# pylint: disable=C0415
 from .config_factory import Config
 
 
-def get_message_adapter(config: Config) -> MessageAdapter:
+def get_message_adapter(config: Config):
     """
-    Returns a message adapter depending on MESSAGING_TYPE env var
+    Returns a message adapter depending on MESSAGING_TYPE env var. Only the
+    selected adapter is imported, though rococo.messaging, which the RabbitMQ
+    and SQS adapters build on, imports both broker clients.
     """
     if config.messaging_type == "RabbitMqConnection":
-        adapter = RabbitMqConnection(*config.messaging_constructor_params)
+        from adapters import HostRabbitMqConnection
+        adapter = HostRabbitMqConnection(*config.messaging_constructor_params)
         return adapter
     elif config.messaging_type == "SqsConnection":
-        adapter = SqsConnection(*config.messaging_constructor_params)
+        from adapters import HostSqsConnection
+        adapter = HostSqsConnection(*config.messaging_constructor_params)
+        return adapter
+    elif config.messaging_type == "LocalQueueConnection":
+        from adapters import LocalQueueConnection
+        adapter = LocalQueueConnection(*config.messaging_constructor_params)
         return adapter
 
+    from rococo.messaging.base import MessageAdapter
     return MessageAdapter()
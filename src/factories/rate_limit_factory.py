@@ -0,0 +1,31 @@
+"""
+Rate limiter factory
+"""
+import importlib
+from typing import Optional
+from logger import Logger
+from rate_limit import RateLimiter, TokenBucket, FileTokenBucket
+from .config_factory import Config
+
+logger = Logger().get_logger()
+
+
+def get_rate_limiter(config: Config) -> Optional[RateLimiter]:
+    """
+    Returns the RateLimiter for RATE_LIMIT_PER_SECOND, None when it isn't set.
+    RATE_LIMIT_BACKEND is memory, file or the dotted path of a bucket class
+    built with (rate, burst).
+    """
+    if config.rate_limit_per_second is None:
+        return None
+    rate, burst = config.rate_limit_per_second, config.rate_limit_burst
+    if config.rate_limit_backend == "memory":
+        bucket = TokenBucket(rate, burst)
+    elif config.rate_limit_backend == "file":
+        bucket = FileTokenBucket(config.rate_limit_file, rate, burst)
+    else:
+        module_name, class_name = config.rate_limit_backend.rsplit(".", 1)
+        bucket = getattr(importlib.import_module(module_name), class_name)(rate, burst)
+    logger.info("Limiting processing to %s calls a second with bursts of %s (%s)",
+                rate, burst, config.rate_limit_backend)
+    return RateLimiter(bucket)
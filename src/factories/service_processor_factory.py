@@ -2,23 +2,34 @@
 Service processor factory
 """
 import importlib
-from typing import Optional
+import sys
+from typing import Optional, TYPE_CHECKING
 import traceback
-from rococo.messaging import BaseServiceProcessor
 from logger import Logger
 from .config_factory import Config
 
+if TYPE_CHECKING:
+    # rococo.messaging imports every broker client
+    from rococo.messaging import BaseServiceProcessor
+
 logger = Logger().get_logger()
 
 
-def get_service_processor(config: Config) -> Optional[BaseServiceProcessor]:
+def get_service_processor(config: Config,
+                          reload: bool = False) -> Optional["BaseServiceProcessor"]:
     """
-    Dynamically imports the service processor
+    Dynamically imports the service processor, from {PROCESSOR_TYPE}_MODULE
+    when it is set and PROCESSOR_MODULE otherwise. With reload, a module that
+    was already imported is imported again to pick up code changes.
     """
-    processor_module = config.get_env_var("PROCESSOR_MODULE")
+    processor_module = (config.get_optional_env_var(f"{config.processor_type}_MODULE") or
+                        config.get_env_var("PROCESSOR_MODULE"))
     try:
         # Dynamically import the module
-        module = importlib.import_module(processor_module)
+        if reload and processor_module in sys.modules:
+            module = importlib.reload(sys.modules[processor_module])
+        else:
+            module = importlib.import_module(processor_module)
 
         # Access the class from the imported module
         dynamic_class = getattr(module, config.processor_type)
@@ -0,0 +1,173 @@
+"""
+Instrumentation hooks and profiling around service processor invocations
+"""
+import functools
+import inspect
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+from logger import Logger
+from dispatch import get_current_delivery
+
+logger = Logger().get_logger()
+
+
+class InvocationContext:  # pylint: disable=R0902,R0903
+    """State of one process() invocation passed to every hook"""
+
+    def __init__(self, processor_name: str, message=None):
+        self.processor_name = processor_name
+        self.message = message
+        self.delivery = get_current_delivery()
+        self.started_at = time.monotonic()
+        self.duration = None
+        self.result = None
+        self.exception = None
+
+    def finish(self, result=None, exception: Exception = None):
+        """Records the outcome of the invocation"""
+        self.duration = time.monotonic() - self.started_at
+        self.result = result
+        self.exception = exception
+
+
+class Hooks:
+    """
+    Calls pre_process(context) before every process invocation, then
+    post_process(context) after it returns or on_error(context) when it
+    raises. Exceptions raised by hooks are logged and never reach the processor.
+    """
+
+    def __init__(self, processor_name: str, pre_process: Callable = None,
+                 post_process: Callable = None, on_error: Callable = None):
+        self.processor_name = processor_name
+        self.pre_process = pre_process
+        self.post_process = post_process
+        self.on_error = on_error
+
+    @classmethod
+    def from_module(cls, module, processor_name: str) -> "Hooks":
+        """Builds hooks from the pre_process, post_process and on_error functions of module"""
+        return cls(processor_name,
+                   pre_process=getattr(module, "pre_process", None),
+                   post_process=getattr(module, "post_process", None),
+                   on_error=getattr(module, "on_error", None))
+
+    @staticmethod
+    def _call(hook: Optional[Callable], context: InvocationContext):
+        if hook is None:
+            return
+        try:
+            hook(context)
+        except Exception:  # pylint: disable=W0718
+            logger.exception("Error in hook %s", getattr(hook, "__name__", hook))
+
+    def wrap(self, process: Callable) -> Callable:
+        """Wraps a process callable, sync or async, with the hooks"""
+        if inspect.iscoroutinefunction(process):
+            @functools.wraps(process)
+            async def _hooked_async(*args, **kwargs):
+                context = InvocationContext(self.processor_name, args[0] if args else None)
+                self._call(self.pre_process, context)
+                try:
+                    result = await process(*args, **kwargs)
+                except Exception as e:
+                    context.finish(exception=e)
+                    self._call(self.on_error, context)
+                    raise
+                context.finish(result=result)
+                self._call(self.post_process, context)
+                return result
+            return _hooked_async
+
+        @functools.wraps(process)
+        def _hooked(*args, **kwargs):
+            context = InvocationContext(self.processor_name, args[0] if args else None)
+            self._call(self.pre_process, context)
+            try:
+                result = process(*args, **kwargs)
+            except Exception as e:
+                context.finish(exception=e)
+                self._call(self.on_error, context)
+                raise
+            context.finish(result=result)
+            self._call(self.post_process, context)
+            return result
+        return _hooked
+
+
+class SlowMessageProfiler:
+    """
+    Runs a sample of invocations under cProfile and writes the profile of
+    those among the slowest percent of recent invocations to output_dir.
+    """
+
+    MIN_OBSERVATIONS = 100
+    RECOMPUTE_EVERY = 100
+
+    def __init__(self, output_dir: str, slowest_percent: float = 1.0,
+                 sample_rate: float = 1.0, window: int = 1000):
+        self.output_dir = output_dir
+        self.slowest_percent = slowest_percent
+        self.sample_rate = sample_rate
+        self._durations = deque(maxlen=window)
+        self._threshold = None
+        self._observed = 0
+        self._lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+
+    @property
+    def threshold(self) -> Optional[float]:
+        """Duration above which an invocation counts as one of the slowest, None until known"""
+        return self._threshold
+
+    def _observe(self, duration: float) -> bool:
+        """Records a duration and returns whether it is among the slowest"""
+        with self._lock:
+            self._durations.append(duration)
+            self._observed += 1
+            if (len(self._durations) >= self.MIN_OBSERVATIONS and
+                    (self._threshold is None or self._observed % self.RECOMPUTE_EVERY == 0)):
+                ordered = sorted(self._durations)
+                index = math.ceil(len(ordered) * (100 - self.slowest_percent) / 100) - 1
+                self._threshold = ordered[max(index, 0)]
+            return self._threshold is not None and duration > self._threshold
+
+    def _dump(self, profile, duration: float):
+        delivery = get_current_delivery()
+        message_id = getattr(delivery, "message_id", None) or "message"
+        path = os.path.join(self.output_dir,
+                            f"{time.strftime('%Y%m%dT%H%M%S')}-{self._observed}-{message_id}-"
+                            f"{int(duration * 1000)}ms.prof")
+        profile.dump_stats(path)
+        logger.warning("Slow message took %.3fs, profile written to %s", duration, path)
+
+    def wrap(self, process: Callable) -> Callable:
+        """Wraps a sync process callable with the profiler"""
+        import cProfile  # pylint: disable=C0415
+
+        @functools.wraps(process)
+        def _profiled(*args, **kwargs):
+            profile = None
+            if random.random() < self.sample_rate:
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError:
+                    # Another profiler is already active in this thread
+                    profile = None
+            started_at = time.monotonic()
+            try:
+                return process(*args, **kwargs)
+            finally:
+                duration = time.monotonic() - started_at
+                if profile is not None:
+                    profile.disable()
+                if self._observe(duration) and profile is not None:
+                    self._dump(profile, duration)
+        return _profiled
@@ -0,0 +1,281 @@
+"""
+Leader election and sharding between replicas of a cron container
+"""
+import abc
+import functools
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable
+
+from logger import Logger
+
+logger = Logger().get_logger()
+
+
+class SqliteLeaseStore:
+    """
+    Leases kept in a SQLite file, so every process and container sharing the
+    file takes part in the same election.
+    """
+
+    def __init__(self, path: str):
+        import sqlite3  # pylint: disable=C0415
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS leases "
+            "(name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)")
+        self._lock = threading.Lock()
+
+    def acquire(self, name: str, holder: str, ttl: float) -> bool:
+        """Takes or renews the lease on name for ttl seconds, False while another holder has it"""
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    "SELECT holder, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+                acquired = row is None or row[0] == holder or row[1] <= now
+                if acquired:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)",
+                        (name, holder, now + ttl))
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+        return acquired
+
+    def release(self, name: str, holder: str):
+        """Gives up the lease on name if holder has it"""
+        with self._lock:
+            self._connection.execute("DELETE FROM leases WHERE name = ? AND holder = ?",
+                                     (name, holder))
+
+    def holders(self, prefix: str) -> list:
+        """Holders of the unexpired leases whose name starts with prefix"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT holder FROM leases WHERE substr(name, 1, ?) = ? AND expires_at > ?",
+                (len(prefix), prefix, time.time())).fetchall()
+        return [row[0] for row in rows]
+
+
+class _LeaseKeeper(abc.ABC):
+    """Renews leases on a background thread every third of ttl until the with-block ends"""
+
+    def __init__(self, store, name: str, ttl: float, holder: str = None):
+        self.store = store
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._valid_until = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @abc.abstractmethod
+    def renew(self):
+        """Takes or renews the leases"""
+
+    @abc.abstractmethod
+    def _release(self):
+        """Gives up the leases held"""
+
+    def _renew_until_stopped(self):
+        while not self._stop.wait(self.ttl / 3):
+            self.renew()
+
+    def __enter__(self):
+        self.renew()
+        self._thread = threading.Thread(target=self._renew_until_stopped,
+                                        name="cron-leader", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop.set()
+        self._thread.join()
+        self._valid_until = 0.0
+        try:
+            self._release()
+        except Exception:  # pylint: disable=W0718
+            logger.exception("Error releasing the %s cron leases", self.name)
+
+
+class LeaderElection(_LeaseKeeper):
+    """
+    Holds a lease on name for as long as the process runs. The replica
+    holding the lease is the leader. When it stops renewing, another replica
+    takes over within ttl seconds. Any object with acquire(name, holder, ttl)
+    and release(name, holder) can be the store.
+    """
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this replica holds an unexpired lease"""
+        return time.monotonic() < self._valid_until
+
+    def renew(self):
+        """Takes or renews the lease, losing leadership when the store can't be reached"""
+        started = time.monotonic()
+        was_leader = self.is_leader
+        try:
+            acquired = self.store.acquire(self.name, self.holder, self.ttl)
+        except Exception:  # pylint: disable=W0718
+            logger.exception("Error renewing the %s cron lease", self.name)
+            acquired = False
+        self._valid_until = started + self.ttl if acquired else 0.0
+        if acquired and not was_leader:
+            logger.info("%s is now the leader for cron %s", self.holder, self.name)
+        elif was_leader and not acquired:
+            logger.warning("%s is no longer the leader for cron %s", self.holder, self.name)
+
+    def _release(self):
+        self.store.release(self.name, self.holder)
+
+    def wrap(self, process: Callable) -> Callable:
+        """Wraps a cron job so it only runs on the leader"""
+        @functools.wraps(process)
+        def _leader_only(*args, **kwargs):
+            if not self.is_leader:
+                logger.debug("Skipping cron run, %s is not the leader", self.holder)
+                return None
+            return process(*args, **kwargs)
+        return _leader_only
+
+
+class ShardedElection(_LeaseKeeper):
+    """
+    Spreads the total_shards shards of a cron job over the live replicas.
+    Each replica keeps a lease on name/members/<holder>, and the sorted live
+    members take the shards in turn. A replica also holds a lease on
+    name/shards/<shard> for each of its shards, so two replicas never run the
+    same shard while members join or leave. On each run, a replica tries
+    again to take the shards it couldn't at its last renewal, as they may have
+    been let go of since, and the first member also runs any shard nobody
+    holds. Shards that still can't be taken are skipped for the run, with a
+    warning. The store also needs holders(prefix), listing the holders of the
+    live leases under prefix.
+    """
+
+    def __init__(self, store, name: str, total_shards: int, ttl: float, holder: str = None):
+        super().__init__(store, name, ttl, holder)
+        self.total_shards = total_shards
+        self._shards = []
+        self._assigned = []
+        self._first_member = False
+        # Keeps the run from releasing a shard a renewal has just taken on
+        self._lock = threading.Lock()
+
+    @property
+    def shards(self) -> list:
+        """Shards this replica holds unexpired leases on"""
+        return self._shards if time.monotonic() < self._valid_until else []
+
+    def _shard_lease(self, shard: int) -> str:
+        return f"{self.name}/shards/{shard}"
+
+    def _assigned_shards(self) -> list:
+        """Shards that fall to this replica among the live members"""
+        self.store.acquire(f"{self.name}/members/{self.holder}", self.holder, self.ttl)
+        members = sorted(self.store.holders(f"{self.name}/members/"))
+        if self.holder not in members:
+            return []
+        index = members.index(self.holder)
+        self._first_member = index == 0
+        return list(range(index, self.total_shards, len(members)))
+
+    def renew(self):
+        """Renews the membership and shard leases, holding none when the store can't be reached"""
+        started = time.monotonic()
+        previous = self.shards
+        with self._lock:
+            self._first_member = False
+            try:
+                assigned = self._assigned_shards()
+                for shard in set(self._shards) - set(assigned):
+                    self.store.release(self._shard_lease(shard), self.holder)
+                shards = [shard for shard in assigned
+                          if self.store.acquire(self._shard_lease(shard), self.holder, self.ttl)]
+            except Exception:  # pylint: disable=W0718
+                logger.exception("Error renewing the %s cron leases", self.name)
+                assigned, shards = [], []
+            self._assigned = assigned
+            self._shards = shards
+            self._valid_until = started + self.ttl
+        if shards != previous:
+            logger.info("%s now runs shards %s of %s for cron %s",
+                        self.holder, shards, self.total_shards, self.name)
+
+    def _release(self):
+        for shard in self._shards:
+            self.store.release(self._shard_lease(shard), self.holder)
+        self._shards = []
+        self.store.release(f"{self.name}/members/{self.holder}", self.holder)
+
+    def _take_skipped(self, held: list) -> list:
+        """
+        Takes the leases on this replica's shards that were busy at the last
+        renewal and, on the first member, on any shard nobody holds. Warns
+        about the shards of this replica that are still skipped.
+        """
+        taken = []
+        with self._lock:
+            if time.monotonic() >= self._valid_until:
+                return []
+            assigned = self._assigned
+            candidates = range(self.total_shards) if self._first_member else assigned
+            for shard in candidates:
+                if shard in held:
+                    continue
+                try:
+                    if self.store.acquire(self._shard_lease(shard), self.holder, self.ttl):
+                        taken.append(shard)
+                except Exception:  # pylint: disable=W0718
+                    logger.exception("Error taking the lease on shard %s of cron %s",
+                                     shard, self.name)
+        skipped = [shard for shard in assigned if shard not in held and shard not in taken]
+        if skipped:
+            logger.warning("Not running shards %s of %s of cron %s this time, "
+                           "another replica still holds their leases",
+                           skipped, self.total_shards, self.name)
+        return taken
+
+    def _release_taken(self, taken: list):
+        """Releases the shards taken for a run, unless a renewal has taken them on since"""
+        with self._lock:
+            for shard in set(taken) - set(self._shards):
+                try:
+                    self.store.release(self._shard_lease(shard), self.holder)
+                except Exception:  # pylint: disable=W0718
+                    logger.exception("Error releasing the lease on shard %s of cron %s",
+                                     shard, self.name)
+
+    def wrap(self, process: Callable) -> Callable:
+        """
+        Wraps a cron job to run process(shard=..., total_shards=...) once for
+        each shard held or taken for the run. Shards taken for the run are
+        released after it, the next renewal takes them on for good.
+        """
+        @functools.wraps(process)
+        def _sharded():
+            held = self.shards
+            taken = self._take_skipped(held)
+            if not held and not taken:
+                logger.debug("Skipping cron run, %s holds no shards", self.holder)
+            try:
+                for shard in held + taken:
+                    try:
+                        process(shard=shard, total_shards=self.total_shards)
+                    except Exception:  # pylint: disable=W0718
+                        logger.exception("Cron job failed for shard %s of %s",
+                                         shard, self.total_shards)
+            finally:
+                self._release_taken(taken)
+        return _sharded
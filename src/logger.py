@@ -1,5 +1,61 @@
 """Logging module"""
+import atexit
+import json
 import logging
+import os
+import queue
+import zlib
+from logging.handlers import QueueHandler, QueueListener
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            "timestamp": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        for field in ("message_id", "queue_name"):
+            if getattr(record, field, None) is not None:
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class MessageContextFilter(logging.Filter):
+    """
+    Tags records logged while a message is processed with its id and queue,
+    and keeps only sample_rate of the messages' records below WARNING. The
+    decision is made once per message so a sampled message logs completely.
+    """
+
+    def __init__(self, sample_rate: float = 1.0):
+        super().__init__()
+        self.sample_rate = sample_rate
+        # Imported here, dispatch modules log through this module
+        from dispatch.context import get_current_delivery  # pylint: disable=C0415
+        self._get_current_delivery = get_current_delivery
+
+    def _sampled(self, delivery) -> bool:
+        key = delivery.message_id if delivery.message_id is not None else id(delivery)
+        return zlib.crc32(str(key).encode()) / 0xFFFFFFFF < self.sample_rate
+
+    def filter(self, record):
+        delivery = self._get_current_delivery()
+        if delivery is None:
+            return True
+        record.message_id = delivery.message_id
+        record.queue_name = delivery.queue_name
+        return record.levelno >= logging.WARNING or self._sampled(delivery)
+
 
 class Logger:
     """Logging class"""
@@ -13,23 +69,53 @@ class Logger:
         return cls._instance
 
     def _init_logger(self):
-        """Initialize logger"""
+        """Initialize logger from LOG_LEVEL, LOG_FORMAT, LOG_ASYNC and LOG_SAMPLE_RATE"""
         # Create a custom logger
         if not hasattr(self, '_log_instance'):
             self._log_instance = logging.getLogger() # pylint: disable=W0201
-            self._log_instance.setLevel(logging.INFO)
+            level = os.getenv("LOG_LEVEL", "INFO").upper()
+            try:
+                self._log_instance.setLevel(level)
+            except ValueError:
+                self._log_instance.setLevel(logging.INFO)
+                self._log_instance.warning("Invalid LOG_LEVEL %s, using INFO", level)
 
             # Create a formatter
-            formatter = logging.Formatter(
-                '%(asctime)s [%(levelname)s] %(module)s:%(lineno)d - %(message)s')
+            if os.getenv("LOG_FORMAT", "text").lower() == "json":
+                formatter = JsonFormatter()
+            else:
+                formatter = logging.Formatter(
+                    '%(asctime)s [%(levelname)s] %(module)s:%(lineno)d - %(message)s')
 
             # Create a handler and set the formatter
             handler = logging.StreamHandler()
             handler.setFormatter(formatter)
 
+            # Hand records to a background thread that formats and writes them
+            self._listener = None # pylint: disable=W0201
+            if os.getenv("LOG_ASYNC", "false").lower() == "true":
+                log_queue = queue.SimpleQueue()
+                self._listener = QueueListener(log_queue, handler, respect_handler_level=True)
+                self._listener.start()
+                atexit.register(self.shutdown)
+                handler = QueueHandler(log_queue)
+
+            try:
+                sample_rate = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+            except ValueError:
+                sample_rate = 1.0
+            if sample_rate < 1 or isinstance(formatter, JsonFormatter):
+                handler.addFilter(MessageContextFilter(sample_rate))
+
             # Add the handler to the logger
             self._log_instance.addHandler(handler)
 
     def get_logger(self):
         """Returns the initialized logger"""
-        return self._log_instance
\ No newline at end of file
+        return self._log_instance
+
+    def shutdown(self):
+        """Writes out queued records and stops the background log thread"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None # pylint: disable=W0201
@@ -0,0 +1,259 @@
+"""Prometheus metrics module"""
+import functools
+import inspect
+import threading
+import time
+from typing import Callable
+
+from logger import Logger
+from dispatch import get_current_deliveries
+
+logger = Logger().get_logger()
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(labels: dict, extra: dict = None) -> str:
+    items = dict(labels, **(extra or {}))
+    if not items:
+        return ""
+    rendered = ",".join(f'{key}="{value}"' for key, value in items.items())
+    return "{" + rendered + "}"
+
+
+class Counter:
+    """Monotonically increasing value"""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        """Increments the counter"""
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        """Current value"""
+        return self._value
+
+    def render(self, name: str, labels: dict) -> list:
+        """Returns the exposition lines of the counter"""
+        return [f"{name}{_format_labels(labels)} {self._value}"]
+
+
+class Histogram:
+    """Distribution of observed values over cumulative buckets"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._buckets = buckets
+        self._counts = [0] * len(buckets)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Records one observation"""
+        with self._lock:
+            self._sum += value
+            self._count += 1
+            for index, bound in enumerate(self._buckets):
+                if value <= bound:
+                    self._counts[index] += 1
+
+    @property
+    def count(self) -> int:
+        """Number of observations"""
+        return self._count
+
+    def render(self, name: str, labels: dict) -> list:
+        """Returns the exposition lines of the histogram"""
+        lines = [f"{name}_bucket{_format_labels(labels, {'le': bound})} {count}"
+                 for bound, count in zip(self._buckets, self._counts)]
+        lines.append(f"{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {self._count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {self._sum}")
+        lines.append(f"{name}_count{_format_labels(labels)} {self._count}")
+        return lines
+
+
+class ProcessorMetrics:
+    """Metrics of the messages handled by one processor"""
+
+    def __init__(self, labels: dict):
+        self.labels = labels
+        self.received = Counter()
+        self.succeeded = Counter()
+        self.failed = Counter()
+        self.processing_seconds = Histogram()
+        self.queue_wait_seconds = Histogram()
+        self.last_message_at = None
+
+    def _start(self, count: int = 1) -> float:
+        now = time.monotonic()
+        self.received.inc(count)
+        self.last_message_at = now
+        for delivery in get_current_deliveries():
+            self.queue_wait_seconds.observe(now - delivery.received_at)
+        return now
+
+    def instrument(self, process: Callable) -> Callable:
+        """Wraps a process(message) callable, sync or async, with metrics"""
+        if inspect.iscoroutinefunction(process):
+            @functools.wraps(process)
+            async def _instrumented_async(message):
+                started_at = self._start()
+                try:
+                    result = await process(message)
+                except Exception:
+                    self.failed.inc()
+                    raise
+                finally:
+                    self.processing_seconds.observe(time.monotonic() - started_at)
+                self.succeeded.inc()
+                return result
+            return _instrumented_async
+
+        @functools.wraps(process)
+        def _instrumented(message):
+            started_at = self._start()
+            try:
+                result = process(message)
+            except Exception:
+                self.failed.inc()
+                raise
+            finally:
+                self.processing_seconds.observe(time.monotonic() - started_at)
+            self.succeeded.inc()
+            return result
+        return _instrumented
+
+    def instrument_batch(self, process_batch: Callable) -> Callable:
+        """Wraps a process_batch(messages) callable with per-message metrics"""
+        @functools.wraps(process_batch)
+        def _instrumented_batch(messages):
+            started_at = self._start(len(messages))
+            try:
+                results = process_batch(messages)
+            except Exception:
+                self.failed.inc(len(messages))
+                raise
+            finally:
+                self.processing_seconds.observe(time.monotonic() - started_at)
+            if results is None:
+                succeeded = len(messages)
+            elif len(results) != len(messages):
+                succeeded = 0
+            else:
+                succeeded = sum(1 for result in results if result)
+            self.succeeded.inc(succeeded)
+            self.failed.inc(len(messages) - succeeded)
+            return results
+        return _instrumented_batch
+
+    def seconds_since_last_message(self) -> float:
+        """Seconds since processing of the last message started, -1 before the first one"""
+        if self.last_message_at is None:
+            return -1
+        return time.monotonic() - self.last_message_at
+
+
+class Metrics:
+    """Registry of processor metrics rendered in the Prometheus text format"""
+
+    PREFIX = "rococo_service_host"
+
+    def __init__(self):
+        self._processors = {}
+        self._lock = threading.Lock()
+
+    def for_processor(self, processor: str, queue: str) -> ProcessorMetrics:
+        """Returns the metrics of a processor consuming from queue"""
+        with self._lock:
+            key = (processor, queue)
+            if key not in self._processors:
+                self._processors[key] = ProcessorMetrics({"processor": processor, "queue": queue})
+            return self._processors[key]
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format"""
+        with self._lock:
+            processors = list(self._processors.values())
+        families = [
+            ("messages_received_total", "counter", "Messages handed to the processor",
+             lambda m: m.received),
+            ("messages_succeeded_total", "counter", "Messages processed without error",
+             lambda m: m.succeeded),
+            ("messages_failed_total", "counter", "Messages whose processing raised or failed",
+             lambda m: m.failed),
+            ("message_processing_seconds", "histogram", "Time spent in process()",
+             lambda m: m.processing_seconds),
+            ("message_queue_wait_seconds", "histogram",
+             "Time between receiving a message and starting to process it",
+             lambda m: m.queue_wait_seconds),
+        ]
+        lines = []
+        for suffix, kind, help_text, getter in families:
+            name = f"{self.PREFIX}_{suffix}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for processor_metrics in processors:
+                lines.extend(getter(processor_metrics).render(name, processor_metrics.labels))
+        name = f"{self.PREFIX}_seconds_since_last_message"
+        lines.append(f"# HELP {name} Seconds since the last message started processing")
+        lines.append(f"# TYPE {name} gauge")
+        for processor_metrics in processors:
+            lines.append(f"{name}{_format_labels(processor_metrics.labels)} "
+                         f"{processor_metrics.seconds_since_last_message()}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves a Metrics registry on /metrics from a background thread"""
+
+    def __init__(self, metrics: Metrics, port: int, host: str = "0.0.0.0"):
+        # Imported here so hosts without METRICS_PORT don't pay for it
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # pylint: disable=C0415
+        registry = metrics
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=C0103
+                """Serves the metrics page"""
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=W0622
+                """Keeps scrapes out of the logs"""
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="metrics-server", daemon=True)
+
+    @property
+    def port(self) -> int:
+        """Port the server is bound to"""
+        return self._server.server_address[1]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        """Starts serving in the background"""
+        self._thread.start()
+        logger.info("Serving metrics on port %s", self.port)
+
+    def stop(self):
+        """Stops the server"""
+        self._server.shutdown()
+        self._server.server_close()
@@ -1,101 +1,571 @@
 """
 Main loop for service processor host
 """
+# pylint: disable=C0413
+from time import perf_counter
+_IMPORTS_STARTED_AT = perf_counter()
 
 from logger import Logger
 import traceback
+import functools
+import inspect
+import threading
+from contextlib import contextmanager, nullcontext, ExitStack
 from time import sleep
-import schedule
-from apscheduler.schedulers.blocking import BlockingScheduler
-from apscheduler.triggers.cron import CronTrigger
 from factories import get_message_adapter, get_service_processor
+from factories import get_hooks, get_profiler, get_deduplicator, get_rate_limiter
+from factories import get_circuit_breaker, get_leader_election
 from factories import Config
+from dispatch import WorkerPool, Batcher
+from dispatch import RetryPolicy, SharedPool, SCHEDULING_POLICIES, AdaptiveLimiter
+from metrics import Metrics, MetricsServer
+from shutdown import ShutdownCoordinator
+from reload import ReloadableProcessor, ReloadWatcher
+from startup import StartupProfile
+from cron import CronRunner
 
 logger = Logger().get_logger()
 
+_startup = StartupProfile(_IMPORTS_STARTED_AT)
+_startup.record("imports", perf_counter() - _IMPORTS_STARTED_AT)
+
+# The schedulers are imported by _import_cron_libraries, only cron containers need them
+schedule = None
+BlockingScheduler = None
+BackgroundScheduler = None
+CronTrigger = None
+
+
+def _import_cron_libraries():
+    """Imports the cron schedulers unless they are already there"""
+    global schedule, BlockingScheduler, BackgroundScheduler, CronTrigger  # pylint: disable=W0603
+    with _startup.phase("cron imports"):
+        if schedule is None:
+            import schedule  # pylint: disable=C0415
+        if BlockingScheduler is None:
+            from apscheduler.schedulers.blocking import BlockingScheduler  # pylint: disable=C0415
+        if BackgroundScheduler is None:
+            from apscheduler.schedulers.background import BackgroundScheduler  # pylint: disable=C0415
+        if CronTrigger is None:
+            from apscheduler.triggers.cron import CronTrigger  # pylint: disable=C0415
+
+
+# The pools are imported by _import_process_pool and _import_async_pool, so only
+# hosts that run them load multiprocessing and asyncio
+ProcessPool = None
+AsyncPool = None
+
+
+def _import_process_pool():
+    """Imports ProcessPool unless it is already there"""
+    global ProcessPool  # pylint: disable=W0603
+    if ProcessPool is None:
+        from dispatch import ProcessPool  # pylint: disable=C0415
+
+
+def _import_async_pool():
+    """Imports AsyncPool unless it is already there"""
+    global AsyncPool  # pylint: disable=W0603
+    if AsyncPool is None:
+        from dispatch import AsyncPool  # pylint: disable=C0415
+
+
+@contextmanager
+def _connect(config):
+    """Opens the broker connection, the last phase of startup"""
+    with ExitStack() as stack:
+        with _startup.phase("connection"):
+            message_adapter = stack.enter_context(get_message_adapter(config))
+        _startup.report()
+        yield message_adapter
+
+
+def _shutdown_coordinator(config):
+    """Returns the SIGTERM coordinator when SHUTDOWN_GRACE_SECONDS is set, or None"""
+    if config.shutdown_grace_seconds is None:
+        return None
+    return ShutdownCoordinator(config.shutdown_grace_seconds)
+
+
+def _grace_left(shutdown):
+    """Seconds pools may still wait for running work, None when not shutting down"""
+    if shutdown is None or not shutdown.requested:
+        return None
+    return shutdown.remaining()
+
+
+@contextmanager
+def _execution_pool(config, service_processor, shutdown=None):
+    """Yields the callable that runs a message through the service processor"""
+    if config.execution_pool == "process":
+        _import_process_pool()
+        processor_factory = functools.partial(get_service_processor, config)
+        process_pool = ProcessPool(processor_factory, config.num_threads)
+        process_pool.start()
+        try:
+            yield process_pool.process
+        finally:
+            process_pool.shutdown(_grace_left(shutdown))
+    else:
+        yield service_processor.process
+
+
+@contextmanager
+def _metrics(config):
+    """Yields the metrics registry served on METRICS_PORT, or None when it isn't set"""
+    if config.metrics_port is None:
+        yield None
+        return
+    metrics = Metrics()
+    with MetricsServer(metrics, config.metrics_port):
+        yield metrics
+
+
+def _wrap_process(config, process):
+    """Wraps a process callable with the configured profiler and HOOKS_MODULE hooks"""
+    profiler = get_profiler(config)
+    if profiler is not None:
+        if inspect.iscoroutinefunction(process) or config.execution_pool == "process":
+            logger.warning("PROFILE_DIR is ignored for async processors and process pools")
+        else:
+            process = profiler.wrap(process)
+    hooks = get_hooks(config)
+    if hooks is not None:
+        process = hooks.wrap(process)
+    return process
+
+
+def _batch_hook(service_processor):
+    """Returns the processor's optional process_batch(messages) hook, or None"""
+    if isinstance(service_processor, ReloadableProcessor):
+        if _batch_hook(service_processor.processor) is None:
+            return None
+        return service_processor.process_batch
+    if service_processor is None or not callable(
+            getattr(type(service_processor), "process_batch", None)):
+        return None
+    return service_processor.process_batch
+
+
+def _reloadable(config, service_processor):
+    """Wraps the processor so it can be hot reloaded when that is enabled"""
+    if service_processor is None or not config.reload_on_sighup:
+        return service_processor
+    return ReloadableProcessor(service_processor,
+                               functools.partial(get_service_processor, config, reload=True))
+
+
+def _reload_watcher(config, processors):
+    """Returns the watcher reloading processors, or a null context when reload is off"""
+    reloadables = [processor for processor in processors
+                   if isinstance(processor, ReloadableProcessor)]
+    if not reloadables:
+        return nullcontext()
+    logger.info("Reloading processors on SIGHUP%s",
+                " and when their source changes" if config.reload_on_change else "")
+    return ReloadWatcher(reloadables, on_sighup=True,
+                         poll_seconds=config.reload_poll_seconds if config.reload_on_change
+                         else None)
+
+
+def _retry_policy(config, processor_class_name, queue_name):
+    """Returns the policy for failed messages when RETRY_MAX_ATTEMPTS is set, or None"""
+    if config.retry_max_attempts is None:
+        return None
+    dead_letter_queue_name = config.get_env_var(f'{processor_class_name}_DEAD_LETTER_QUEUE_NAME')
+    if dead_letter_queue_name:
+        dead_letter_queue = config.get_env_var("QUEUE_NAME_PREFIX") + dead_letter_queue_name
+    else:
+        dead_letter_queue = queue_name + "_dlq"
+    logger.info("Retrying failed messages up to %s attempts, then moving them to %s",
+                config.retry_max_attempts, dead_letter_queue)
+    return RetryPolicy(config.retry_max_attempts, config.retry_base_delay_ms / 1000,
+                       config.retry_max_delay_ms / 1000, dead_letter_queue)
+
+
+def _concurrency_limiter(config):
+    """Returns the adaptive concurrency limit when CONCURRENCY_MAX is set, or None"""
+    if config.concurrency_max is None:
+        return None
+    logger.info("Adapting concurrency between %s and %s", config.concurrency_min,
+                config.concurrency_max)
+    return AdaptiveLimiter(config.concurrency_min, config.concurrency_max,
+                           config.concurrency_latency_tolerance,
+                           config.concurrency_max_error_rate)
+
+
+def _delivery_pool(config, process_message, process_batch, shutdown=None, on_failure=None):
+    """Returns the pool deliveries are dispatched to, or None to use consume_messages"""
+    if process_batch is not None:
+        logger.info("Processing messages in batches of up to %s every %s ms",
+                    config.batch_size, config.batch_max_wait_ms)
+        return Batcher(process_batch, config.batch_size,
+                       config.batch_max_wait_ms, config.num_threads, on_failure=on_failure)
+    if inspect.iscoroutinefunction(process_message):
+        logger.info("Running async processor on an event loop with concurrency %s",
+                    config.async_concurrency)
+        _import_async_pool()
+        return AsyncPool(process_message, config.async_concurrency, on_failure=on_failure)
+    if config.execution_pool in ["thread", "process"]:
+        return WorkerPool(process_message, config.num_threads, config.worker_queue_size,
+                          shutdown=shutdown, on_failure=on_failure,
+                          limiter=_concurrency_limiter(config))
+    if (config.prefetch_count is not None or config.consume_params or
+            shutdown is not None or on_failure is not None):
+        # Messages are still processed one at a time, but on a worker so the
+        # consumer thread keeps servicing the connection, e.g. RabbitMQ heartbeats.
+        # The rest of the delivery window waits in the pool's queue.
+        window = config.prefetch_count or config.consume_params.get(
+            "max_messages_per_receive", 1)
+        return WorkerPool(process_message, 1, max(1, window - 1), shutdown=shutdown,
+                          on_failure=on_failure)
+    return None
+
+
+def _prefetch_count(config, pool) -> int:
+    """Returns the broker delivery window, capped to what the pool can hold"""
+    if config.prefetch_count is None:
+        return pool.capacity
+    if config.prefetch_count > pool.capacity:
+        logger.warning("PREFETCH_COUNT %s is more than the %s messages the host can hold. "
+                       "Using %s", config.prefetch_count, pool.capacity, pool.capacity)
+        return pool.capacity
+    return config.prefetch_count
+
+
+def _queue_name(config, processor_class_name):
+    return config.get_env_var("QUEUE_NAME_PREFIX")+config.get_env_var(
+        f'{processor_class_name}_QUEUE_NAME')
+
+
+def _message_callbacks(config, processor_class_name, queue_name, process_message,
+                       service_processor, metrics, rate_limiter=None, circuit_breaker=None):
+    """
+    Wraps a processor's callbacks with hooks, profiling, rate limiting, the
+    circuit breaker, deduplication and metrics. Duplicates are skipped
+    without taking a token, and calls paused by the breaker don't take one.
+    """
+    process_message = _wrap_process(config, process_message)
+    if rate_limiter is not None:
+        process_message = rate_limiter.wrap(process_message)
+    if circuit_breaker is not None:
+        process_message = circuit_breaker.wrap(process_message)
+    deduplicator = get_deduplicator(config)
+    if deduplicator is not None:
+        process_message = deduplicator.wrap(process_message)
+    process_batch = _batch_hook(service_processor)
+    if process_batch is not None:
+        process_batch = _wrap_process(config, process_batch)
+        if rate_limiter is not None:
+            process_batch = rate_limiter.wrap_batch(process_batch)
+        if circuit_breaker is not None:
+            process_batch = circuit_breaker.wrap(process_batch)
+    if metrics is not None:
+        processor_metrics = metrics.for_processor(processor_class_name, queue_name)
+        process_message = processor_metrics.instrument(process_message)
+        if process_batch is not None:
+            process_batch = processor_metrics.instrument_batch(process_batch)
+    return process_message, process_batch
+
 
 def _process_messages(config, service_processor):
-    with get_message_adapter(config) as message_adapter:
-        if config.messaging_type in ["RabbitMqConnection", "SqsConnection"]:
+    shutdown = _shutdown_coordinator(config)
+    # The execution pool is entered first so worker processes are forked
+    # before the broker connection is opened and the SIGTERM handler is set.
+    with _execution_pool(config, service_processor, shutdown) as process_message, \
+            shutdown or nullcontext(), \
+            _hybrid_cron(config, service_processor, shutdown), \
+            _metrics(config) as metrics, \
+            _connect(config) as message_adapter:
+        if config.messaging_type in ["RabbitMqConnection", "SqsConnection",
+                                     "LocalQueueConnection"]:
             processor_class_name = config.get_env_var("PROCESSOR_TYPE")
-            queue_name = config.get_env_var(
-                "QUEUE_NAME_PREFIX")+config.get_env_var(
-                    f'{processor_class_name}_QUEUE_NAME')
-            message_adapter.consume_messages(
-                queue_name=queue_name,
-                callback_function=service_processor.process
-            )
+            queue_name = _queue_name(config, processor_class_name)
+            process_message, process_batch = _message_callbacks(
+                config, processor_class_name, queue_name, process_message,
+                service_processor, metrics, get_rate_limiter(config),
+                get_circuit_breaker(config, processor_class_name, shutdown))
+            retry_policy = _retry_policy(config, processor_class_name, queue_name)
+            pool = _delivery_pool(config, process_message, process_batch, shutdown,
+                                  retry_policy)
+            if pool is None:
+                message_adapter.consume_messages(
+                    queue_name=queue_name,
+                    callback_function=process_message
+                )
+            else:
+                consume_params = dict(config.consume_params)
+                if shutdown is not None:
+                    consume_params["shutdown"] = shutdown
+                pool.start()
+                try:
+                    message_adapter.consume_deliveries(
+                        queue_name=queue_name,
+                        on_delivery=pool.dispatch,
+                        prefetch_count=_prefetch_count(config, pool),
+                        **consume_params
+                    )
+                finally:
+                    pool.shutdown(_grace_left(shutdown))
         else:
             logger.error("Invalid config.messaging_type %s", config.messaging_type)
 
-def _process_cron_expressions(config, service_processor):
-    scheduler = BlockingScheduler()
+
+def _process_queues(config):
+    """Consumes the queue of every PROCESSOR_TYPE processor over one connection and pool"""
+    shutdown = _shutdown_coordinator(config)
+    processors = []
+    for processor_class_name in config.processor_types:
+        processor_config = config.for_processor(processor_class_name)
+        with _startup.phase(f"processor {processor_class_name}"):
+            service_processor = _reloadable(processor_config,
+                                            get_service_processor(processor_config))
+        if service_processor is None:
+            raise ValueError(f"Could not create processor {processor_class_name}")
+        if inspect.iscoroutinefunction(service_processor.process):
+            raise ValueError(f"Async processor {processor_class_name} is not supported "
+                             "with several PROCESSOR_TYPEs")
+        processors.append((processor_class_name, processor_config, service_processor))
+    with shutdown or nullcontext(), \
+            _reload_watcher(config, [processor for _, _, processor in processors]), \
+            _metrics(config) as metrics, \
+            _connect(config) as message_adapter:
+        logger.info("Sharing %s workers between queues by %s scheduling",
+                    config.num_threads, config.queue_scheduling)
+        pool = SharedPool(config.num_threads, shutdown,
+                          SCHEDULING_POLICIES[config.queue_scheduling](),
+                          _concurrency_limiter(config))
+        # One bucket for every queue, the limit is per container
+        rate_limiter = get_rate_limiter(config)
+        subscriptions = []
+        for processor_class_name, processor_config, service_processor in processors:
+            queue_name = _queue_name(config, processor_class_name)
+            circuit_breaker = get_circuit_breaker(processor_config, processor_class_name,
+                                                  shutdown)
+            process_message, _ = _message_callbacks(
+                processor_config, processor_class_name, queue_name,
+                service_processor.process, None, metrics, rate_limiter, circuit_breaker)
+            pool.add_queue(queue_name, process_message, processor_config.queue_concurrency,
+                           weight=processor_config.queue_weight,
+                           priority=processor_config.queue_priority,
+                           on_failure=_retry_policy(processor_config, processor_class_name,
+                                                    queue_name),
+                           circuit_breaker=circuit_breaker)
+            subscriptions.append((queue_name, pool.dispatch, processor_config.queue_concurrency))
+            logger.info("Consuming %s for %s with concurrency %s, weight %s and priority %s",
+                        queue_name, processor_class_name, processor_config.queue_concurrency,
+                        processor_config.queue_weight, processor_config.queue_priority)
+        consume_params = dict(config.consume_params)
+        if shutdown is not None:
+            consume_params["shutdown"] = shutdown
+        pool.start()
+        try:
+            message_adapter.consume_queues(subscriptions, **consume_params)
+        finally:
+            pool.shutdown(_grace_left(shutdown))
+
+def _cron_process(config, process):
+    """Wraps the cron job with hooks, profiling and rate limiting"""
+    process = _wrap_process(config, process)
+    rate_limiter = get_rate_limiter(config)
+    if rate_limiter is not None:
+        process = rate_limiter.wrap(process)
+    return process
+
+def _cron_runner(config, process, election=None):
+    """Returns the CronRunner that every schedule of the cron job calls"""
+    process = _cron_process(config, process)
+    if election is not None:
+        process = election.wrap(process)
+    return CronRunner(process,
+                      max_instances=config.cron_max_instances,
+                      coalesce=config.cron_coalesce,
+                      misfire_grace_seconds=config.cron_misfire_grace_seconds)
+
+def _stop_cron_runner(runner, shutdown):
+    """Waits for running cron jobs, for the rest of the grace period when shutting down"""
+    if not runner.shutdown(_grace_left(shutdown)):
+        logger.warning("%s cron jobs still running after the grace period", runner.running)
+
+def _cron_scheduler(config, runner, scheduler_class):
+    """Returns an apscheduler scheduler calling runner on every CRON_EXPRESSIONS expression"""
+    # Jobs only hand off to the runner, which keeps runs from overlapping
+    job_defaults = {"coalesce": config.cron_coalesce}
+    if config.cron_misfire_grace_seconds is not None:
+        job_defaults["misfire_grace_time"] = config.cron_misfire_grace_seconds
+    scheduler = scheduler_class(job_defaults=job_defaults)
     for expression in config.cron_expressions:
         trigger = CronTrigger.from_crontab(expression)
-        scheduler.add_job(service_processor.process, trigger)
-    
-    # Run at startup if configured
-    if config.run_at_startup:
-        logger.info("Running processor at startup as RUN_AT_STARTUP is set to true for cron with cron expressions")
-        service_processor.process()
+        scheduler.add_job(runner, trigger)
+    return scheduler
+
+def _process_cron_expressions(config, service_processor):
+    _import_cron_libraries()
+    _startup.report()
+    election = get_leader_election(config)
+    runner = _cron_runner(config, service_processor.process, election)
+    shutdown = _shutdown_coordinator(config)
+    scheduler = _cron_scheduler(config, runner, BlockingScheduler)
     
-    scheduler.start()
+    with shutdown or nullcontext(), election or nullcontext():
+        # Run at startup if configured
+        if config.run_at_startup:
+            logger.info("Running processor at startup as RUN_AT_STARTUP is set to true for cron with cron expressions")
+            runner()
 
-def _process_simple_cron(config, service_processor):
+        if shutdown is not None:
+            if shutdown.requested:
+                _stop_cron_runner(runner, shutdown)
+                return
+            shutdown.on_request(lambda: scheduler.shutdown(wait=False))
+        scheduler.start()
+        _stop_cron_runner(runner, shutdown)
+
+def _schedule_simple_cron(config, runner):
+    """Schedules runner every CRON_TIME_AMOUNT CRON_TIME_UNIT"""
     unit = config.get_env_var("CRON_TIME_UNIT").lower()
     amount = float(config.get_env_var("CRON_TIME_AMOUNT"))
     
-    # Run at startup if configured
-    if config.run_at_startup:
-        logger.info("Running processor at startup as RUN_AT_STARTUP is set to true for simple cron")
-        service_processor.process()
-    
     if unit == "seconds":
-        schedule.every(amount).seconds.do(service_processor.process)
+        schedule.every(amount).seconds.do(runner)
     elif unit == "minutes":
-        schedule.every(amount).minutes.do(service_processor.process)
+        schedule.every(amount).minutes.do(runner)
     elif unit == "hours":
-        schedule.every(amount).hours.do(service_processor.process)
+        schedule.every(amount).hours.do(runner)
     elif unit == "days":
         if config.get_env_var("CRON_RUN_AT"):
             schedule.every(amount).days.at(
-                config.get_env_var("CRON_RUN_AT")).do(service_processor.process)
+                config.get_env_var("CRON_RUN_AT")).do(runner)
         else:
-            schedule.every(amount).days.do(service_processor.process)
+            schedule.every(amount).days.do(runner)
     elif unit == "weeks":
-        schedule.every(amount).weeks.do(service_processor.process)
+        schedule.every(amount).weeks.do(runner)
     else:
         raise ValueError(f"Unsupported time unit {unit}")
 
+def _wait_for_next_run(stop) -> bool:
+    """
+    Sleeps until the next simple cron run is due, returns False if stop cuts
+    it short. stop is a shutdown coordinator or an event, or None.
+    """
+    idle_seconds = max(0.0, schedule.idle_seconds())
+    if stop is None:
+        sleep(idle_seconds)
+        return True
+    return not stop.wait(idle_seconds)
+
+def _run_simple_cron(stop):
+    """Runs the scheduled simple cron jobs until stop is set"""
+    # Jobs run on the runner's threads, so a slow job doesn't delay the next tick
     while True:
         schedule.run_pending()
-        sleep(1)
+        if not _wait_for_next_run(stop):
+            break
+
+def _process_simple_cron(config, service_processor):
+    _import_cron_libraries()
+    _startup.report()
+    election = get_leader_election(config)
+    runner = _cron_runner(config, service_processor.process, election)
+    shutdown = _shutdown_coordinator(config)
+    _schedule_simple_cron(config, runner)
+
+    with shutdown or nullcontext(), election or nullcontext():
+        # Run at startup if configured
+        if config.run_at_startup:
+            logger.info("Running processor at startup as RUN_AT_STARTUP is set to true for simple cron")
+            runner()
+
+        _run_simple_cron(shutdown)
+        _stop_cron_runner(runner, shutdown)
+
+def _cron_hook(service_processor):
+    """Returns the processor's process_cron() hook, or None"""
+    if isinstance(service_processor, ReloadableProcessor):
+        if _cron_hook(service_processor.processor) is None:
+            return None
+        return service_processor.process_cron
+    if service_processor is None or not callable(
+            getattr(type(service_processor), "process_cron", None)):
+        return None
+    return service_processor.process_cron
+
+@contextmanager
+def _hybrid_cron(config, service_processor, shutdown=None):
+    """
+    For EXECUTION_TYPE=HYBRID, runs the processor's process_cron() on a
+    background scheduler while the with-block consumes messages
+    """
+    if config.get_env_var("EXECUTION_TYPE") != "HYBRID":
+        yield
+        return
+    process_cron = _cron_hook(service_processor)
+    if process_cron is None:
+        raise ValueError("EXECUTION_TYPE=HYBRID needs a process_cron() method on the processor")
+    _import_cron_libraries()
+    election = get_leader_election(config)
+    runner = _cron_runner(config, process_cron, election)
+    stop = threading.Event()
+    if config.cron_expressions:
+        scheduler = _cron_scheduler(config, runner, BackgroundScheduler)
+        stop_scheduler = functools.partial(scheduler.shutdown, wait=False)
+    else:
+        _schedule_simple_cron(config, runner)
+        scheduler = threading.Thread(target=_run_simple_cron, args=(stop,),
+                                     name="cron-scheduler", daemon=True)
+        stop_scheduler = scheduler.join
+
+    with election or nullcontext():
+        if config.run_at_startup:
+            logger.info("Running process_cron at startup as RUN_AT_STARTUP is set to true")
+            runner()
+        scheduler.start()
+        if shutdown is not None:
+            # Stop scheduling runs as soon as the consumer starts draining
+            shutdown.on_request(stop.set)
+        try:
+            yield
+        finally:
+            stop.set()
+            stop_scheduler()
+            _stop_cron_runner(runner, shutdown)
 
 def main():
     try:
         config = Config()
-        try:
-            config.load_toml("/app/src/info",log_version_string=False)
-            logger.info("Rococo Service Host Version: %s",config.get_project_version())
-        except Exception:  # pylint: disable=W0718
-            # Version info is optional, continue without it
-            pass
-
-        config.project_version = ""
-        config.load_toml("/app",log_version_string=False)
-        logger.info("Service Processor Version: %s",config.get_project_version())
-
-        if not config.validate_env_vars():
-            raise ValueError("Invalid env configuration. Exiting program.")
-
-        service_processor = get_service_processor(config)
-
-        if config.get_env_var("EXECUTION_TYPE") not in ["CRON"]: # if its a message processor
-            _process_messages(config, service_processor)
-        elif config.cron_expressions:  # if its cron with cron expressions
-            _process_cron_expressions(config, service_processor)
-        else: # if its simple cron
-            _process_simple_cron(config, service_processor)
+        with _startup.phase("toml"):
+            try:
+                config.load_toml("/app/src/info",log_version_string=False)
+                logger.info("Rococo Service Host Version: %s",config.get_project_version())
+            except Exception:  # pylint: disable=W0718
+                # Version info is optional, continue without it
+                pass
+
+            config.project_version = ""
+            config.load_toml("/app",log_version_string=False)
+            logger.info("Service Processor Version: %s",config.get_project_version())
+
+        with _startup.phase("validation"):
+            if not config.validate_env_vars():
+                raise ValueError("Invalid env configuration. Exiting program.")
+        _startup.enabled = config.startup_profile
+
+        if config.execution_pool == "process" or len(config.processor_types) > 1:
+            # Each worker process, or each queue, builds its own processor
+            service_processor = None
+        else:
+            with _startup.phase("processor"):
+                service_processor = _reloadable(config, get_service_processor(config))
+
+        with _reload_watcher(config, [service_processor]):
+            if len(config.processor_types) > 1:  # if it consumes several queues
+                _process_queues(config)
+            elif config.get_env_var("EXECUTION_TYPE") not in ["CRON"]: # if its a message processor
+                _process_messages(config, service_processor)
+            elif config.cron_expressions:  # if its cron with cron expressions
+                _process_cron_expressions(config, service_processor)
+            else: # if its simple cron
+                _process_simple_cron(config, service_processor)
 
     except KeyboardInterrupt:
         # Ignore KeyboardInterrupt
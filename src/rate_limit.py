@@ -0,0 +1,112 @@
+"""
+Token bucket pacing of processor invocations
+"""
+import fcntl
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """In-process bucket refilled at rate tokens a second, holding up to burst"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Takes tokens, going into debt when there aren't enough, and returns
+        how many seconds the caller has to wait before using them
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._updated_at) * self.rate) - tokens
+            self._updated_at = now
+            return max(0.0, -self._tokens / self.rate)
+
+
+class FileTokenBucket:
+    """
+    Bucket kept in a JSON file under an exclusive flock, so that every
+    process and container sharing the file draws from the same tokens.
+    All of them must use the same rate and burst.
+    """
+
+    def __init__(self, path: str, rate: float, burst: float):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Like TokenBucket.reserve, with the bucket read and written under the file lock"""
+        with self._lock, os.fdopen(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666),
+                                   "r+", encoding="UTF-8") as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            now = time.time()
+            try:
+                state = json.loads(state_file.read())
+                available = state["tokens"] + max(0.0, now - state["updated_at"]) * self.rate
+            except (ValueError, KeyError, TypeError):
+                available = self.burst
+            available = min(self.burst, available) - tokens
+            state_file.seek(0)
+            state_file.truncate()
+            json.dump({"tokens": available, "updated_at": now}, state_file)
+            state_file.flush()
+        return max(0.0, -available / self.rate)
+
+
+class RateLimiter:
+    """
+    Paces calls to a process callable with a bucket. Any object with a
+    reserve(tokens) method returning the seconds to wait can be the bucket.
+    """
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def acquire(self, tokens: float = 1):
+        """Blocks until tokens may be used"""
+        delay = self.bucket.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: float = 1):
+        """Waits on the event loop until tokens may be used"""
+        import asyncio  # pylint: disable=C0415
+        delay = self.bucket.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def wrap(self, process: Callable) -> Callable:
+        """Wraps a process callable, sync or async, to take a token before each call"""
+        if inspect.iscoroutinefunction(process):
+            @functools.wraps(process)
+            async def _limited_async(*args, **kwargs):
+                await self.acquire_async()
+                return await process(*args, **kwargs)
+            return _limited_async
+
+        @functools.wraps(process)
+        def _limited(*args, **kwargs):
+            self.acquire()
+            return process(*args, **kwargs)
+        return _limited
+
+    def wrap_batch(self, process_batch: Callable) -> Callable:
+        """Wraps a process_batch(messages) callable to take a token per message"""
+        @functools.wraps(process_batch)
+        def _limited_batch(messages):
+            self.acquire(len(messages))
+            return process_batch(messages)
+        return _limited_batch
@@ -0,0 +1,147 @@
+"""
+Hot reload of service processors on SIGHUP or when their source changes
+"""
+import inspect
+import os
+import signal
+import sys
+import threading
+from typing import Callable, List
+
+from logger import Logger
+
+logger = Logger().get_logger()
+
+
+class ReloadableProcessor:
+    """
+    Stands in for a service processor and forwards calls to the current
+    instance. reload() builds a new instance with factory, which re-imports
+    the processor module, and swaps it in: the next message goes to the new
+    instance while calls already running finish on the old one. A reload
+    that fails keeps the running instance.
+    """
+
+    def __init__(self, processor, factory: Callable):
+        self.processor = processor
+        self.name = type(processor).__name__
+        self._factory = factory
+        self._is_async = inspect.iscoroutinefunction(processor.process)
+        self._lock = threading.Lock()
+        if self._is_async:
+            async def _process(*args, **kwargs):
+                return await self.processor.process(*args, **kwargs)
+        else:
+            def _process(*args, **kwargs):
+                return self.processor.process(*args, **kwargs)
+        self.process = _process
+
+    def process_batch(self, messages):
+        """Forwards a batch to the current instance"""
+        return self.processor.process_batch(messages)
+
+    def process_cron(self, *args, **kwargs):
+        """Forwards a scheduled run to the current instance"""
+        return self.processor.process_cron(*args, **kwargs)
+
+    @property
+    def source_file(self) -> str:
+        """File the processor class was loaded from, None if unknown"""
+        module = sys.modules.get(type(self.processor).__module__)
+        return getattr(module, "__file__", None)
+
+    def reload(self) -> bool:
+        """Swaps in a freshly imported instance, returns whether it worked"""
+        with self._lock:
+            try:
+                processor = self._factory()
+            except Exception:  # pylint: disable=W0718
+                logger.exception("Reloading %s failed, keeping the running version", self.name)
+                return False
+            if processor is None:
+                logger.error("Reloading %s failed, keeping the running version", self.name)
+                return False
+            if inspect.iscoroutinefunction(processor.process) != self._is_async:
+                logger.error("Reloaded %s switched between sync and async process, "
+                             "keeping the running version", self.name)
+                return False
+            self.processor = processor
+            logger.info("Reloaded %s", self.name)
+            return True
+
+
+class ReloadWatcher:
+    """
+    Reloads processors on SIGHUP and, when poll_seconds is given, whenever
+    the modification time of their source file changes. Reloads run on a
+    watcher thread, never inside the signal handler.
+    """
+
+    def __init__(self, processors: List[ReloadableProcessor], on_sighup: bool = True,
+                 poll_seconds: float = None):
+        self.processors = processors
+        self.on_sighup = on_sighup
+        self.poll_seconds = poll_seconds
+        self._requested = threading.Event()
+        self._stopped = threading.Event()
+        self._mtimes = {}
+        self._previous_handler = None
+        self._watcher = None
+
+    def request(self):
+        """Asks the watcher to reload every processor"""
+        self._requested.set()
+
+    def _handle_signal(self, signum, frame):  # pylint: disable=W0613
+        self.request()
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except (OSError, TypeError):
+            return None
+
+    def _changed(self) -> List[ReloadableProcessor]:
+        """Processors whose source file changed since it was last seen"""
+        changed = []
+        for processor in self.processors:
+            path = processor.source_file
+            mtime = self._mtime(path)
+            if mtime is not None and self._mtimes.get(path, mtime) != mtime:
+                changed.append(processor)
+            self._mtimes[path] = mtime
+        return changed
+
+    def _watch(self):
+        while True:
+            requested = self._requested.wait(self.poll_seconds)
+            if self._stopped.is_set():
+                return
+            if requested:
+                self._requested.clear()
+                logger.info("SIGHUP received, reloading processors...")
+                for processor in self.processors:
+                    processor.reload()
+                # Don't reload again for the edits that led to the signal
+                self._changed()
+            else:
+                for processor in self._changed():
+                    logger.info("%s changed, reloading %s...", processor.source_file,
+                                processor.name)
+                    processor.reload()
+
+    def __enter__(self):
+        self._changed()
+        if self.on_sighup:
+            self._previous_handler = signal.signal(signal.SIGHUP, self._handle_signal)
+        self._watcher = threading.Thread(target=self._watch, name="reload-watcher", daemon=True)
+        self._watcher.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.on_sighup:
+            signal.signal(signal.SIGHUP, self._previous_handler)
+        self._stopped.set()
+        self._requested.set()
+        self._watcher.join()
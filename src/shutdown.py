@@ -0,0 +1,86 @@
+"""
+Graceful shutdown on SIGTERM
+"""
+import signal
+import threading
+import time
+from typing import Callable
+
+from logger import Logger
+
+logger = Logger().get_logger()
+
+
+class ShutdownCoordinator:
+    """
+    Turns SIGTERM into a graceful stop. Consumers poll requested to stop
+    taking new work, and in-flight work has until remaining() runs out to
+    finish. Callbacks registered with on_request run on a watcher thread,
+    never inside the signal handler.
+    """
+
+    def __init__(self, grace_seconds: float):
+        self.grace_seconds = grace_seconds
+        self._requested = threading.Event()
+        self._wakeup = threading.Event()
+        self._deadline = None
+        self._callbacks = []
+        self._previous_handler = None
+        self._watcher = None
+
+    @property
+    def requested(self) -> bool:
+        """Whether a shutdown has been requested"""
+        return self._requested.is_set()
+
+    def remaining(self) -> float:
+        """Seconds left of the grace period, the whole period until a shutdown is requested"""
+        if self._deadline is None:
+            return self.grace_seconds
+        return max(0.0, self._deadline - time.monotonic())
+
+    def request(self):
+        """Starts the grace period, only the first request counts"""
+        if self._requested.is_set():
+            return
+        self._deadline = time.monotonic() + self.grace_seconds
+        self._requested.set()
+        self._wakeup.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Blocks until a shutdown is requested, returns whether it was"""
+        return self._requested.wait(timeout)
+
+    def on_request(self, callback: Callable[[], None]):
+        """Registers a callback to run once a shutdown is requested"""
+        self._callbacks.append(callback)
+
+    def _handle_signal(self, signum, frame):  # pylint: disable=W0613
+        self.request()
+
+    def _watch(self):
+        self._wakeup.wait()
+        if not self.requested:
+            return
+        logger.info("Shutdown requested, finishing in-flight work for up to %s seconds...",
+                    self.grace_seconds)
+        for callback in self._callbacks:
+            try:
+                callback()
+            except Exception:  # pylint: disable=W0718
+                logger.exception("Error in shutdown callback")
+
+    def __enter__(self):
+        self._previous_handler = signal.signal(signal.SIGTERM, self._handle_signal)
+        self._watcher = threading.Thread(target=self._watch, name="shutdown-watcher",
+                                         daemon=True)
+        self._watcher.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Restore the handler first so a late SIGTERM can't interrupt the wakeup below
+        signal.signal(signal.SIGTERM, self._previous_handler)
+        self._wakeup.set()
+        self._watcher.join()
+        if self.requested:
+            logger.info("Shutdown complete")
@@ -0,0 +1,44 @@
+"""
+Timing of the host's startup phases
+"""
+import time
+from contextlib import contextmanager
+
+from logger import Logger
+
+logger = Logger().get_logger()
+
+
+class StartupProfile:
+    """
+    Records how long each startup phase took, and logs the breakdown once
+    when enabled (STARTUP_PROFILE=1).
+    """
+
+    def __init__(self, started_at: float = None):
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.enabled = False
+        self.phases = []
+        self._reported = False
+
+    def record(self, name: str, seconds: float):
+        """Adds a phase that was timed elsewhere"""
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times the body of the with block as phase name"""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started_at)
+
+    def report(self):
+        """Logs the breakdown, the first time it is called"""
+        if not self.enabled or self._reported:
+            return
+        self._reported = True
+        total = time.perf_counter() - self.started_at
+        logger.info("Startup took %.0f ms: %s", total * 1000,
+                    ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases))
@@ -0,0 +1,261 @@
+"""
+Unit tests for the host message adapters
+"""
+import json
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adapters import (Delivery, InFlightCounter, HostRabbitMqConnection, HostSqsConnection,
+                      consume_in_threads)
+from shutdown import ShutdownCoordinator
+
+
+class TestDelivery(unittest.TestCase):
+    """Test cases for Delivery"""
+
+    def test_ack_settles_once(self):
+        """Test ack is forwarded only once"""
+        on_ack = MagicMock()
+        on_nack = MagicMock()
+        delivery = Delivery({"a": 1}, on_ack, on_nack)
+
+        delivery.ack()
+        delivery.ack()
+        delivery.nack()
+
+        on_ack.assert_called_once()
+        on_nack.assert_not_called()
+        self.assertTrue(delivery.settled)
+
+    def test_nack_forwards_requeue(self):
+        """Test nack passes the requeue flag"""
+        on_nack = MagicMock()
+        delivery = Delivery({}, MagicMock(), on_nack)
+        delivery.nack(requeue=False)
+        on_nack.assert_called_once_with(False)
+
+
+class TestInFlightCounter(unittest.TestCase):
+    """Test cases for InFlightCounter"""
+
+    def test_wait_below(self):
+        """Test wait_below reports whether the count dropped below the limit"""
+        counter = InFlightCounter()
+        counter.increment()
+        counter.increment()
+        self.assertFalse(counter.wait_below(2, timeout=0.01))
+        counter.decrement()
+        self.assertTrue(counter.wait_below(2, timeout=0.01))
+        self.assertEqual(counter.value, 1)
+
+
+class TestConsumeInThreads(unittest.TestCase):
+    """Test cases for consume_in_threads"""
+
+    @staticmethod
+    def _fail(queue_name, on_delivery, prefetch_count, **_kwargs):
+        raise OSError(f"{queue_name} is gone")
+
+    @patch('adapters.delivery.logger')
+    def test_failed_consumer_stops_the_others(self, mock_logger):
+        """Test an exception in one consumer shuts the others down and is raised"""
+        shutdown = ShutdownCoordinator(grace_seconds=5)
+        stopped = []
+
+        def _consume(queue_name, on_delivery, prefetch_count, shutdown):
+            shutdown.wait(5)
+            stopped.append(queue_name)
+
+        with self.assertRaises(OSError):
+            consume_in_threads([_consume, self._fail], [("a", None, 1), ("b", None, 1)],
+                               shutdown=shutdown)
+
+        self.assertTrue(shutdown.requested)
+        self.assertEqual(stopped, ["a"])
+        mock_logger.exception.assert_called_once()
+
+    @patch('adapters.delivery.logger')
+    def test_failed_consumer_is_raised_without_shutdown(self, mock_logger):
+        """Test the exception is raised while the other consumers are still running"""
+        with self.assertRaises(OSError):
+            consume_in_threads([lambda *args: threading.Event().wait(5), self._fail],
+                               [("a", None, 1), ("b", None, 1)])
+
+
+class TestHostRabbitMqConnection(unittest.TestCase):
+    """Test cases for HostRabbitMqConnection.consume_deliveries"""
+
+    def _make_connection(self, messages):
+        connection = HostRabbitMqConnection('localhost', 5672, 'user', 'password', '/')
+        channel = MagicMock()
+        channel.consume.return_value = iter(messages)
+        connection._channel = channel
+        connection._connection = MagicMock()
+        connection._connection.add_callback_threadsafe.side_effect = lambda cb: cb()
+        connection._read_consume_config = MagicMock(return_value={'EXIT_WHEN_FINISHED': '1'})
+        return connection, channel
+
+    def test_consume_deliveries_acks_on_consumer_thread(self):
+        """Test deliveries are decoded and acks scheduled on the connection"""
+        method = MagicMock(delivery_tag=7, redelivered=False)
+        body = json.dumps({"hello": "world"}).encode()
+        connection, channel = self._make_connection([(method, MagicMock(), body),
+                                                     (None, None, None)])
+        received = []
+
+        def _on_delivery(delivery):
+            received.append(delivery)
+            delivery.ack()
+
+        connection.consume_deliveries('queue', _on_delivery, prefetch_count=4)
+
+        channel.basic_qos.assert_called_once_with(prefetch_count=4)
+        self.assertEqual(received[0].body, {"hello": "world"})
+        self.assertEqual(received[0].queue_name, 'queue')
+        connection._connection.add_callback_threadsafe.assert_called_once()
+        channel.basic_ack.assert_called_once_with(7)
+
+    def test_consume_deliveries_drains_on_shutdown(self):
+        """Test a shutdown stops consuming and keeps serving acks for in-flight deliveries"""
+        first = MagicMock(delivery_tag=7, redelivered=False)
+        second = MagicMock(delivery_tag=8, redelivered=False)
+        body = json.dumps({}).encode()
+        connection, channel = self._make_connection([(first, MagicMock(), body),
+                                                     (second, MagicMock(), body)])
+        shutdown = ShutdownCoordinator(5)
+        held = []
+
+        def _on_delivery(delivery):
+            held.append(delivery)
+            shutdown.request()
+
+        # The held delivery finishes while the connection is pumped during the drain
+        connection._connection.process_data_events.side_effect = lambda time_limit: held[0].ack()
+
+        connection.consume_deliveries('queue', _on_delivery, prefetch_count=4, shutdown=shutdown)
+
+        channel.consume.assert_called_once_with(queue='queue', inactivity_timeout=1)
+        channel.basic_nack.assert_called_once_with(8, requeue=True)
+        channel.cancel.assert_called_once()
+        channel.basic_ack.assert_called_once_with(7)
+
+    def test_consume_deliveries_rejects_invalid_json(self):
+        """Test undecodable bodies are rejected without requeue"""
+        method = MagicMock(delivery_tag=3)
+        connection, channel = self._make_connection([(method, MagicMock(), b'not json'),
+                                                     (None, None, None)])
+        on_delivery = MagicMock()
+
+        connection.consume_deliveries('queue', on_delivery)
+
+        on_delivery.assert_not_called()
+        channel.basic_nack.assert_called_once_with(3, requeue=False)
+
+
+class TestHostSqsConnection(unittest.TestCase):
+    """Test cases for HostSqsConnection.consume_deliveries"""
+
+    @patch('rococo.messaging.sqs.boto3')
+    def test_consume_deliveries_deletes_on_ack(self, mock_boto3):
+        """Test acked messages are deleted and receive size follows free slots"""
+        connection = HostSqsConnection('key', 'secret', 'us-east-1')
+        queue = MagicMock(url='https://sqs/queue')
+        connection._sqs.create_queue.return_value = queue
+        connection._read_consume_config = MagicMock(return_value={'EXIT_WHEN_FINISHED': '1'})
+        message = MagicMock(body=json.dumps({"n": 1}), receipt_handle='rh',
+                            message_id='id-1', attributes={'ApproximateReceiveCount': '2'})
+        queue.receive_messages.side_effect = [[message], []]
+        received = []
+
+        def _on_delivery(delivery):
+            received.append(delivery)
+            delivery.ack()
+
+        connection.consume_deliveries('queue', _on_delivery, prefetch_count=3)
+
+        self.assertEqual(received[0].body, {"n": 1})
+        self.assertEqual(received[0].message_id, 'id-1')
+        self.assertTrue(received[0].redelivered)
+        self.assertEqual(queue.receive_messages.call_args_list[0].kwargs['MaxNumberOfMessages'], 3)
+        connection._sqs.meta.client.delete_message.assert_called_once_with(
+            QueueUrl='https://sqs/queue', ReceiptHandle='rh')
+
+
+    @patch('rococo.messaging.sqs.boto3')
+    def test_dead_letter_uses_the_client(self, mock_boto3):
+        """Test dead-lettering on worker threads resolves the queue URL once, with the client"""
+        connection = HostSqsConnection('key', 'secret', 'us-east-1')
+        client = connection._sqs.meta.client
+        client.create_queue.return_value = {'QueueUrl': 'https://sqs/dlq'}
+        queue = MagicMock(url='https://sqs/queue')
+        deliveries = [
+            connection._make_delivery(queue, MagicMock(body='{}', receipt_handle=f'rh-{n}'),
+                                      'queue', InFlightCounter())
+            for n in range(4)
+        ]
+        workers = [threading.Thread(target=delivery.dead_letter, args=('dlq',))
+                   for delivery in deliveries]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        client.create_queue.assert_called_once_with(QueueName='dlq')
+        connection._sqs.create_queue.assert_not_called()
+        self.assertEqual(client.send_message.call_count, 4)
+        client.send_message.assert_called_with(QueueUrl='https://sqs/dlq', MessageBody='{}')
+
+    @patch('rococo.messaging.sqs.boto3')
+    def test_settle_is_in_flight_until_sqs_has_it(self, mock_boto3):
+        """Test a delivery counts as in flight until the delete call has returned"""
+        connection = HostSqsConnection('key', 'secret', 'us-east-1')
+        in_flight = InFlightCounter()
+        seen = []
+        connection._sqs.meta.client.delete_message.side_effect = (
+            lambda **kwargs: seen.append(in_flight.value))
+        delivery = connection._make_delivery(MagicMock(url='https://sqs/queue'),
+                                             MagicMock(body='{}', receipt_handle='rh'),
+                                             'queue', in_flight)
+
+        delivery.ack()
+
+        self.assertEqual(seen, [1])
+        self.assertEqual(in_flight.value, 0)
+
+    @patch('rococo.messaging.sqs.boto3')
+    def test_consume_deliveries_receive_settings(self, mock_boto3):
+        """Test receive size and long polling follow the configured window"""
+        connection = HostSqsConnection('key', 'secret', 'us-east-1')
+        queue = MagicMock(url='https://sqs/queue')
+        connection._sqs.create_queue.return_value = queue
+        connection._read_consume_config = MagicMock(return_value={'EXIT_WHEN_FINISHED': '1'})
+        queue.receive_messages.return_value = []
+
+        connection.consume_deliveries('queue', MagicMock(), prefetch_count=50,
+                                      max_messages_per_receive=4, wait_time_seconds=1)
+
+        queue.receive_messages.assert_called_once_with(
+            AttributeNames=['All'], MaxNumberOfMessages=4, WaitTimeSeconds=1)
+
+    @patch('rococo.messaging.sqs.boto3')
+    def test_short_grace_period_keeps_long_polling(self, mock_boto3):
+        """Test a grace period below 2 seconds still waits a second per receive"""
+        connection = HostSqsConnection('key', 'secret', 'us-east-1')
+        queue = MagicMock(url='https://sqs/queue')
+        connection._sqs.create_queue.return_value = queue
+        connection._read_consume_config = MagicMock(return_value={'EXIT_WHEN_FINISHED': '1'})
+        queue.receive_messages.return_value = []
+
+        connection.consume_deliveries('queue', MagicMock(), shutdown=ShutdownCoordinator(1))
+
+        self.assertEqual(queue.receive_messages.call_args.kwargs['WaitTimeSeconds'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Unit tests for dispatch/adaptive.py
+"""
+import unittest
+import threading
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dispatch import AdaptiveLimiter
+
+
+def _run_window(limiter, latency, failed=False):
+    """Runs one full window of calls, all slots taken before any completes"""
+    calls = max(limiter.limit, limiter.MIN_WINDOW)
+    for _ in range(calls):
+        limiter.acquire()
+        limiter.release(latency, failed)
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    """Test cases for AdaptiveLimiter"""
+
+    def _saturate(self, limiter, latency, failed=False):
+        """Completes a window in which every slot was in use"""
+        window = max(limiter.limit, limiter.MIN_WINDOW)
+        completed = 0
+        while completed < window:
+            batch = min(limiter.limit, window - completed)
+            for _ in range(batch):
+                limiter.acquire()
+            for _ in range(batch):
+                limiter.release(latency, failed)
+            completed += batch
+
+    def test_starts_at_min(self):
+        """Test the limit starts at its lower bound"""
+        limiter = AdaptiveLimiter(2, 10)
+        self.assertEqual(limiter.limit, 2)
+
+    def test_grows_while_latency_holds(self):
+        """Test the limit grows by one per saturated window up to max"""
+        limiter = AdaptiveLimiter(1, 4)
+        for expected in [2, 3, 4, 4]:
+            self._saturate(limiter, 0.1)
+            self.assertEqual(limiter.limit, expected)
+
+    def test_does_not_grow_unused(self):
+        """Test a window that never used every slot leaves the limit alone"""
+        limiter = AdaptiveLimiter(3, 10)
+        _run_window(limiter, 0.1)
+        self.assertEqual(limiter.limit, 3)
+
+    def test_backs_off_on_latency(self):
+        """Test latency beyond the tolerance cuts the limit multiplicatively"""
+        limiter = AdaptiveLimiter(1, 20)
+        limiter.limit = 8
+        self._saturate(limiter, 0.1)
+        self.assertEqual(limiter.limit, 9)
+        self._saturate(limiter, 0.5)
+        self.assertEqual(limiter.limit, 6)
+
+    def test_backs_off_on_errors(self):
+        """Test an error rate above the threshold cuts the limit, not below min"""
+        limiter = AdaptiveLimiter(2, 20)
+        limiter.limit = 3
+        self._saturate(limiter, 0.1, failed=True)
+        self.assertEqual(limiter.limit, 2)
+        self._saturate(limiter, 0.1, failed=True)
+        self.assertEqual(limiter.limit, 2)
+
+    def test_acquire_blocks_at_limit(self):
+        """Test a call waits for a slot once the limit is reached"""
+        limiter = AdaptiveLimiter(1, 1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def _acquire():
+            limiter.acquire()
+            acquired.set()
+
+        threading.Thread(target=_acquire, daemon=True).start()
+        self.assertFalse(acquired.wait(0.1))
+        limiter.release(0.1)
+        self.assertTrue(acquired.wait(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
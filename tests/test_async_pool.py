@@ -0,0 +1,108 @@
+"""
+Unit tests for dispatch/async_pool.py
+"""
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adapters import Delivery
+from dispatch import AsyncPool
+
+
+class AsyncProcessor:
+    """Async processor that records how many messages overlap"""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.processed = []
+
+    async def process(self, message):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.05)
+        self.running -= 1
+        if message.get("fail"):
+            raise RuntimeError("boom")
+        self.processed.append(message["n"])
+
+
+class TestAsyncPool(unittest.TestCase):
+    """Test cases for AsyncPool"""
+
+    def test_capacity_is_concurrency(self):
+        """Test the prefetch window matches the concurrency limit"""
+        pool = AsyncPool(AsyncProcessor().process, concurrency=200)
+        self.assertEqual(pool.capacity, 200)
+
+    def test_messages_run_concurrently_and_are_acked(self):
+        """Test coroutines overlap on the event loop and each delivery is acked"""
+        processor = AsyncProcessor()
+        deliveries = [Delivery({"n": n}, MagicMock(), MagicMock()) for n in range(10)]
+
+        with AsyncPool(processor.process, concurrency=10) as pool:
+            for delivery in deliveries:
+                pool.dispatch(delivery)
+
+        self.assertEqual(sorted(processor.processed), list(range(10)))
+        self.assertEqual(processor.max_running, 10)
+        for delivery in deliveries:
+            delivery._on_ack.assert_called_once()
+
+    def test_concurrency_limit(self):
+        """Test no more than concurrency coroutines run at once"""
+        processor = AsyncProcessor()
+
+        with AsyncPool(processor.process, concurrency=3) as pool:
+            for n in range(9):
+                pool.dispatch(Delivery({"n": n}, MagicMock(), MagicMock()))
+
+        self.assertEqual(processor.max_running, 3)
+
+    def test_failed_coroutine_is_still_acked(self):
+        """Test an exception in the processor is logged and the delivery acked"""
+        delivery = Delivery({"n": 1, "fail": True}, MagicMock(), MagicMock())
+
+        with AsyncPool(AsyncProcessor().process, concurrency=1) as pool:
+            pool.dispatch(delivery)
+
+        delivery._on_ack.assert_called_once()
+
+    def test_settling_does_not_block_the_event_loop(self):
+        """Test a slow ack runs off the event loop while other coroutines go on"""
+        processor = AsyncProcessor()
+        slow = Delivery({"n": 0}, MagicMock(), MagicMock())
+        ack_threads = []
+
+        def _slow_ack():
+            ack_threads.append(threading.current_thread().name)
+            time.sleep(0.3)
+
+        slow._on_ack.side_effect = _slow_ack
+        others = [Delivery({"n": n}, MagicMock(), MagicMock()) for n in range(1, 4)]
+
+        with AsyncPool(processor.process, concurrency=10) as pool:
+            pool.dispatch(slow)
+            started = time.monotonic()
+            time.sleep(0.1)
+            for delivery in others:
+                pool.dispatch(delivery)
+            while (not all(delivery._on_ack.called for delivery in others) and
+                   time.monotonic() - started < 5):
+                time.sleep(0.01)
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 0.3)
+        self.assertTrue(ack_threads[0].startswith("processor-settle"))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
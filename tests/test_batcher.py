@@ -0,0 +1,120 @@
+"""
+Unit tests for dispatch/batcher.py
+"""
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adapters import Delivery
+from dispatch import Batcher
+
+
+class TestBatcher(unittest.TestCase):
+    """Test cases for Batcher"""
+
+    def test_capacity(self):
+        """Test capacity leaves room for one batch filling up per worker"""
+        batcher = Batcher(MagicMock(), batch_size=10, max_wait_ms=100, num_workers=2)
+        self.assertEqual(batcher.capacity, 30)
+
+    def test_flushes_full_batches(self):
+        """Test batches are flushed as soon as batch_size messages are pending"""
+        batches = []
+        deliveries = [Delivery(n, MagicMock(), MagicMock()) for n in range(6)]
+
+        with Batcher(batches.append, batch_size=3, max_wait_ms=60000) as batcher:
+            for delivery in deliveries:
+                batcher.dispatch(delivery)
+            deadline = time.monotonic() + 5
+            while len(batches) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual(batches, [[0, 1, 2], [3, 4, 5]])
+        for delivery in deliveries:
+            delivery._on_ack.assert_called_once()
+
+    def test_flushes_partial_batch_after_max_wait(self):
+        """Test a partial batch is flushed once the oldest message waited max_wait_ms"""
+        flushed = threading.Event()
+        batches = []
+
+        def _process_batch(messages):
+            batches.append(messages)
+            flushed.set()
+
+        with Batcher(_process_batch, batch_size=100, max_wait_ms=50) as batcher:
+            batcher.dispatch(Delivery("a", MagicMock(), MagicMock()))
+            batcher.dispatch(Delivery("b", MagicMock(), MagicMock()))
+            self.assertTrue(flushed.wait(5))
+
+        self.assertEqual(batches, [["a", "b"]])
+
+    def test_per_message_results(self):
+        """Test falsy results fail their message and truthy ones ack it"""
+        deliveries = [Delivery(n, MagicMock(), MagicMock()) for n in range(3)]
+        on_failure = MagicMock()
+
+        with Batcher(lambda messages: [True, False, True], batch_size=3,
+                     max_wait_ms=60000, on_failure=on_failure) as batcher:
+            for delivery in deliveries:
+                batcher.dispatch(delivery)
+
+        deliveries[0]._on_ack.assert_called_once()
+        on_failure.assert_called_once_with(deliveries[1])
+        deliveries[2]._on_ack.assert_called_once()
+
+    @patch('dispatch.batcher.logger')
+    def test_failed_messages_are_rejected_by_default(self, mock_logger):
+        """Test failed messages are logged and rejected without requeueing, not looped"""
+        deliveries = [Delivery(n, MagicMock(), MagicMock()) for n in range(2)]
+
+        with Batcher(lambda messages: [False, True], batch_size=2,
+                     max_wait_ms=60000) as batcher:
+            for delivery in deliveries:
+                batcher.dispatch(delivery)
+
+        deliveries[0]._on_nack.assert_called_once_with(False)
+        deliveries[0]._on_ack.assert_not_called()
+        deliveries[1]._on_ack.assert_called_once()
+        mock_logger.error.assert_called_once()
+
+    def test_exception_fails_batch(self):
+        """Test an exception fails every message in the batch"""
+        deliveries = [Delivery(n, MagicMock(), MagicMock()) for n in range(2)]
+        on_failure = MagicMock()
+
+        with Batcher(MagicMock(side_effect=RuntimeError("db down")), batch_size=2,
+                     max_wait_ms=60000, on_failure=on_failure) as batcher:
+            for delivery in deliveries:
+                batcher.dispatch(delivery)
+
+        self.assertEqual([call.args[0] for call in on_failure.call_args_list], deliveries)
+
+    def test_mismatched_results_fail_batch(self):
+        """Test a wrong number of results fails the batch"""
+        deliveries = [Delivery(n, MagicMock(), MagicMock()) for n in range(2)]
+        on_failure = MagicMock()
+
+        with Batcher(lambda messages: [True], batch_size=2, max_wait_ms=60000,
+                     on_failure=on_failure) as batcher:
+            for delivery in deliveries:
+                batcher.dispatch(delivery)
+
+        self.assertEqual([call.args[0] for call in on_failure.call_args_list], deliveries)
+
+    def test_shutdown_flushes_pending(self):
+        """Test pending messages are flushed on shutdown"""
+        batches = []
+        with Batcher(batches.append, batch_size=10, max_wait_ms=60000) as batcher:
+            batcher.dispatch(Delivery(1, MagicMock(), MagicMock()))
+        self.assertEqual(batches, [[1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
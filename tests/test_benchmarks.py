@@ -0,0 +1,40 @@
+"""
+Smoke tests for the dispatch benchmarks
+"""
+import unittest
+import sys
+import os
+
+# Add project root and src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from benchmarks.dispatch import run_benchmark, run_isolated
+
+
+class TestDispatchBenchmark(unittest.TestCase):
+    """Test cases for benchmarks/dispatch.py"""
+
+    def test_run_benchmark_inline(self):
+        """Test every message is measured in inline mode"""
+        result = run_benchmark("noop", "inline", 1, 50)
+        self.assertEqual(result["messages"], 50)
+        self.assertGreater(result["msgs_per_sec"], 0)
+        self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+
+    def test_run_benchmark_thread_pool(self):
+        """Test the worker pool path settles every delivery"""
+        result = run_benchmark("sleep", "thread", 4, 20, sleep_ms=1)
+        self.assertEqual(result["messages"], 20)
+
+    def test_run_isolated_counts_worker_processes(self):
+        """Test a scenario run in its own interpreter reports the memory of its workers too"""
+        thread = run_isolated("noop", "thread", 2, 20)
+        processes = run_isolated("noop", "process", 2, 20)
+        self.assertEqual(processes["messages"], 20)
+        self.assertGreater(thread["rss_mb"], 0)
+        self.assertGreater(processes["rss_mb"], thread["rss_mb"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Unit tests for circuit_breaker.py
+"""
+import asyncio
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from dispatch.context import processing
+from factories import Config, get_circuit_breaker
+
+
+def _fail(_message):
+    raise RuntimeError("downstream is down")
+
+
+@patch('circuit_breaker.time.monotonic')
+class TestCircuitBreaker(unittest.TestCase):
+    """Test cases for CircuitBreaker"""
+
+    def _breaker(self, **kwargs):
+        settings = {"failure_ratio": 0.5, "window_seconds": 10, "min_calls": 4,
+                    "open_seconds": 30, "probes": 2}
+        settings.update(kwargs)
+        return CircuitBreaker("TestProcessor", **settings)
+
+    def _call(self, process, message=None):
+        try:
+            return process(message)
+        except RuntimeError:
+            return "failed"
+
+    def test_trips_at_the_failure_ratio(self, mock_monotonic):
+        """Test the breaker opens once enough calls in the window failed"""
+        mock_monotonic.return_value = 100.0
+        breaker = self._breaker()
+        succeed, fail = breaker.wrap(lambda m: "ok"), breaker.wrap(_fail)
+        for process in [succeed, fail, succeed]:
+            self._call(process)
+        self.assertEqual(breaker.state, CLOSED)
+        self._call(fail)
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_old_failures_leave_the_window(self, mock_monotonic):
+        """Test failures older than the window don't count"""
+        breaker = self._breaker()
+        fail, succeed = breaker.wrap(_fail), breaker.wrap(lambda m: "ok")
+        mock_monotonic.return_value = 100.0
+        for _ in range(3):
+            self._call(fail)
+        mock_monotonic.return_value = 120.0
+        self._call(fail)
+        for _ in range(3):
+            self._call(succeed)
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_half_open_probes_close_it(self, mock_monotonic):
+        """Test successful probes after open_seconds close the breaker"""
+        mock_monotonic.return_value = 100.0
+        breaker = self._breaker(min_calls=1)
+        self._call(breaker.wrap(_fail))
+        self.assertEqual(breaker.state, OPEN)
+
+        mock_monotonic.return_value = 131.0
+        succeed = breaker.wrap(lambda m: "ok")
+        self.assertEqual(succeed(None), "ok")
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertEqual(succeed(None), "ok")
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_failed_probe_reopens(self, mock_monotonic):
+        """Test a failing probe opens the breaker for another period"""
+        mock_monotonic.return_value = 100.0
+        breaker = self._breaker(min_calls=1)
+        fail = breaker.wrap(_fail)
+        self._call(fail)
+        mock_monotonic.return_value = 131.0
+        self._call(fail)
+        self.assertEqual(breaker.state, OPEN)
+        self.assertEqual(breaker._try_acquire(150.0), 11.0)
+
+    def test_paused_for(self, mock_monotonic):
+        """Test paused_for reports the wait without taking the probe"""
+        mock_monotonic.return_value = 100.0
+        breaker = self._breaker(min_calls=1)
+        self.assertIsNone(breaker.paused_for())
+        self._call(breaker.wrap(_fail))
+        self.assertEqual(breaker.paused_for(), 30.0)
+
+        mock_monotonic.return_value = 131.0
+        self.assertIsNone(breaker.paused_for())
+        self.assertIsNone(breaker.paused_for())
+        self.assertTrue(breaker.acquire())
+        self.assertEqual(breaker.paused_for(), 30)
+
+    def test_open_breaker_holds_calls(self, mock_monotonic):
+        """Test a call made while open waits instead of running"""
+        mock_monotonic.return_value = 100.0
+        breaker = self._breaker(min_calls=1)
+        self._call(breaker.wrap(_fail))
+        process = MagicMock(return_value="ok")
+        done = threading.Event()
+
+        def _worker():
+            breaker.wrap(process)(None)
+            done.set()
+
+        threading.Thread(target=_worker, daemon=True).start()
+        self.assertFalse(done.wait(0.1))
+        process.assert_not_called()
+
+        mock_monotonic.return_value = 131.0
+        with breaker._condition:
+            breaker._condition.notify_all()
+        self.assertTrue(done.wait(5))
+        process.assert_called_once_with(None)
+
+    def test_shutdown_requeues_held_delivery(self, mock_monotonic):
+        """Test a call held at shutdown hands its delivery back to the broker"""
+        mock_monotonic.return_value = 100.0
+        shutdown = MagicMock()
+        shutdown.requested = False
+        breaker = self._breaker(min_calls=1, shutdown=shutdown)
+        self._call(breaker.wrap(_fail))
+        shutdown.requested = True
+        delivery = MagicMock()
+        process = MagicMock()
+
+        with processing(delivery):
+            self.assertIsNone(breaker.wrap(process)(None))
+
+        process.assert_not_called()
+        delivery.nack.assert_called_once_with(requeue=True)
+
+    def test_wrap_async(self, mock_monotonic):
+        """Test async processors are guarded too"""
+        mock_monotonic.return_value = 100.0
+        breaker = self._breaker(min_calls=1)
+
+        async def _process(message):
+            raise RuntimeError("down")
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(breaker.wrap(_process)(None))
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_factory(self, mock_monotonic):
+        """Test get_circuit_breaker reads the config"""
+        config = Config()
+        self.assertIsNone(get_circuit_breaker(config, "TestProcessor"))
+        config.circuit_breaker_failure_ratio = 0.25
+        breaker = get_circuit_breaker(config, "TestProcessor")
+        self.assertEqual((breaker.failure_ratio, breaker.open_seconds), (0.25, 30.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -20,7 +20,9 @@ class TestConfigFactory(unittest.TestCase):
         self.config = Config()
 
     def _mock_env_var(self, env_dict):
-        """Helper to mock get_env_var method"""
+        """Helper to mock get_env_var method, optional variables are read from env_vars"""
+        self.config.env_vars = env_dict
+
         def get_env_var_side_effect(key):
             return env_dict.get(key)
         return get_env_var_side_effect
@@ -319,6 +321,32 @@ class TestConfigFactory(unittest.TestCase):
         result = self.config._validate_cron_config()
         self.assertTrue(result)
 
+    def test_validate_cron_config_hybrid(self):
+        """Test HYBRID execution needs a cron schedule too"""
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({'EXECUTION_TYPE': 'HYBRID'}))
+        self.assertFalse(self.config._validate_cron_config())
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({
+            'EXECUTION_TYPE': 'HYBRID',
+            'CRON_EXPRESSIONS': '0 * * * *'
+        }))
+        self.assertTrue(self.config._validate_cron_config())
+        self.assertEqual(self.config.cron_expressions, ['0 * * * *'])
+
+    def test_validate_hybrid_params(self):
+        """Test HYBRID execution takes one processor and no process pool"""
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({'EXECUTION_TYPE': 'HYBRID'}))
+        self.config.processor_types = ['TestProcessor']
+        self.config.execution_pool = 'thread'
+        self.assertTrue(self.config._validate_hybrid_params())
+
+        self.config.execution_pool = 'process'
+        self.assertFalse(self.config._validate_hybrid_params())
+
+        self.config.execution_pool = 'thread'
+        self.config.processor_types = ['TestProcessor', 'OtherProcessor']
+        self.assertFalse(self.config._validate_hybrid_params())
+
     def test_validate_cron_config_with_expressions(self):
         """Test cron validation with expressions"""
         env_vars = {
@@ -485,6 +513,24 @@ class TestConfigFactory(unittest.TestCase):
         self.assertTrue(result)
         self.assertEqual(self.config.processor_type, 'TestProcessor')
 
+    @patch('rococo.config.config.logger')
+    def test_validate_env_vars_unset_optional_vars_are_quiet(self, mock_logger):
+        """Test only the required variables are looked up with get_env_var's warning"""
+        self.config.env_vars = {
+            'EXECUTION_TYPE': 'MESSAGE',
+            'MESSAGING_TYPE': 'RabbitMqConnection',
+            'PROCESSOR_TYPE': 'TestProcessor',
+            'PROCESSOR_MODULE': 'test.module',
+            'RABBITMQ_HOST': 'localhost',
+            'RABBITMQ_PORT': '5672',
+            'RABBITMQ_USER': 'guest',
+            'RABBITMQ_PASSWORD': 'guest',
+            'RABBITMQ_VIRTUAL_HOST': '/',
+            'CONSUME_CONFIG_FILE_PATH': '/path/to/config'
+        }
+        self.assertTrue(self.config.validate_env_vars())
+        mock_logger.warning.assert_not_called()
+
     def test_validate_env_vars_invalid_messaging(self):
         """Test env vars validation with invalid messaging type"""
         env_vars = {
@@ -543,6 +589,390 @@ class TestConfigFactory(unittest.TestCase):
         self.assertFalse(result)
 
 
+    def test_setup_worker_params_thread_pool(self):
+        """Test more than one thread switches dispatch to the worker pool"""
+        env_vars = {
+            'WORKER_QUEUE_SIZE': '50'
+        }
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        self.config.num_threads = 8
+        result = self.config._setup_worker_params()
+        self.assertTrue(result)
+        self.assertEqual(self.config.execution_pool, 'thread')
+        self.assertEqual(self.config.worker_queue_size, 50)
+
+    def test_setup_worker_params_single_thread(self):
+        """Test a single thread keeps inline dispatch"""
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({}))
+        result = self.config._setup_worker_params()
+        self.assertTrue(result)
+        self.assertEqual(self.config.execution_pool, 'inline')
+        self.assertIsNone(self.config.worker_queue_size)
+
+    def test_setup_worker_params_invalid_queue_size(self):
+        """Test invalid WORKER_QUEUE_SIZE"""
+        env_vars = {
+            'WORKER_QUEUE_SIZE': 'lots'
+        }
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        result = self.config._setup_worker_params()
+        self.assertFalse(result)
+
+    def test_setup_worker_params_process_pool(self):
+        """Test EXECUTION_POOL=process with NUM_WORKERS"""
+        env_vars = {
+            'EXECUTION_POOL': 'Process',
+            'NUM_WORKERS': '6',
+            'ASYNC_CONCURRENCY': '250'
+        }
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        result = self.config._setup_worker_params()
+        self.assertTrue(result)
+        self.assertEqual(self.config.execution_pool, 'process')
+        self.assertEqual(self.config.num_threads, 6)
+        self.assertEqual(self.config.async_concurrency, 250)
+
+    def test_setup_worker_params_invalid_pool(self):
+        """Test invalid EXECUTION_POOL"""
+        env_vars = {
+            'EXECUTION_POOL': 'gpu'
+        }
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        result = self.config._setup_worker_params()
+        self.assertFalse(result)
+
+    def test_setup_worker_params_cron(self):
+        """Test execution pool settings are ignored for CRON"""
+        env_vars = {
+            'EXECUTION_TYPE': 'CRON',
+            'EXECUTION_POOL': 'process'
+        }
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        result = self.config._setup_worker_params()
+        self.assertTrue(result)
+        self.assertEqual(self.config.execution_pool, 'inline')
+
+    def test_setup_rabbitmq_params_prefetch_count(self):
+        """Test PREFETCH_COUNT is parsed for RabbitMQ"""
+        env_vars = {
+            'RABBITMQ_HOST': 'localhost',
+            'RABBITMQ_PORT': '5672',
+            'PREFETCH_COUNT': '64'
+        }
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        result = self.config._setup_rabbitmq_params()
+        self.assertTrue(result)
+        self.assertEqual(self.config.prefetch_count, 64)
+
+    def test_setup_rabbitmq_params_invalid_prefetch_count(self):
+        """Test non-numeric and zero PREFETCH_COUNT"""
+        for value in ['many', '0']:
+            env_vars = {
+                'RABBITMQ_HOST': 'localhost',
+                'RABBITMQ_PORT': '5672',
+                'PREFETCH_COUNT': value
+            }
+            self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+            self.assertFalse(self.config._setup_rabbitmq_params())
+
+    def test_setup_sqs_params_delivery_window(self):
+        """Test MAX_MESSAGES_PER_RECEIVE and WAIT_TIME_SECONDS for SQS"""
+        env_vars = {
+            'MAX_MESSAGES_PER_RECEIVE': '10',
+            'WAIT_TIME_SECONDS': '5'
+        }
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        result = self.config._setup_sqs_params()
+        self.assertTrue(result)
+        self.assertEqual(self.config.consume_params,
+                         {'max_messages_per_receive': 10, 'wait_time_seconds': 5})
+
+    def test_setup_sqs_params_delivery_window_out_of_range(self):
+        """Test SQS limits on MAX_MESSAGES_PER_RECEIVE and WAIT_TIME_SECONDS"""
+        for env_vars in [{'MAX_MESSAGES_PER_RECEIVE': '11'}, {'WAIT_TIME_SECONDS': '30'}]:
+            self.config = Config()
+            self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+            self.assertFalse(self.config._setup_sqs_params())
+
+    def test_setup_messaging_params_local_queue(self):
+        """Test messaging params setup for the local queue"""
+        env_vars = {
+            'EXECUTION_TYPE': 'MESSAGE',
+            'MESSAGING_TYPE': 'LocalQueueConnection',
+            'LOCAL_QUEUE_DIR': '/tmp/queues'
+        }
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        self.assertTrue(self.config._validate_messaging_and_execution_type())
+        result = self.config._setup_messaging_params()
+        self.assertTrue(result)
+        self.assertEqual(self.config.messaging_constructor_params, ('/tmp/queues', None))
+
+    def test_setup_metrics_params(self):
+        """Test METRICS_PORT enables metrics"""
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({'METRICS_PORT': '9100'}))
+        self.assertTrue(self.config._setup_metrics_params())
+        self.assertEqual(self.config.metrics_port, 9100)
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({'METRICS_PORT': 'x'}))
+        self.assertFalse(self.config._setup_metrics_params())
+
+    def test_setup_hooks_params(self):
+        """Test HOOKS_MODULE and the profiler settings"""
+        env_vars = {'HOOKS_MODULE': 'my_hooks', 'PROFILE_DIR': '/tmp/profiles',
+                    'PROFILE_SLOWEST_PERCENT': '5', 'PROFILE_SAMPLE_RATE': '0.1'}
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        self.assertTrue(self.config._setup_hooks_params())
+        self.assertEqual(self.config.hooks_module, 'my_hooks')
+        self.assertEqual(self.config.profile_dir, '/tmp/profiles')
+        self.assertEqual(self.config.profile_slowest_percent, 5.0)
+        self.assertEqual(self.config.profile_sample_rate, 0.1)
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({'PROFILE_SLOWEST_PERCENT': '0'}))
+        self.assertFalse(self.config._setup_hooks_params())
+
+    def test_setup_cron_job_params(self):
+        """Test CRON_MAX_INSTANCES, CRON_COALESCE and CRON_MISFIRE_GRACE_SECONDS"""
+        self.config.processor_type = 'TestProcessor'
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({'EXECUTION_TYPE': 'CRON'}))
+        self.assertTrue(self.config._setup_cron_job_params())
+        self.assertEqual(self.config.cron_max_instances, 1)
+        self.assertTrue(self.config.cron_coalesce)
+        self.assertIsNone(self.config.cron_misfire_grace_seconds)
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({
+            'EXECUTION_TYPE': 'CRON',
+            'CRON_MAX_INSTANCES': '2',
+            'TestProcessor_CRON_MAX_INSTANCES': '3',
+            'CRON_COALESCE': 'false',
+            'CRON_MISFIRE_GRACE_SECONDS': '30'
+        }))
+        self.assertTrue(self.config._setup_cron_job_params())
+        self.assertEqual(self.config.cron_max_instances, 3)
+        self.assertFalse(self.config.cron_coalesce)
+        self.assertEqual(self.config.cron_misfire_grace_seconds, 30.0)
+
+    def test_setup_cron_job_params_invalid(self):
+        """Test invalid cron job settings"""
+        for env_vars in [{'CRON_MAX_INSTANCES': '0'}, {'CRON_MAX_INSTANCES': 'many'},
+                         {'CRON_MISFIRE_GRACE_SECONDS': '-1'}]:
+            env_vars['EXECUTION_TYPE'] = 'CRON'
+            self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+            self.assertFalse(self.config._setup_cron_job_params())
+
+    def test_setup_cron_leader_params(self):
+        """Test CRON_LEADER_BACKEND enables leader election named after the processor"""
+        self.config.processor_type = 'TestProcessor'
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({'EXECUTION_TYPE': 'CRON'}))
+        self.assertTrue(self.config._setup_cron_leader_params())
+        self.assertIsNone(self.config.cron_leader_backend)
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({
+            'EXECUTION_TYPE': 'CRON',
+            'CRON_LEADER_BACKEND': 'SQLite',
+            'CRON_LEADER_TTL_SECONDS': '10'
+        }))
+        self.assertTrue(self.config._setup_cron_leader_params())
+        self.assertEqual(self.config.cron_leader_backend, 'sqlite')
+        self.assertEqual(self.config.cron_leader_name, 'TestProcessor')
+        self.assertEqual(self.config.cron_leader_ttl_seconds, 10.0)
+        self.assertIsNone(self.config.cron_shards)
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({
+            'EXECUTION_TYPE': 'CRON',
+            'CRON_LEADER_BACKEND': 'sqlite',
+            'CRON_SHARDS': '4'
+        }))
+        self.assertTrue(self.config._setup_cron_leader_params())
+        self.assertEqual(self.config.cron_shards, 4)
+
+    def test_setup_cron_leader_params_invalid(self):
+        """Test invalid leader election settings"""
+        for env_vars in [{'CRON_LEADER_BACKEND': 'redis'},
+                         {'CRON_LEADER_BACKEND': 'sqlite', 'CRON_LEADER_TTL_SECONDS': '0'},
+                         {'CRON_SHARDS': '4'},
+                         {'CRON_LEADER_BACKEND': 'sqlite', 'CRON_SHARDS': '0'}]:
+            env_vars['EXECUTION_TYPE'] = 'CRON'
+            self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+            self.assertFalse(self.config._setup_cron_leader_params())
+
+    def test_setup_shutdown_params(self):
+        """Test SHUTDOWN_GRACE_SECONDS enables draining on SIGTERM"""
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({}))
+        self.assertTrue(self.config._setup_shutdown_params())
+        self.assertIsNone(self.config.shutdown_grace_seconds)
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({'SHUTDOWN_GRACE_SECONDS': '25'}))
+        self.assertTrue(self.config._setup_shutdown_params())
+        self.assertEqual(self.config.shutdown_grace_seconds, 25.0)
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({'SHUTDOWN_GRACE_SECONDS': '-1'}))
+        self.assertFalse(self.config._setup_shutdown_params())
+
+    def test_setup_retry_params(self):
+        """Test retry settings, with per-processor overrides"""
+        self.config.processor_type = 'TestProcessor'
+        env_vars = {'RETRY_MAX_ATTEMPTS': '3', 'TestProcessor_RETRY_MAX_ATTEMPTS': '5',
+                    'RETRY_BASE_DELAY_MS': '200'}
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        self.assertTrue(self.config._setup_retry_params())
+        self.assertEqual(self.config.retry_max_attempts, 5)
+        self.assertEqual(self.config.retry_base_delay_ms, 200)
+        self.assertEqual(self.config.retry_max_delay_ms, 300000)
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({'RETRY_MAX_ATTEMPTS': '0'}))
+        self.assertFalse(self.config._setup_retry_params())
+
+        env_vars = {'RETRY_BASE_DELAY_MS': '5000', 'RETRY_MAX_DELAY_MS': '1000'}
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        self.assertFalse(self.config._setup_retry_params())
+
+    def test_setup_concurrency_params(self):
+        """Test CONCURRENCY_MAX switches to a thread pool sized to the upper bound"""
+        env_vars = {'CONCURRENCY_MIN': '2', 'CONCURRENCY_MAX': '16'}
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        self.assertTrue(self.config._setup_concurrency_params())
+        self.assertEqual((self.config.concurrency_min, self.config.concurrency_max), (2, 16))
+        self.assertEqual(self.config.num_threads, 16)
+        self.assertEqual(self.config.execution_pool, 'thread')
+
+        self.config = Config()
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({}))
+        self.assertTrue(self.config._setup_concurrency_params())
+        self.assertIsNone(self.config.concurrency_max)
+        self.assertEqual(self.config.execution_pool, 'inline')
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(
+            {'CONCURRENCY_MIN': '8', 'CONCURRENCY_MAX': '4'}))
+        self.assertFalse(self.config._setup_concurrency_params())
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(
+            {'CONCURRENCY_MAX': '4', 'EXECUTION_POOL': 'inline'}))
+        self.assertFalse(self.config._setup_concurrency_params())
+
+    def test_setup_rate_limit_params(self):
+        """Test RATE_LIMIT_PER_SECOND, its burst default and backend"""
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(
+            {'RATE_LIMIT_PER_SECOND': '0.5'}))
+        self.assertTrue(self.config._setup_rate_limit_params())
+        self.assertEqual(self.config.rate_limit_per_second, 0.5)
+        self.assertEqual(self.config.rate_limit_burst, 1.0)
+        self.assertEqual(self.config.rate_limit_backend, 'memory')
+
+        env_vars = {'RATE_LIMIT_PER_SECOND': '20', 'RATE_LIMIT_BURST': '50',
+                    'RATE_LIMIT_BACKEND': 'File', 'RATE_LIMIT_FILE': '/shared/bucket.json'}
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        self.assertTrue(self.config._setup_rate_limit_params())
+        self.assertEqual(self.config.rate_limit_burst, 50.0)
+        self.assertEqual(self.config.rate_limit_backend, 'file')
+        self.assertEqual(self.config.rate_limit_file, '/shared/bucket.json')
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(
+            {'RATE_LIMIT_PER_SECOND': '20', 'RATE_LIMIT_BACKEND': 'redis'}))
+        self.assertFalse(self.config._setup_rate_limit_params())
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(
+            {'RATE_LIMIT_PER_SECOND': '0'}))
+        self.assertFalse(self.config._setup_rate_limit_params())
+
+    def test_setup_circuit_breaker_params(self):
+        """Test the circuit breaker settings, with per-processor overrides"""
+        self.config.processor_type = 'TestProcessor'
+        env_vars = {'CIRCUIT_BREAKER_FAILURE_RATIO': '0.5',
+                    'TestProcessor_CIRCUIT_BREAKER_OPEN_SECONDS': '10'}
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        self.assertTrue(self.config._setup_circuit_breaker_params())
+        self.assertEqual(self.config.circuit_breaker_failure_ratio, 0.5)
+        self.assertEqual(self.config.circuit_breaker_open_seconds, 10.0)
+        self.assertEqual(self.config.circuit_breaker_min_calls, 10)
+        self.assertEqual(self.config.execution_pool, 'thread')
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(
+            {'CIRCUIT_BREAKER_FAILURE_RATIO': '1.5'}))
+        self.assertFalse(self.config._setup_circuit_breaker_params())
+
+        self.config.execution_pool = 'inline'
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(
+            {'CIRCUIT_BREAKER_FAILURE_RATIO': '0.5', 'EXECUTION_POOL': 'inline'}))
+        self.assertFalse(self.config._setup_circuit_breaker_params())
+
+    def test_setup_reload_params(self):
+        """Test RELOAD_ON_CHANGE also reloads on SIGHUP, and process pools can't reload"""
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(
+            {'RELOAD_ON_CHANGE': 'true', 'RELOAD_POLL_SECONDS': '0.5'}))
+        self.assertTrue(self.config._setup_reload_params())
+        self.assertTrue(self.config.reload_on_change)
+        self.assertTrue(self.config.reload_on_sighup)
+        self.assertEqual(self.config.reload_poll_seconds, 0.5)
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({'RELOAD_ON_SIGHUP': '1'}))
+        self.assertTrue(self.config._setup_reload_params())
+        self.assertFalse(self.config.reload_on_change)
+        self.assertTrue(self.config.reload_on_sighup)
+
+        self.config.execution_pool = 'process'
+        self.assertTrue(self.config._setup_reload_params())
+        self.assertFalse(self.config.reload_on_sighup)
+
+    def test_setup_dedup_params(self):
+        """Test DEDUP_STORE and DEDUP_KEY are validated"""
+        env_vars = {'DEDUP_STORE': 'SQLite', 'DEDUP_KEY': 'content', 'DEDUP_TTL_SECONDS': '600',
+                    'DEDUP_SQLITE_PATH': '/data/dedup.sqlite3'}
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        self.assertTrue(self.config._setup_dedup_params())
+        self.assertEqual(self.config.dedup_store, 'sqlite')
+        self.assertEqual(self.config.dedup_key, 'content')
+        self.assertEqual(self.config.dedup_ttl_seconds, 600.0)
+        self.assertEqual(self.config.dedup_sqlite_path, '/data/dedup.sqlite3')
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({'DEDUP_STORE': 'redis'}))
+        self.assertFalse(self.config._setup_dedup_params())
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var({'DEDUP_KEY': 'id'}))
+        self.assertFalse(self.config._setup_dedup_params())
+
+    def test_validate_env_vars_multiple_processors(self):
+        """Test a comma-separated PROCESSOR_TYPE with per-processor concurrency and weight"""
+        env_vars = {
+            'EXECUTION_TYPE': 'MESSAGE',
+            'MESSAGING_TYPE': 'LocalQueueConnection',
+            'PROCESSOR_TYPE': 'Orders, Emails',
+            'PROCESSOR_MODULE': 'test.module',
+            'NUM_WORKERS': '4',
+            'Orders_QUEUE_NAME': 'orders',
+            'Emails_QUEUE_NAME': 'emails',
+            'Orders_CONCURRENCY': '3',
+            'Orders_WEIGHT': '2',
+            'Orders_PRIORITY': '10',
+            'Emails_RETRY_MAX_ATTEMPTS': '5',
+            'QUEUE_SCHEDULING': 'Priority'
+        }
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(env_vars))
+        self.assertTrue(self.config.validate_env_vars())
+        self.assertEqual(self.config.processor_types, ['Orders', 'Emails'])
+        self.assertIsNone(self.config.processor_type)
+        self.assertEqual(self.config.queue_scheduling, 'priority')
+
+        orders = self.config.for_processor('Orders')
+        self.assertEqual(orders.processor_type, 'Orders')
+        self.assertEqual((orders.queue_concurrency, orders.queue_weight), (3, 2))
+        self.assertEqual(orders.queue_priority, 10)
+        self.assertIsNone(orders.retry_max_attempts)
+        emails = self.config.for_processor('Emails')
+        self.assertEqual((emails.queue_concurrency, emails.queue_weight), (4, 1))
+        self.assertEqual(emails.retry_max_attempts, 5)
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(
+            {**env_vars, 'Emails_WEIGHT': '0'}))
+        self.assertFalse(self.config.validate_env_vars())
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(
+            {**env_vars, 'Emails_QUEUE_NAME': None}))
+        self.assertFalse(self.config.validate_env_vars())
+
+        self.config.get_env_var = MagicMock(side_effect=self._mock_env_var(
+            {**env_vars, 'QUEUE_SCHEDULING': 'fifo'}))
+        self.assertFalse(self.config.validate_env_vars())
+
     def test_cron_expressions_none_value(self):
         """Test CRON_EXPRESSIONS as None causes AttributeError"""
         env_vars = {
@@ -0,0 +1,148 @@
+"""
+Unit tests for cron.py
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from cron import CronRunner
+
+
+class _SlowJob:
+    """Job that blocks until released and counts its runs"""
+
+    def __init__(self):
+        self.runs = 0
+        self.started = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.runs += 1
+        self.started.release()
+        self.release.wait(5)
+
+
+class TestCronRunner(unittest.TestCase):
+    """Test cases for CronRunner"""
+
+    def test_run_does_not_block_the_caller(self):
+        """Test a tick returns while the job is still running"""
+        job = _SlowJob()
+        runner = CronRunner(job)
+
+        runner()
+
+        self.assertTrue(job.started.acquire(timeout=5))
+        self.assertEqual(runner.running, 1)
+        job.release.set()
+        self.assertTrue(runner.shutdown(5))
+        self.assertEqual(runner.running, 0)
+
+    @patch('cron.logger')
+    def test_coalesces_ticks_while_running(self, mock_logger):
+        """Test ticks that come during a run collapse into one more run"""
+        job = _SlowJob()
+        runner = CronRunner(job)
+
+        runner()
+        job.started.acquire(timeout=5)
+        runner()
+        runner()
+        runner()
+        job.release.set()
+        self.assertTrue(job.started.acquire(timeout=5))
+
+        self.assertTrue(runner.shutdown(5))
+        self.assertEqual(job.runs, 2)
+        mock_logger.warning.assert_called()
+
+    @patch('cron.logger')
+    def test_queues_ticks_without_coalesce(self, mock_logger):
+        """Test up to max_instances ticks wait for their own run, and later ones are skipped"""
+        job = _SlowJob()
+        runner = CronRunner(job, max_instances=2, coalesce=False)
+
+        for _ in range(2):
+            runner()
+            job.started.acquire(timeout=5)
+        for _ in range(3):
+            runner()
+        job.release.set()
+        for _ in range(2):
+            self.assertTrue(job.started.acquire(timeout=5))
+
+        self.assertTrue(runner.shutdown(5))
+        self.assertEqual(job.runs, 4)
+        self.assertIn("skipping", mock_logger.warning.call_args.args[0])
+
+    @patch('cron.logger')
+    def test_skips_runs_past_misfire_grace(self, mock_logger):
+        """Test a waiting tick is dropped once it is later than the grace period"""
+        job = _SlowJob()
+        runner = CronRunner(job, misfire_grace_seconds=0.01)
+
+        runner()
+        job.started.acquire(timeout=5)
+        runner()
+        time.sleep(0.05)
+        job.release.set()
+        while runner.running:
+            time.sleep(0.01)
+
+        self.assertTrue(runner.shutdown(5))
+        self.assertEqual(job.runs, 1)
+        self.assertIn("late", mock_logger.warning.call_args.args[0])
+
+    def test_max_instances_overlap(self):
+        """Test up to max_instances runs overlap"""
+        job = _SlowJob()
+        runner = CronRunner(job, max_instances=2)
+
+        runner()
+        runner()
+
+        for _ in range(2):
+            self.assertTrue(job.started.acquire(timeout=5))
+        self.assertEqual(runner.running, 2)
+        job.release.set()
+        self.assertTrue(runner.shutdown(5))
+
+    @patch('cron.logger')
+    def test_failed_run_is_logged(self, mock_logger):
+        """Test an exception from the job is logged and the runner keeps going"""
+        calls = []
+
+        def _job():
+            calls.append(1)
+            raise RuntimeError("boom")
+
+        runner = CronRunner(_job)
+        runner()
+        self.assertTrue(runner.shutdown(5))
+
+        self.assertEqual(calls, [1])
+        mock_logger.exception.assert_called_once()
+
+    def test_shutdown_times_out_and_ignores_later_ticks(self):
+        """Test shutdown returns False while a run outlasts it, and later ticks are ignored"""
+        job = _SlowJob()
+        runner = CronRunner(job)
+
+        runner()
+        job.started.acquire(timeout=5)
+        self.assertFalse(runner.shutdown(0.05))
+        runner()
+        job.release.set()
+
+        self.assertTrue(runner.shutdown(5))
+        self.assertEqual(job.runs, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+"""
+Unit tests for dedup.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adapters import Delivery
+from dedup import Deduplicator, MemoryDedupStore, SqliteDedupStore, content_key
+from dispatch.context import processing
+from factories import get_deduplicator, Config
+
+
+class TestMemoryDedupStore(unittest.TestCase):
+    """Test cases for MemoryDedupStore"""
+
+    def test_ttl_expiry(self):
+        """Test keys are forgotten after the ttl"""
+        store = MemoryDedupStore(ttl=10)
+        with patch('dedup.time.monotonic', return_value=100):
+            store.add("a")
+            self.assertTrue(store.contains("a"))
+            self.assertFalse(store.contains("b"))
+        with patch('dedup.time.monotonic', return_value=111):
+            self.assertFalse(store.contains("a"))
+
+    def test_reserve_and_discard(self):
+        """Test a key is reserved only once until it is discarded"""
+        store = MemoryDedupStore(ttl=60)
+        self.assertTrue(store.reserve("a"))
+        self.assertFalse(store.reserve("a"))
+        store.discard("a")
+        self.assertTrue(store.reserve("a"))
+
+    def test_lru_eviction(self):
+        """Test the least recently seen key is evicted first"""
+        store = MemoryDedupStore(ttl=60, max_entries=2)
+        store.add("a")
+        store.add("b")
+        self.assertTrue(store.contains("a"))
+        store.add("c")
+        self.assertTrue(store.contains("a"))
+        self.assertFalse(store.contains("b"))
+        self.assertTrue(store.contains("c"))
+
+
+class TestSqliteDedupStore(unittest.TestCase):
+    """Test cases for SqliteDedupStore"""
+
+    def test_keys_persist_and_expire(self):
+        """Test keys are shared through the file and expire after the ttl"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "dedup", "seen.sqlite3")
+            with patch('dedup.time.time', return_value=1000):
+                SqliteDedupStore(path, ttl=10).add("a")
+                store = SqliteDedupStore(path, ttl=10)
+                self.assertTrue(store.contains("a"))
+                self.assertFalse(store.contains("b"))
+            with patch('dedup.time.time', return_value=1011):
+                self.assertFalse(store.contains("a"))
+
+    def test_reserve_is_shared_between_connections(self):
+        """Test only one of two connections to the file reserves a key, until it expires"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "seen.sqlite3")
+            first, second = SqliteDedupStore(path, ttl=10), SqliteDedupStore(path, ttl=10)
+            with patch('dedup.time.time', return_value=1000):
+                self.assertTrue(first.reserve("a"))
+                self.assertFalse(second.reserve("a"))
+            with patch('dedup.time.time', return_value=1011):
+                self.assertTrue(second.reserve("a"))
+            second.discard("a")
+            self.assertFalse(first.contains("a"))
+
+
+class TestDeduplicator(unittest.TestCase):
+    """Test cases for Deduplicator"""
+
+    def test_skips_seen_message_ids(self):
+        """Test a redelivered message id is processed only once"""
+        process = MagicMock(return_value="done")
+        wrapped = Deduplicator(MemoryDedupStore(60)).wrap(process)
+        for _ in range(2):
+            with processing(Delivery({"n": 1}, MagicMock(), MagicMock(),
+                                     queue_name="q", message_id="m1")):
+                wrapped({"n": 1})
+        process.assert_called_once_with({"n": 1})
+
+    def test_failed_messages_are_not_remembered(self):
+        """Test a message whose processing raised is processed again"""
+        process = MagicMock(side_effect=[RuntimeError("boom"), "done"])
+        wrapped = Deduplicator(MemoryDedupStore(60), key="content").wrap(process)
+        with self.assertRaises(RuntimeError):
+            wrapped({"n": 1})
+        wrapped({"n": 1})
+        wrapped({"n": 1})
+        self.assertEqual(process.call_count, 2)
+
+    def test_content_key_ignores_key_order(self):
+        """Test content hashes are computed on canonical JSON"""
+        self.assertEqual(content_key({"a": 1, "b": 2}), content_key({"b": 2, "a": 1}))
+        self.assertNotEqual(content_key({"a": 1}), content_key({"a": 2}))
+
+    @patch('dedup.logger')
+    def test_messages_without_id_are_not_deduplicated(self, mock_logger):
+        """Test identical messages without an id are all processed, with one warning"""
+        process = MagicMock()
+        wrapped = Deduplicator(MemoryDedupStore(60)).wrap(process)
+        for _ in range(2):
+            with processing(Delivery({"n": 1}, MagicMock(), MagicMock(), queue_name="q")):
+                wrapped({"n": 1})
+        wrapped({"n": 1})
+        self.assertEqual(process.call_count, 3)
+        mock_logger.warning.assert_called_once()
+
+    def test_concurrent_duplicates_run_once(self):
+        """Test a duplicate arriving while the first copy is processed is skipped"""
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def process(message):
+            calls.append(message)
+            started.set()
+            release.wait(5)
+
+        wrapped = Deduplicator(MemoryDedupStore(60), key="content").wrap(process)
+        first = threading.Thread(target=wrapped, args=({"n": 1},))
+        first.start()
+        self.assertTrue(started.wait(5))
+        wrapped({"n": 1})
+        release.set()
+        first.join(5)
+        self.assertEqual(calls, [{"n": 1}])
+
+    def test_async(self):
+        """Test async processors are deduplicated too"""
+        calls = []
+
+        async def process(message):
+            calls.append(message)
+
+        wrapped = Deduplicator(MemoryDedupStore(60), key="content").wrap(process)
+        self.assertTrue(asyncio.iscoroutinefunction(wrapped))
+        asyncio.run(wrapped({"n": 1}))
+        asyncio.run(wrapped({"n": 1}))
+        self.assertEqual(calls, [{"n": 1}])
+
+    def test_broken_store_does_not_block_processing(self):
+        """Test store errors are logged and the message is processed"""
+        store = MagicMock()
+        store.reserve.side_effect = OSError("disk full")
+        store.add.side_effect = OSError("disk full")
+        process = MagicMock()
+        Deduplicator(store, key="content").wrap(process)({"n": 1})
+        process.assert_called_once()
+
+
+class TestDedupFactory(unittest.TestCase):
+    """Test cases for get_deduplicator"""
+
+    def test_get_deduplicator(self):
+        """Test DEDUP_STORE selects the store"""
+        config = Config()
+        self.assertIsNone(get_deduplicator(config))
+        config.dedup_store = "memory"
+        config.dedup_key = "content"
+        deduplicator = get_deduplicator(config)
+        self.assertIsInstance(deduplicator.store, MemoryDedupStore)
+        self.assertEqual(deduplicator.key, "content")
+        with tempfile.TemporaryDirectory() as directory:
+            config.dedup_store = "sqlite"
+            config.dedup_sqlite_path = os.path.join(directory, "seen.sqlite3")
+            self.assertIsInstance(get_deduplicator(config).store, SqliteDedupStore)
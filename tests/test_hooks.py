@@ -0,0 +1,139 @@
+"""
+Unit tests for hooks.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adapters import Delivery
+from dispatch.context import processing
+from hooks import Hooks, SlowMessageProfiler
+from factories import get_hooks, get_profiler, Config
+
+
+class TestHooks(unittest.TestCase):
+    """Test cases for Hooks"""
+
+    def test_wrap_calls_pre_and_post(self):
+        """Test pre_process and post_process see the message, delivery and result"""
+        seen = []
+        hooks = Hooks("TestProcessor", pre_process=lambda c: seen.append(("pre", c.message, c.delivery)),
+                      post_process=lambda c: seen.append(("post", c.result, c.duration is not None)))
+        delivery = Delivery({"n": 1}, MagicMock(), MagicMock(), message_id="m1")
+        with processing(delivery):
+            result = hooks.wrap(lambda message: message["n"] + 1)({"n": 1})
+        self.assertEqual(result, 2)
+        self.assertEqual(seen, [("pre", {"n": 1}, delivery), ("post", 2, True)])
+
+    def test_wrap_calls_on_error_and_reraises(self):
+        """Test on_error receives the exception, which still reaches the caller"""
+        on_error = MagicMock()
+        post_process = MagicMock()
+        hooks = Hooks("TestProcessor", post_process=post_process, on_error=on_error)
+
+        def process(_message):
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            hooks.wrap(process)({})
+        self.assertIsInstance(on_error.call_args.args[0].exception, RuntimeError)
+        post_process.assert_not_called()
+
+    def test_failing_hook_does_not_break_processing(self):
+        """Test an exception in a hook is logged and swallowed"""
+        def pre_process(_context):
+            raise ValueError("bad hook")
+
+        hooks = Hooks("TestProcessor", pre_process=pre_process)
+        self.assertEqual(hooks.wrap(lambda: "done")(), "done")
+
+    def test_wrap_async(self):
+        """Test async processors stay coroutine functions"""
+        post_process = MagicMock()
+        hooks = Hooks("TestProcessor", post_process=post_process)
+
+        async def process(message):
+            return message
+
+        wrapped = hooks.wrap(process)
+        self.assertTrue(asyncio.iscoroutinefunction(wrapped))
+        self.assertEqual(asyncio.run(wrapped(5)), 5)
+        self.assertEqual(post_process.call_args.args[0].result, 5)
+
+    def test_from_module(self):
+        """Test hooks are read from module functions, missing ones are skipped"""
+        module = types.SimpleNamespace(pre_process=MagicMock())
+        hooks = Hooks.from_module(module, "TestProcessor")
+        self.assertIs(hooks.pre_process, module.pre_process)
+        self.assertIsNone(hooks.post_process)
+        self.assertIsNone(hooks.on_error)
+
+
+class TestSlowMessageProfiler(unittest.TestCase):
+    """Test cases for SlowMessageProfiler"""
+
+    def test_dumps_only_slowest(self):
+        """Test only invocations at or above the percentile threshold are written"""
+        clock = {"now": 0.0, "duration": 0.001}
+
+        def process():
+            clock["now"] += clock["duration"]
+
+        with tempfile.TemporaryDirectory() as directory, \
+                patch('hooks.time.monotonic', side_effect=lambda: clock["now"]):
+            wrapped = SlowMessageProfiler(directory, slowest_percent=1.0).wrap(process)
+            for _ in range(100):
+                wrapped()
+            self.assertIsNone(wrapped())
+            clock["duration"] = 0.5
+            wrapped()
+            clock["duration"] = 0.001
+            wrapped()
+            files = os.listdir(directory)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].endswith("-500ms.prof"))
+
+    def test_no_sampling(self):
+        """Test PROFILE_SAMPLE_RATE=0 times every message but never profiles"""
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = SlowMessageProfiler(directory, sample_rate=0)
+            wrapped = profiler.wrap(lambda: None)
+            for _ in range(150):
+                wrapped()
+            self.assertIsNotNone(profiler.threshold)
+            self.assertEqual(os.listdir(directory), [])
+
+
+class TestHooksFactory(unittest.TestCase):
+    """Test cases for get_hooks and get_profiler"""
+
+    def test_disabled_by_default(self):
+        """Test nothing is built without HOOKS_MODULE or PROFILE_DIR"""
+        config = Config()
+        self.assertIsNone(get_hooks(config))
+        self.assertIsNone(get_profiler(config))
+
+    def test_get_hooks_imports_module(self):
+        """Test HOOKS_MODULE is imported and its functions registered"""
+        module = types.ModuleType("custom_hooks")
+        module.on_error = MagicMock()
+        config = Config()
+        config.hooks_module = "custom_hooks"
+        config.processor_type = "TestProcessor"
+        with patch.dict(sys.modules, {"custom_hooks": module}):
+            hooks = get_hooks(config)
+        self.assertIs(hooks.on_error, module.on_error)
+        self.assertEqual(hooks.processor_name, "TestProcessor")
+
+    def test_get_hooks_missing_module(self):
+        """Test a HOOKS_MODULE that can't be imported disables hooks"""
+        config = Config()
+        config.hooks_module = "no_such_hooks_module"
+        self.assertIsNone(get_hooks(config))
@@ -0,0 +1,308 @@
+"""
+Unit tests for leader.py
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from leader import LeaderElection, ShardedElection, SqliteLeaseStore, _LeaseKeeper
+from factories import Config, get_leader_election
+
+
+class TestSqliteLeaseStore(unittest.TestCase):
+    """Test cases for SqliteLeaseStore"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "leases", "leader.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_only_one_holder(self):
+        """Test a lease is held by one holder until it expires or is released"""
+        first, second = SqliteLeaseStore(self.path), SqliteLeaseStore(self.path)
+
+        self.assertTrue(first.acquire("job", "a", 30))
+        self.assertFalse(second.acquire("job", "b", 30))
+        self.assertTrue(first.acquire("job", "a", 30))
+        self.assertTrue(second.acquire("other", "b", 30))
+
+        first.release("job", "a")
+        self.assertTrue(second.acquire("job", "b", 30))
+
+    @patch('leader.time.time')
+    def test_expired_lease_is_taken_over(self, mock_time):
+        """Test another holder takes a lease that wasn't renewed in time"""
+        store = SqliteLeaseStore(self.path)
+        mock_time.return_value = 1000.0
+        store.acquire("job", "a", 30)
+
+        mock_time.return_value = 1029.0
+        self.assertFalse(store.acquire("job", "b", 30))
+        mock_time.return_value = 1031.0
+        self.assertTrue(store.acquire("job", "b", 30))
+
+    def test_holders(self):
+        """Test holders lists the live leases under a prefix"""
+        store = SqliteLeaseStore(self.path)
+        store.acquire("job/members/a", "a", 30)
+        store.acquire("job/members/b", "b", 30)
+        store.acquire("job/members/c", "c", -1)
+        store.acquire("other/members/d", "d", 30)
+
+        self.assertEqual(sorted(store.holders("job/members/")), ["a", "b"])
+
+    def test_release_by_other_holder_is_ignored(self):
+        """Test only the holder can release its lease"""
+        store = SqliteLeaseStore(self.path)
+        store.acquire("job", "a", 30)
+
+        store.release("job", "b")
+
+        self.assertFalse(store.acquire("job", "b", 30))
+
+
+class TestLeaseKeeper(unittest.TestCase):
+    """Test cases for _LeaseKeeper"""
+
+    def test_incomplete_subclass_fails_at_construction(self):
+        """Test a subclass missing renew or _release can't be created"""
+        class _RenewOnly(_LeaseKeeper):
+            def renew(self):
+                pass
+
+        with self.assertRaises(TypeError):
+            _RenewOnly(MagicMock(), "job", 30)
+
+
+class TestLeaderElection(unittest.TestCase):
+    """Test cases for LeaderElection"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SqliteLeaseStore(os.path.join(self.directory.name, "leader.sqlite3"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @patch('leader.logger')
+    def test_one_leader_between_replicas(self, mock_logger):
+        """Test only one of two replicas runs the wrapped job, until it steps down"""
+        process = MagicMock()
+        first = LeaderElection(self.store, "job", 30, holder="a")
+        second = LeaderElection(self.store, "job", 30, holder="b")
+
+        with first, second:
+            first.wrap(process)("first")
+            second.wrap(process)("second")
+            self.assertTrue(first.is_leader)
+            self.assertFalse(second.is_leader)
+        process.assert_called_once_with("first")
+
+        # The leader released its lease on exit
+        with LeaderElection(self.store, "job", 30, holder="b") as replacement:
+            self.assertTrue(replacement.is_leader)
+
+    @patch('leader.logger')
+    def test_store_errors_lose_leadership(self, mock_logger):
+        """Test a replica that can't renew its lease stops leading"""
+        store = MagicMock()
+        election = LeaderElection(store, "job", 30)
+        election.renew()
+        self.assertTrue(election.is_leader)
+
+        store.acquire.side_effect = OSError("store unreachable")
+        election.renew()
+
+        self.assertFalse(election.is_leader)
+        mock_logger.exception.assert_called_once()
+        mock_logger.warning.assert_called_once()
+
+    @patch('leader.logger')
+    @patch('leader.time.monotonic')
+    def test_lease_lapses_without_renewal(self, mock_monotonic, mock_logger):
+        """Test leadership ends once the lease would have expired"""
+        mock_monotonic.return_value = 100.0
+        election = LeaderElection(MagicMock(), "job", 30)
+        election.renew()
+
+        mock_monotonic.return_value = 129.0
+        self.assertTrue(election.is_leader)
+        mock_monotonic.return_value = 130.0
+        self.assertFalse(election.is_leader)
+
+
+class TestShardedElection(unittest.TestCase):
+    """Test cases for ShardedElection"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = SqliteLeaseStore(os.path.join(self.directory.name, "leader.sqlite3"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _replicas(self, *holders):
+        return [ShardedElection(self.store, "job", 4, 30, holder=holder) for holder in holders]
+
+    @patch('leader.logger')
+    def test_shards_are_disjoint_and_rebalanced(self, mock_logger):
+        """Test live replicas split the shards between them, and take over a leaver's"""
+        first, second, third = self._replicas("a", "b", "c")
+        for replica in (first, second, third):
+            replica.renew()
+        # Replicas that joined later only see the others on their next renewal
+        for replica in (first, second, third):
+            replica.renew()
+
+        self.assertEqual(first.shards, [0, 3])
+        self.assertEqual(second.shards, [1])
+        self.assertEqual(third.shards, [2])
+
+        with third:
+            pass
+        # The survivors give up and pick up shards over two renewals
+        for _ in range(2):
+            first.renew()
+            second.renew()
+
+        self.assertEqual(first.shards, [0, 2])
+        self.assertEqual(second.shards, [1, 3])
+
+    @patch('leader.logger')
+    def test_shard_is_not_taken_while_held(self, mock_logger):
+        """Test a shard moving to a new member waits until its old holder releases it"""
+        first, second = self._replicas("b", "a")
+        first.renew()
+        self.assertEqual(first.shards, [0, 1, 2, 3])
+
+        second.renew()
+        self.assertEqual(second.shards, [])
+        first.renew()
+        second.renew()
+
+        self.assertEqual(first.shards, [1, 3])
+        self.assertEqual(second.shards, [0, 2])
+
+    @patch('leader.logger')
+    def test_wrap_runs_each_shard(self, mock_logger):
+        """Test the wrapped job runs once per shard held, even when one fails"""
+        process = MagicMock(side_effect=[RuntimeError("boom"), None])
+        replica, = self._replicas("a")
+        replica.total_shards = 2
+
+        with replica:
+            replica.wrap(process)()
+
+        process.assert_any_call(shard=0, total_shards=2)
+        process.assert_any_call(shard=1, total_shards=2)
+        mock_logger.exception.assert_called_once()
+        self.assertEqual(replica.shards, [])
+
+    @patch('leader.logger')
+    def test_run_takes_shards_freed_since_renewal(self, mock_logger):
+        """Test a shard busy at renewal is warned about, then run once its old holder lets go"""
+        process = MagicMock()
+        first, second = self._replicas("b", "a")
+        first.renew()
+        second.renew()
+
+        second.wrap(process)()
+        process.assert_not_called()
+        self.assertEqual(mock_logger.warning.call_args.args[1], [0, 2])
+
+        # The old holder lets go of shards 0 and 2 before the new one renews
+        first.renew()
+        second.wrap(process)()
+
+        self.assertEqual(sorted(call.kwargs['shard'] for call in process.call_args_list), [0, 2])
+        # They were only taken for the run
+        self.assertEqual(second.shards, [])
+        self.assertTrue(self.store.acquire("job/shards/0", "c", 30))
+
+    @patch('leader.logger')
+    def test_first_member_runs_orphaned_shards(self, mock_logger):
+        """Test the first member runs a shard whose lease nobody holds"""
+        first, second = self._replicas("a", "b")
+        for _ in range(2):
+            first.renew()
+            second.renew()
+        self.assertEqual(second.shards, [1, 3])
+        self.store.release("job/shards/3", "b")
+        process = MagicMock()
+
+        first.wrap(process)()
+
+        self.assertEqual([call.kwargs['shard'] for call in process.call_args_list], [0, 2, 3])
+        mock_logger.warning.assert_not_called()
+
+    @patch('leader.logger')
+    def test_store_errors_drop_shards(self, mock_logger):
+        """Test a replica that can't reach the store runs no shards"""
+        store = MagicMock()
+        store.holders.return_value = ["a"]
+        replica = ShardedElection(store, "job", 2, 30, holder="a")
+        replica.renew()
+        self.assertEqual(replica.shards, [0, 1])
+
+        store.holders.side_effect = OSError("store unreachable")
+        replica.renew()
+
+        self.assertEqual(replica.shards, [])
+
+
+class TestLeaderElectionFactory(unittest.TestCase):
+    """Test cases for get_leader_election"""
+
+    def test_disabled_by_default(self):
+        """Test there is no election without CRON_LEADER_BACKEND"""
+        self.assertIsNone(get_leader_election(Config()))
+
+    @patch('factories.leader_election_factory.logger')
+    def test_sqlite_backend(self, mock_logger):
+        """Test the sqlite backend uses CRON_LEADER_SQLITE_PATH"""
+        with tempfile.TemporaryDirectory() as directory:
+            config = Config()
+            config.cron_leader_backend = "sqlite"
+            config.cron_leader_name = "MyCron"
+            config.cron_leader_sqlite_path = os.path.join(directory, "leader.sqlite3")
+
+            election = get_leader_election(config)
+
+            self.assertIsInstance(election.store, SqliteLeaseStore)
+            self.assertEqual(election.name, "MyCron")
+            self.assertEqual(election.ttl, 30.0)
+
+    @patch('factories.leader_election_factory.logger')
+    def test_sharded(self, mock_logger):
+        """Test CRON_SHARDS returns a sharded election"""
+        config = Config()
+        config.cron_leader_backend = "unittest.mock.MagicMock"
+        config.cron_leader_name = "MyCron"
+        config.cron_shards = 8
+
+        election = get_leader_election(config)
+
+        self.assertIsInstance(election, ShardedElection)
+        self.assertEqual(election.total_shards, 8)
+
+    @patch('factories.leader_election_factory.logger')
+    def test_custom_backend(self, mock_logger):
+        """Test a dotted class path is built without arguments"""
+        config = Config()
+        config.cron_leader_backend = "unittest.mock.MagicMock"
+        config.cron_leader_name = "MyCron"
+
+        election = get_leader_election(config)
+
+        self.assertIsInstance(election.store, MagicMock)
+
+
+if __name__ == '__main__':
+    unittest.main()
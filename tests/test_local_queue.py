@@ -0,0 +1,207 @@
+"""
+Unit tests for adapters/local_queue.py
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adapters import LocalQueueConnection
+from adapters.local_queue import MemoryQueue, FileQueue
+from factories import Config, get_message_adapter
+from dispatch import SharedPool
+
+
+class TestMemoryQueue(unittest.TestCase):
+    """Test cases for MemoryQueue"""
+
+    def test_ack_and_redelivery(self):
+        """Test nacked messages come back first and flagged as redelivered"""
+        queue = MemoryQueue()
+        queue.put("a")
+        queue.put("b")
+
+        message_id, body, redelivered = queue.get(timeout=0)
+        self.assertEqual((body, redelivered), ("a", False))
+        queue.nack(message_id, requeue=True)
+
+        message_id, body, redelivered = queue.get(timeout=0)
+        self.assertEqual((body, redelivered), ("a", True))
+        queue.ack(message_id)
+
+        _, body, _ = queue.get(timeout=0)
+        self.assertEqual(body, "b")
+        self.assertIsNone(queue.get(timeout=0))
+
+    def test_nack_without_requeue_drops(self):
+        """Test nack(requeue=False) drops the message"""
+        queue = MemoryQueue()
+        queue.put("a")
+        message_id, _, _ = queue.get(timeout=0)
+        queue.nack(message_id, requeue=False)
+        self.assertEqual(len(queue), 0)
+
+
+class TestFileQueue(unittest.TestCase):
+    """Test cases for FileQueue"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def test_fifo_ack_and_redelivery(self):
+        """Test messages are claimed in order and nacks are redelivered"""
+        queue = FileQueue(self._tmp.name)
+        queue.put("first")
+        queue.put("second")
+
+        message_id, body, redelivered = queue.get(timeout=0)
+        self.assertEqual((body, redelivered), ("first", False))
+        queue.nack(message_id, requeue=True)
+
+        message_id, body, redelivered = queue.get(timeout=0)
+        self.assertEqual((body, redelivered), ("first", True))
+        queue.ack(message_id)
+
+        message_id, body, _ = queue.get(timeout=0)
+        self.assertEqual(body, "second")
+        queue.ack(message_id)
+        self.assertEqual(len(queue), 0)
+        self.assertIsNone(queue.get(timeout=0))
+
+    def _abandon(self, owner, body):
+        """Helper leaving body unacked in unacked/<owner>, returns the directory"""
+        abandoned_dir = os.path.join(self._tmp.name, "unacked", owner)
+        os.makedirs(abandoned_dir)
+        with open(os.path.join(abandoned_dir, "0001-x.json"), "w", encoding="UTF-8") as f:
+            json.dump({"body": body, "redelivered": False}, f)
+        with open(os.path.join(abandoned_dir, "0001-x.json.tmp"), "w", encoding="UTF-8") as f:
+            f.write("{")
+        return abandoned_dir
+
+    def test_recovers_messages_from_dead_consumer(self):
+        """Test messages left unacked by an exited process are redelivered"""
+        pid = subprocess.Popen([sys.executable, '-c', 'pass'])
+        pid.wait()
+        abandoned_dir = self._abandon(f"{socket.gethostname()}-{pid.pid}-0badc0de", "lost")
+
+        queue = FileQueue(self._tmp.name)
+
+        _, body, redelivered = queue.get(timeout=0)
+        self.assertEqual((body, redelivered), ("lost", True))
+        self.assertFalse(os.path.exists(abandoned_dir))
+
+    def test_recovers_messages_from_earlier_run_with_same_pid(self):
+        """Test a restarted process that got the same PID, as in a container, redelivers them"""
+        abandoned_dir = self._abandon(f"{socket.gethostname()}-{os.getpid()}-0badc0de", "lost")
+
+        queue = FileQueue(self._tmp.name)
+
+        _, body, _ = queue.get(timeout=0)
+        self.assertEqual(body, "lost")
+        self.assertFalse(os.path.exists(abandoned_dir))
+
+    def test_leaves_other_hosts_messages(self):
+        """Test messages held by a consumer on another host are left alone"""
+        abandoned_dir = self._abandon("other-host-1-0badc0de", "theirs")
+
+        queue = FileQueue(self._tmp.name)
+
+        self.assertIsNone(queue.get(timeout=0))
+        self.assertTrue(os.path.exists(abandoned_dir))
+
+
+class TestLocalQueueConnection(unittest.TestCase):
+    """Test cases for LocalQueueConnection"""
+
+    def _exit_when_finished(self, connection):
+        connection._read_consume_config = MagicMock(return_value={'EXIT_WHEN_FINISHED': '1'})
+
+    def test_publish_and_consume_in_memory(self):
+        """Test connections in the same process share in-memory queues"""
+        with LocalQueueConnection() as publisher:
+            for n in range(3):
+                publisher.send_message("test_memory_queue", {"n": n})
+
+        consumer = LocalQueueConnection()
+        self._exit_when_finished(consumer)
+        received = []
+        consumer.consume_messages("test_memory_queue", received.append)
+
+        self.assertEqual(received, [{"n": 0}, {"n": 1}, {"n": 2}])
+
+    def test_consume_deliveries_redelivers_nacked(self):
+        """Test a nacked delivery is consumed again"""
+        with tempfile.TemporaryDirectory() as queue_dir:
+            connection = LocalQueueConnection(queue_dir)
+            self._exit_when_finished(connection)
+            connection.send_message("jobs", {"job": 1})
+            seen = []
+
+            def _on_delivery(delivery):
+                seen.append((delivery.body, delivery.redelivered))
+                if delivery.redelivered:
+                    delivery.ack()
+                else:
+                    delivery.nack(requeue=True)
+
+            connection.consume_deliveries("jobs", _on_delivery, prefetch_count=2)
+
+        self.assertEqual(seen, [({"job": 1}, False), ({"job": 1}, True)])
+
+    def test_consume_queues_shares_one_pool(self):
+        """Test several queues are consumed together into the same pool"""
+        connection = LocalQueueConnection()
+        self._exit_when_finished(connection)
+        connection.send_message("test_orders_queue", {"order": 1})
+        connection.send_message("test_emails_queue", {"email": 1})
+        seen = []
+        pool = SharedPool(num_workers=2)
+        pool.add_queue("test_orders_queue", seen.append, capacity=2)
+        pool.add_queue("test_emails_queue", seen.append, capacity=1)
+
+        with pool:
+            connection.consume_queues([("test_orders_queue", pool.dispatch, 2),
+                                       ("test_emails_queue", pool.dispatch, 1)])
+
+        self.assertCountEqual(seen, [{"order": 1}, {"email": 1}])
+
+    def test_consume_messages_acks_failed_callback(self):
+        """Test a failing callback doesn't redeliver, matching the broker adapters"""
+        connection = LocalQueueConnection()
+        self._exit_when_finished(connection)
+        connection.send_message("test_failing_queue", {"n": 1})
+        callback = MagicMock(side_effect=RuntimeError("boom"))
+
+        connection.consume_messages("test_failing_queue", callback)
+
+        callback.assert_called_once_with({"n": 1})
+        self.assertEqual(len(connection.get_queue("test_failing_queue")), 0)
+
+    def test_factory_builds_local_queue_connection(self):
+        """Test get_message_adapter supports LocalQueueConnection"""
+        config = Config()
+        config.messaging_type = "LocalQueueConnection"
+        config.messaging_constructor_params = (None, None)
+        self.assertIsInstance(get_message_adapter(config), LocalQueueConnection)
+
+    def test_local_queue_loads_no_broker_client(self):
+        """Test the local adapter doesn't import rococo.messaging, pika or boto3"""
+        src_dir = os.path.join(os.path.dirname(__file__), '..', 'src')
+        loaded = subprocess.run(
+            [sys.executable, "-c",
+             "import sys; from adapters import LocalQueueConnection; "
+             "print(sorted(m for m in ('pika', 'boto3', 'rococo.messaging') if m in sys.modules))"],
+            cwd=src_dir, capture_output=True, text=True, check=True).stdout.strip()
+        self.assertEqual(loaded, "[]")
+
+
+if __name__ == '__main__':
+    unittest.main()
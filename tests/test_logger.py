@@ -2,14 +2,20 @@
 Unit tests for logger.py
 """
 import unittest
+from unittest.mock import patch, MagicMock
+import io
+import json
 import logging
+from logging.handlers import QueueHandler
 import sys
 import os
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from logger import Logger
+from logger import Logger, JsonFormatter, MessageContextFilter
+from adapters import Delivery
+from dispatch.context import processing
 
 
 class TestLogger(unittest.TestCase):
@@ -200,6 +206,116 @@ class TestLogger(unittest.TestCase):
         self.assertTrue(success_none)
 
 
+
+class TestLoggerConfiguration(unittest.TestCase):
+    """Test cases for env configured logging"""
+
+    def setUp(self):
+        """Reset the singleton and remember the root logger state"""
+        Logger._instance = None
+        self._root = logging.getLogger()
+        self._handlers = list(self._root.handlers)
+        self._level = self._root.level
+
+    def tearDown(self):
+        """Remove handlers added by the test and restore the root logger"""
+        if Logger._instance is not None:
+            Logger._instance.shutdown()
+        for handler in list(self._root.handlers):
+            if handler not in self._handlers:
+                self._root.removeHandler(handler)
+        self._root.setLevel(self._level)
+        Logger._instance = None
+
+    def _new_handler(self):
+        return [h for h in self._root.handlers if h not in self._handlers][0]
+
+    @patch.dict(os.environ, {"LOG_LEVEL": "warning"})
+    def test_level_from_env(self):
+        """Test LOG_LEVEL sets the root level"""
+        self.assertEqual(Logger().get_logger().level, logging.WARNING)
+
+    @patch.dict(os.environ, {"LOG_LEVEL": "chatty"})
+    def test_invalid_level_falls_back_to_info(self):
+        """Test an unknown LOG_LEVEL keeps INFO"""
+        self.assertEqual(Logger().get_logger().level, logging.INFO)
+
+    @patch.dict(os.environ, {"LOG_ASYNC": "true"})
+    def test_async_mode_uses_queue_handler(self):
+        """Test LOG_ASYNC attaches a QueueHandler and keeps the singleton"""
+        logger1 = Logger()
+        logger2 = Logger()
+        self.assertIs(logger1, logger2)
+        self.assertIsInstance(self._new_handler(), QueueHandler)
+        self.assertIsNotNone(logger1._listener)
+
+    @patch.dict(os.environ, {"LOG_ASYNC": "true", "LOG_FORMAT": "json"})
+    def test_async_json_output(self):
+        """Test records are written as JSON by the listener thread"""
+        logger = Logger()
+        output = io.StringIO()
+        logger._listener.handlers[0].stream = output
+
+        logger.get_logger().info("hello %s", "world")
+        logger.shutdown()
+
+        entry = json.loads(output.getvalue().strip().splitlines()[-1])
+        self.assertEqual(entry["message"], "hello world")
+        self.assertEqual(entry["level"], "INFO")
+
+
+class TestJsonFormatter(unittest.TestCase):
+    """Test cases for JsonFormatter"""
+
+    def test_format_includes_message_context(self):
+        """Test message id and exception are part of the JSON entry"""
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            record = logging.LogRecord("test", logging.ERROR, __file__, 1, "failed %s", ("x",),
+                                       sys.exc_info())
+        record.message_id = "abc"
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry["message"], "failed x")
+        self.assertEqual(entry["message_id"], "abc")
+        self.assertIn("ValueError", entry["exc_info"])
+
+
+class TestMessageContextFilter(unittest.TestCase):
+    """Test cases for MessageContextFilter"""
+
+    def _record(self, level):
+        return logging.LogRecord("test", level, __file__, 1, "message", (), None)
+
+    def test_records_outside_messages_are_kept(self):
+        """Test records logged outside message processing are never sampled out"""
+        self.assertTrue(MessageContextFilter(0).filter(self._record(logging.INFO)))
+
+    def test_sampling_keeps_warnings(self):
+        """Test sampled out messages still log warnings and errors"""
+        log_filter = MessageContextFilter(0)
+        delivery = Delivery({}, MagicMock(), MagicMock(), queue_name="q", message_id="m-1")
+        with processing(delivery):
+            info = self._record(logging.INFO)
+            self.assertFalse(log_filter.filter(info))
+            warning = self._record(logging.WARNING)
+            self.assertTrue(log_filter.filter(warning))
+        self.assertEqual(warning.message_id, "m-1")
+        self.assertEqual(warning.queue_name, "q")
+
+    def test_sampling_is_per_message(self):
+        """Test a message is either fully logged or not, at roughly sample_rate"""
+        log_filter = MessageContextFilter(0.5)
+        kept = 0
+        for n in range(1000):
+            delivery = Delivery({}, MagicMock(), MagicMock(), message_id=f"id-{n}")
+            with processing(delivery):
+                first = log_filter.filter(self._record(logging.INFO))
+                self.assertEqual(first, log_filter.filter(self._record(logging.DEBUG)))
+            kept += first
+        self.assertTrue(400 < kept < 600)
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,115 @@
+"""
+Unit tests for metrics.py
+"""
+import asyncio
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adapters import Delivery
+from dispatch.context import processing
+from metrics import Histogram, Metrics, MetricsServer
+
+
+class TestHistogram(unittest.TestCase):
+    """Test cases for Histogram"""
+
+    def test_render_cumulative_buckets(self):
+        """Test buckets are cumulative and end with +Inf"""
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in [0.05, 0.5, 5]:
+            histogram.observe(value)
+        lines = histogram.render("latency", {"processor": "P"})
+        self.assertIn('latency_bucket{processor="P",le="0.1"} 1', lines)
+        self.assertIn('latency_bucket{processor="P",le="1.0"} 2', lines)
+        self.assertIn('latency_bucket{processor="P",le="+Inf"} 3', lines)
+        self.assertIn('latency_count{processor="P"} 3', lines)
+
+
+class TestProcessorMetrics(unittest.TestCase):
+    """Test cases for ProcessorMetrics"""
+
+    def setUp(self):
+        self.metrics = Metrics()
+        self.processor_metrics = self.metrics.for_processor("TestProcessor", "queue")
+
+    def test_instrument_counts_success_and_failure(self):
+        """Test received, succeeded and failed counters"""
+        process = MagicMock(side_effect=[None, RuntimeError("boom")])
+        instrumented = self.processor_metrics.instrument(process)
+
+        instrumented({"n": 1})
+        with self.assertRaises(RuntimeError):
+            instrumented({"n": 2})
+
+        self.assertEqual(self.processor_metrics.received.value, 2)
+        self.assertEqual(self.processor_metrics.succeeded.value, 1)
+        self.assertEqual(self.processor_metrics.failed.value, 1)
+        self.assertEqual(self.processor_metrics.processing_seconds.count, 2)
+        self.assertGreaterEqual(self.processor_metrics.seconds_since_last_message(), 0)
+
+    def test_instrument_records_queue_wait(self):
+        """Test the wait of the delivery being processed is observed"""
+        instrumented = self.processor_metrics.instrument(MagicMock())
+        delivery = Delivery({}, MagicMock(), MagicMock())
+
+        with processing(delivery):
+            instrumented({})
+
+        self.assertEqual(self.processor_metrics.queue_wait_seconds.count, 1)
+
+    def test_instrument_async(self):
+        """Test coroutine functions stay coroutine functions"""
+        async def _process(message):
+            return message
+
+        instrumented = self.processor_metrics.instrument(_process)
+        self.assertTrue(asyncio.iscoroutinefunction(instrumented))
+        self.assertEqual(asyncio.run(instrumented({"n": 1})), {"n": 1})
+        self.assertEqual(self.processor_metrics.succeeded.value, 1)
+
+    def test_instrument_batch(self):
+        """Test per-message results are counted"""
+        instrumented = self.processor_metrics.instrument_batch(lambda messages: [True, False, 1])
+        instrumented([1, 2, 3])
+        self.assertEqual(self.processor_metrics.received.value, 3)
+        self.assertEqual(self.processor_metrics.succeeded.value, 2)
+        self.assertEqual(self.processor_metrics.failed.value, 1)
+
+    def test_render(self):
+        """Test the exposition contains every family with processor labels"""
+        self.processor_metrics.instrument(MagicMock())({})
+        page = self.metrics.render()
+        self.assertIn("# TYPE rococo_service_host_messages_received_total counter", page)
+        self.assertIn('rococo_service_host_messages_received_total'
+                      '{processor="TestProcessor",queue="queue"} 1', page)
+        self.assertIn("rococo_service_host_message_processing_seconds_bucket", page)
+        self.assertIn("rococo_service_host_seconds_since_last_message", page)
+
+
+class TestMetricsServer(unittest.TestCase):
+    """Test cases for MetricsServer"""
+
+    def test_serves_metrics(self):
+        """Test /metrics is served and other paths are not found"""
+        metrics = Metrics()
+        metrics.for_processor("TestProcessor", "queue")
+
+        with MetricsServer(metrics, 0, host="127.0.0.1") as server:
+            url = f"http://127.0.0.1:{server.port}"
+            with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+                page = response.read().decode()
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{url}/other", timeout=5)
+
+        self.assertIn("rococo_service_host_messages_received_total", page)
+
+
+if __name__ == '__main__':
+    unittest.main()
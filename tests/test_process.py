@@ -2,6 +2,7 @@
 Unit tests for process.py
 """
 import unittest
+import subprocess
 import sys
 import os
 
@@ -48,6 +49,18 @@ class TestProcess(unittest.TestCase):
         self.assertIn('from factories import Config', source)
 
 
+    def test_process_import_is_lazy(self):
+        """Test importing process.py loads no scheduler, broker client or optional feature"""
+        src_dir = os.path.join(os.path.dirname(__file__), '..', 'src')
+        loaded = subprocess.run(
+            [sys.executable, "-c",
+             "import sys, process; print(sorted(m for m in ('apscheduler', 'schedule', 'pika', "
+             "'boto3', 'rococo.messaging', 'http.server', 'sqlite3', 'multiprocessing', "
+             "'cProfile', 'asyncio') if m in sys.modules))"],
+            cwd=src_dir, capture_output=True, text=True, check=True).stdout.strip()
+        self.assertEqual(loaded, "[]")
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -2,16 +2,30 @@
 Unit tests for process.py main execution flow
 """
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, call
 import sys
 import os
 import signal
+import threading
 import runpy
 
 # Add src to path to allow imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from process import main
+from factories import Config
+from adapters import Delivery
+from startup import StartupProfile
+from leader import LeaderElection, ShardedElection
+
+
+def _mock_config():
+    """Returns a Config mock that carries the real default settings"""
+    mock_config = MagicMock()
+    for name, value in vars(Config()).items():
+        if name != "env_vars":
+            setattr(mock_config, name, value)
+    return mock_config
 
 class TestProcessMain(unittest.TestCase):
     """Test cases for process.py main()"""
@@ -23,7 +37,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_message_execution_rabbitmq(self, mock_logger, mock_get_adapter, mock_get_processor, mock_config_cls):
         """Test main execution with RabbitMQ message processor"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.side_effect = lambda key: {
@@ -51,6 +65,395 @@ class TestProcessMain(unittest.TestCase):
             callback_function=mock_processor.process
         )
 
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.WorkerPool')
+    @patch('process.logger')
+    def test_main_message_execution_thread_pool(self, mock_logger, mock_pool_cls, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test main execution dispatches to a worker pool when num_threads > 1"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "MESSAGE",
+            "MESSAGING_TYPE": "RabbitMqConnection",
+            "PROCESSOR_TYPE": "TestProcessor",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "TestProcessor_QUEUE_NAME": "queue"
+        }.get(key)
+        mock_config.messaging_type = "RabbitMqConnection"
+        mock_config.execution_pool = "thread"
+        mock_config.num_threads = 4
+        mock_config.worker_queue_size = None
+
+        mock_processor = MagicMock()
+        mock_get_processor.return_value = mock_processor
+
+        mock_adapter = MagicMock()
+        mock_get_adapter.return_value.__enter__.return_value = mock_adapter
+
+        mock_pool = mock_pool_cls.return_value
+        mock_pool.capacity = 8
+
+        # Execute
+        main()
+
+        # Verify
+        mock_pool_cls.assert_called_once_with(mock_processor.process, 4, None, shutdown=None, on_failure=None, limiter=None)
+        mock_adapter.consume_messages.assert_not_called()
+        mock_adapter.consume_deliveries.assert_called_once_with(
+            queue_name="prefix_queue",
+            on_delivery=mock_pool.dispatch,
+            prefetch_count=8
+        )
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.ProcessPool')
+    @patch('process.WorkerPool')
+    @patch('process.logger')
+    def test_main_message_execution_process_pool(self, mock_logger, mock_pool_cls, mock_process_pool_cls, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test main execution feeds the worker pool from a process pool"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "MESSAGE",
+            "MESSAGING_TYPE": "SqsConnection",
+            "PROCESSOR_TYPE": "TestProcessor",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "TestProcessor_QUEUE_NAME": "queue"
+        }.get(key)
+        mock_config.messaging_type = "SqsConnection"
+        mock_config.execution_pool = "process"
+        mock_config.num_threads = 3
+        mock_config.worker_queue_size = 2
+
+        mock_adapter = MagicMock()
+        mock_get_adapter.return_value.__enter__.return_value = mock_adapter
+        mock_process_pool = mock_process_pool_cls.return_value
+
+        # Execute
+        main()
+
+        # Verify the processor is only built inside the worker processes
+        mock_get_processor.assert_not_called()
+        self.assertEqual(mock_process_pool_cls.call_args.args[1], 3)
+        mock_pool_cls.assert_called_once_with(mock_process_pool.process, 3, 2, shutdown=None, on_failure=None, limiter=None)
+        mock_adapter.consume_deliveries.assert_called_once()
+        mock_process_pool.start.assert_called_once()
+        mock_process_pool.shutdown.assert_called_once_with(None)
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.AsyncPool')
+    @patch('process.logger')
+    def test_main_message_execution_async_processor(self, mock_logger, mock_async_pool_cls, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test an async process() is run on the event loop pool"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "MESSAGE",
+            "MESSAGING_TYPE": "RabbitMqConnection",
+            "PROCESSOR_TYPE": "TestProcessor",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "TestProcessor_QUEUE_NAME": "queue"
+        }.get(key)
+        mock_config.messaging_type = "RabbitMqConnection"
+        mock_config.async_concurrency = 200
+
+        class AsyncProcessor:  # pylint: disable=R0903
+            """Processor with a coroutine process()"""
+            async def process(self, message):
+                return message
+
+        processor = AsyncProcessor()
+        mock_get_processor.return_value = processor
+
+        mock_adapter = MagicMock()
+        mock_get_adapter.return_value.__enter__.return_value = mock_adapter
+        mock_pool = mock_async_pool_cls.return_value
+        mock_pool.capacity = 200
+
+        # Execute
+        main()
+
+        # Verify
+        mock_async_pool_cls.assert_called_once_with(processor.process, 200, on_failure=None)
+        mock_adapter.consume_deliveries.assert_called_once_with(
+            queue_name="prefix_queue",
+            on_delivery=mock_pool.dispatch,
+            prefetch_count=200
+        )
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.Batcher')
+    @patch('process.logger')
+    def test_main_message_execution_batch_processor(self, mock_logger, mock_batcher_cls, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test a processor with process_batch() is fed by the batcher"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "MESSAGE",
+            "MESSAGING_TYPE": "RabbitMqConnection",
+            "PROCESSOR_TYPE": "TestProcessor",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "TestProcessor_QUEUE_NAME": "queue"
+        }.get(key)
+        mock_config.messaging_type = "RabbitMqConnection"
+        mock_config.batch_size = 50
+        mock_config.batch_max_wait_ms = 200
+        mock_config.num_threads = 1
+
+        class BatchProcessor:
+            """Processor with a process_batch() hook"""
+            def process(self, message):
+                return message
+
+            def process_batch(self, messages):
+                return [True] * len(messages)
+
+        processor = BatchProcessor()
+        mock_get_processor.return_value = processor
+
+        mock_adapter = MagicMock()
+        mock_get_adapter.return_value.__enter__.return_value = mock_adapter
+        mock_batcher = mock_batcher_cls.return_value
+        mock_batcher.capacity = 100
+
+        # Execute
+        main()
+
+        # Verify
+        mock_batcher_cls.assert_called_once_with(processor.process_batch, 50, 200, 1, on_failure=None)
+        mock_adapter.consume_deliveries.assert_called_once_with(
+            queue_name="prefix_queue",
+            on_delivery=mock_batcher.dispatch,
+            prefetch_count=100
+        )
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.WorkerPool')
+    @patch('process.logger')
+    def test_main_prefetch_count_capped_to_pool(self, mock_logger, mock_pool_cls, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test PREFETCH_COUNT can't exceed what the worker pool holds"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "MESSAGE",
+            "PROCESSOR_TYPE": "TestProcessor",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "TestProcessor_QUEUE_NAME": "queue"
+        }.get(key)
+        mock_config.messaging_type = "RabbitMqConnection"
+        mock_config.execution_pool = "thread"
+        mock_config.num_threads = 4
+        mock_config.prefetch_count = 100
+
+        mock_adapter = MagicMock()
+        mock_get_adapter.return_value.__enter__.return_value = mock_adapter
+        mock_pool_cls.return_value.capacity = 8
+
+        # Execute
+        main()
+
+        # Verify
+        self.assertEqual(mock_adapter.consume_deliveries.call_args.kwargs['prefetch_count'], 8)
+        mock_logger.warning.assert_called()
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.logger')
+    def test_main_sqs_delivery_window_inline(self, mock_logger, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test SQS receive settings switch inline processing to consume_deliveries"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "MESSAGE",
+            "PROCESSOR_TYPE": "TestProcessor",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "TestProcessor_QUEUE_NAME": "queue"
+        }.get(key)
+        mock_config.messaging_type = "SqsConnection"
+        mock_config.consume_params = {"max_messages_per_receive": 10, "wait_time_seconds": 2}
+
+        mock_adapter = MagicMock()
+        mock_get_adapter.return_value.__enter__.return_value = mock_adapter
+
+        # Execute
+        main()
+
+        # Verify
+        mock_adapter.consume_messages.assert_not_called()
+        kwargs = mock_adapter.consume_deliveries.call_args.kwargs
+        self.assertEqual(kwargs['prefetch_count'], 10)
+        self.assertEqual(kwargs['max_messages_per_receive'], 10)
+        self.assertEqual(kwargs['wait_time_seconds'], 2)
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.WorkerPool')
+    @patch('process.logger')
+    def test_main_retry_policy(self, mock_logger, mock_pool_cls, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test RETRY_MAX_ATTEMPTS routes failures through a retry policy with a dead-letter queue"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        env_vars = {
+            "EXECUTION_TYPE": "MESSAGE",
+            "PROCESSOR_TYPE": "TestProcessor",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "TestProcessor_QUEUE_NAME": "queue"
+        }
+        mock_config.get_env_var.side_effect = env_vars.get
+        mock_config.messaging_type = "RabbitMqConnection"
+        mock_config.retry_max_attempts = 4
+        mock_pool_cls.return_value.capacity = 2
+        mock_adapter = MagicMock()
+        mock_get_adapter.return_value.__enter__.return_value = mock_adapter
+
+        main()
+
+        mock_adapter.consume_messages.assert_not_called()
+        # One worker, so the consumer thread stays free to service the connection
+        self.assertEqual(mock_pool_cls.call_args.args[1], 1)
+        policy = mock_pool_cls.call_args.kwargs['on_failure']
+        self.assertEqual(policy.max_attempts, 4)
+        self.assertEqual(policy.base_delay, 1)
+        self.assertEqual(policy.dead_letter_queue, "prefix_queue_dlq")
+
+        # An explicit dead-letter queue name gets the prefix too
+        env_vars["TestProcessor_DEAD_LETTER_QUEUE_NAME"] = "failed"
+        main()
+        self.assertEqual(mock_pool_cls.call_args.kwargs['on_failure'].dead_letter_queue,
+                         "prefix_failed")
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.get_deduplicator')
+    @patch('process.logger')
+    def test_main_dedup(self, mock_logger, mock_get_deduplicator, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test DEDUP_STORE puts the deduplicator in front of process"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "MESSAGE",
+            "PROCESSOR_TYPE": "TestProcessor",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "TestProcessor_QUEUE_NAME": "queue"
+        }.get(key)
+        mock_config.messaging_type = "RabbitMqConnection"
+        mock_adapter = MagicMock()
+        mock_get_adapter.return_value.__enter__.return_value = mock_adapter
+
+        main()
+
+        deduplicator = mock_get_deduplicator.return_value
+        deduplicator.wrap.assert_called_once_with(mock_get_processor.return_value.process)
+        mock_adapter.consume_messages.assert_called_once_with(
+            queue_name="prefix_queue", callback_function=deduplicator.wrap.return_value)
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.MetricsServer')
+    @patch('process.logger')
+    def test_main_message_execution_metrics(self, mock_logger, mock_server_cls, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test METRICS_PORT serves metrics and instruments the callback"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "MESSAGE",
+            "PROCESSOR_TYPE": "TestProcessor",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "TestProcessor_QUEUE_NAME": "queue"
+        }.get(key)
+        mock_config.messaging_type = "RabbitMqConnection"
+        mock_config.metrics_port = 9100
+
+        mock_processor = MagicMock()
+        mock_get_processor.return_value = mock_processor
+        mock_adapter = MagicMock()
+        mock_get_adapter.return_value.__enter__.return_value = mock_adapter
+
+        # Execute
+        main()
+
+        # Verify the instrumented callback still calls the processor
+        self.assertEqual(mock_server_cls.call_args.args[1], 9100)
+        mock_server_cls.return_value.__enter__.assert_called_once()
+        callback = mock_adapter.consume_messages.call_args.kwargs['callback_function']
+        self.assertIsNot(callback, mock_processor.process)
+        callback({"n": 1})
+        mock_processor.process.assert_called_once_with({"n": 1})
+        metrics = mock_server_cls.call_args.args[0]
+        self.assertEqual(metrics.for_processor("TestProcessor", "prefix_queue").received.value, 1)
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.logger')
+    def test_main_multiple_queues(self, mock_logger, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test several PROCESSOR_TYPEs share one connection and one worker pool"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.processor_types = ["Orders", "Emails"]
+        mock_config.num_threads = 2
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "MESSAGE",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "Orders_QUEUE_NAME": "orders",
+            "Emails_QUEUE_NAME": "emails"
+        }.get(key)
+
+        def _for_processor(processor_type):
+            processor_config = _mock_config()
+            processor_config.processor_type = processor_type
+            processor_config.queue_concurrency = 3 if processor_type == "Orders" else 1
+            processor_config.queue_weight = 2 if processor_type == "Orders" else 1
+            return processor_config
+        mock_config.for_processor.side_effect = _for_processor
+
+        processors = {"Orders": MagicMock(), "Emails": MagicMock()}
+        mock_get_processor.side_effect = lambda config: processors[config.processor_type]
+
+        acked = []
+        def _consume_queues(subscriptions, **_kwargs):
+            for queue_name, on_delivery, _prefetch in subscriptions:
+                on_delivery(Delivery({"queue": queue_name}, on_ack=lambda q=queue_name: acked.append(q),
+                                     on_nack=MagicMock(), queue_name=queue_name))
+        mock_adapter = MagicMock()
+        mock_adapter.consume_queues.side_effect = _consume_queues
+        mock_get_adapter.return_value.__enter__.return_value = mock_adapter
+
+        main()
+
+        mock_get_adapter.assert_called_once_with(mock_config)
+        subscriptions = mock_adapter.consume_queues.call_args[0][0]
+        self.assertEqual([(name, prefetch) for name, _, prefetch in subscriptions],
+                         [("prefix_orders", 3), ("prefix_emails", 1)])
+        processors["Orders"].process.assert_called_once_with({"queue": "prefix_orders"})
+        processors["Emails"].process.assert_called_once_with({"queue": "prefix_emails"})
+        self.assertEqual(sorted(acked), ["prefix_emails", "prefix_orders"])
+        mock_logger.error.assert_not_called()
+
     @patch('process.Config')
     @patch('process.get_service_processor')
     @patch('process.get_message_adapter')
@@ -58,7 +461,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_message_execution_invalid_messaging_type(self, mock_logger, mock_get_adapter, mock_get_processor, mock_config_cls):
         """Test main execution with invalid messaging type"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.side_effect = lambda key: {
@@ -81,7 +484,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_cron_expressions(self, mock_logger, mock_cron_trigger, mock_scheduler_cls, mock_get_processor, mock_config_cls):
         """Test main execution with CRON expressions"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.return_value = "CRON"
@@ -105,6 +508,289 @@ class TestProcessMain(unittest.TestCase):
         # Verify run at startup
         mock_processor.process.assert_called()
 
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_hooks')
+    @patch('process.BlockingScheduler')
+    @patch('process.CronTrigger')
+    @patch('process.logger')
+    def test_main_cron_expressions_hooks(self, mock_logger, mock_cron_trigger, mock_scheduler_cls, mock_get_hooks, mock_get_processor, mock_config_cls):
+        """Test HOOKS_MODULE hooks wrap the scheduled cron job"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.return_value = "CRON"
+        mock_config.cron_expressions = ["* * * * *"]
+        mock_config.run_at_startup = False
+        mock_processor = MagicMock()
+        mock_get_processor.return_value = mock_processor
+        mock_scheduler = mock_scheduler_cls.return_value
+        mock_scheduler.start.side_effect = lambda: mock_scheduler.add_job.call_args.args[0]()
+
+        # Execute
+        main()
+
+        # Verify the scheduled job runs the hooked process
+        mock_get_hooks.return_value.wrap.assert_called_once_with(mock_processor.process)
+        mock_get_hooks.return_value.wrap.return_value.assert_called_once_with()
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('startup.logger')
+    @patch('process.logger')
+    def test_main_startup_profile(self, mock_logger, mock_startup_logger, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test STARTUP_PROFILE logs each phase once the broker is connected"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.startup_profile = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "MESSAGE",
+            "PROCESSOR_TYPE": "TestProcessor",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "TestProcessor_QUEUE_NAME": "queue"
+        }.get(key)
+        mock_config.messaging_type = "RabbitMqConnection"
+
+        with patch('process._startup', StartupProfile()):
+            main()
+
+        mock_startup_logger.info.assert_called_once()
+        phases = mock_startup_logger.info.call_args.args[2]
+        for phase in ["toml", "validation", "processor", "connection"]:
+            self.assertIn(phase, phases)
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.ReloadWatcher')
+    @patch('process.logger')
+    def test_main_hot_reload(self, mock_logger, mock_watcher_cls, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test messages go through a reloadable processor watched for SIGHUP"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.reload_on_sighup = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "MESSAGE",
+            "PROCESSOR_TYPE": "TestProcessor",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "TestProcessor_QUEUE_NAME": "queue"
+        }.get(key)
+        mock_config.messaging_type = "RabbitMqConnection"
+        first, second = MagicMock(), MagicMock()
+        mock_get_processor.side_effect = [first, second]
+        mock_adapter = MagicMock()
+        mock_get_adapter.return_value.__enter__.return_value = mock_adapter
+
+        main()
+
+        reloadables = mock_watcher_cls.call_args.args[0]
+        mock_watcher_cls.return_value.__enter__.assert_called_once()
+        callback = mock_adapter.consume_messages.call_args.kwargs["callback_function"]
+        callback({"n": 1})
+        self.assertTrue(reloadables[0].reload())
+        callback({"n": 2})
+        first.process.assert_called_once_with({"n": 1})
+        second.process.assert_called_once_with({"n": 2})
+        mock_get_processor.assert_called_with(mock_config, reload=True)
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_rate_limiter')
+    @patch('process.BlockingScheduler')
+    @patch('process.CronTrigger')
+    @patch('process.logger')
+    def test_main_cron_expressions_rate_limit(self, mock_logger, mock_cron_trigger, mock_scheduler_cls, mock_get_rate_limiter, mock_get_processor, mock_config_cls):
+        """Test RATE_LIMIT_PER_SECOND paces the scheduled cron job"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.return_value = "CRON"
+        mock_config.cron_expressions = ["* * * * *"]
+        mock_processor = MagicMock()
+        mock_get_processor.return_value = mock_processor
+        mock_scheduler = mock_scheduler_cls.return_value
+        mock_scheduler.start.side_effect = lambda: mock_scheduler.add_job.call_args.args[0]()
+
+        main()
+
+        rate_limiter = mock_get_rate_limiter.return_value
+        rate_limiter.wrap.assert_called_once_with(mock_processor.process)
+        rate_limiter.wrap.return_value.assert_called_once_with()
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_leader_election')
+    @patch('process.BlockingScheduler')
+    @patch('process.CronTrigger')
+    @patch('process.logger')
+    def test_main_cron_expressions_leader(self, mock_logger, mock_cron_trigger, mock_scheduler_cls, mock_get_election, mock_get_processor, mock_config_cls):
+        """Test a replica that isn't the leader skips its scheduled runs"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.return_value = "CRON"
+        mock_config.cron_expressions = ["* * * * *"]
+        mock_config.run_at_startup = True
+        store = MagicMock()
+        store.acquire.return_value = False
+        mock_get_election.return_value = LeaderElection(store, "TestProcessor", 30)
+        mock_scheduler = mock_scheduler_cls.return_value
+        mock_scheduler.start.side_effect = lambda: mock_scheduler.add_job.call_args.args[0]()
+
+        main()
+
+        store.acquire.assert_called_with("TestProcessor", mock_get_election.return_value.holder, 30)
+        mock_get_processor.return_value.process.assert_not_called()
+        mock_logger.error.assert_not_called()
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_leader_election')
+    @patch('process.BlockingScheduler')
+    @patch('process.CronTrigger')
+    @patch('process.logger')
+    def test_main_cron_expressions_sharded(self, mock_logger, mock_cron_trigger, mock_scheduler_cls, mock_get_election, mock_get_processor, mock_config_cls):
+        """Test each scheduled run calls process once for every shard the replica holds"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.return_value = "CRON"
+        mock_config.cron_expressions = ["0 2 * * *"]
+        store = MagicMock()
+        store.holders.return_value = ["a", "b"]
+        mock_get_election.return_value = ShardedElection(store, "TestProcessor", 5, 30, holder="b")
+        mock_scheduler = mock_scheduler_cls.return_value
+        mock_scheduler.start.side_effect = lambda: mock_scheduler.add_job.call_args.args[0]()
+
+        main()
+
+        process = mock_get_processor.return_value.process
+        self.assertEqual(process.call_args_list,
+                         [call(shard=1, total_shards=5), call(shard=3, total_shards=5)])
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.schedule')
+    @patch('process.logger')
+    def test_main_hybrid_simple_cron(self, mock_logger, mock_schedule, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test HYBRID consumes messages while a background thread runs process_cron"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "HYBRID",
+            "PROCESSOR_TYPE": "TestProcessor",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "TestProcessor_QUEUE_NAME": "queue",
+            "CRON_TIME_UNIT": "minutes",
+            "CRON_TIME_AMOUNT": "5"
+        }.get(key)
+        mock_config.messaging_type = "RabbitMqConnection"
+        mock_config.run_at_startup = True
+        mock_schedule.idle_seconds.return_value = 3600
+        scheduler_waiting = threading.Event()
+        mock_schedule.run_pending.side_effect = scheduler_waiting.set
+
+        class HybridProcessor:
+            """Processor with a process_cron() hook"""
+            def __init__(self):
+                self.cron_threads = []
+
+            def process(self, message):
+                return message
+
+            def process_cron(self):
+                self.cron_threads.append(threading.current_thread())
+
+        processor = HybridProcessor()
+        mock_get_processor.return_value = processor
+        mock_adapter = MagicMock()
+        mock_get_adapter.return_value.__enter__.return_value = mock_adapter
+        mock_adapter.consume_messages.side_effect = lambda **kwargs: scheduler_waiting.wait(5)
+
+        main()
+
+        # The consumer ran on this thread, the cron job on the runner's
+        mock_adapter.consume_messages.assert_called_once_with(
+            queue_name="prefix_queue", callback_function=processor.process)
+        mock_schedule.every.return_value.minutes.do.assert_called_once()
+        self.assertEqual(len(processor.cron_threads), 1)
+        self.assertIsNot(processor.cron_threads[0], threading.current_thread())
+        mock_logger.error.assert_not_called()
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.BackgroundScheduler')
+    @patch('process.CronTrigger')
+    @patch('process.logger')
+    def test_main_hybrid_cron_expressions(self, mock_logger, mock_cron_trigger, mock_scheduler_cls, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test HYBRID starts a background scheduler and stops it once consuming ends"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "HYBRID",
+            "PROCESSOR_TYPE": "TestProcessor",
+            "QUEUE_NAME_PREFIX": "prefix_",
+            "TestProcessor_QUEUE_NAME": "queue"
+        }.get(key)
+        mock_config.messaging_type = "RabbitMqConnection"
+        mock_config.cron_expressions = ["*/5 * * * *"]
+
+        class HybridProcessor:
+            """Processor with a process_cron() hook"""
+            process = MagicMock()
+            process_cron = MagicMock()
+
+        mock_get_processor.return_value = HybridProcessor()
+        mock_scheduler = mock_scheduler_cls.return_value
+        mock_adapter = MagicMock()
+        mock_get_adapter.return_value.__enter__.return_value = mock_adapter
+        # A scheduled run while the consumer is running
+        mock_adapter.consume_messages.side_effect = (
+            lambda **kwargs: mock_scheduler.add_job.call_args.args[0]())
+
+        main()
+
+        mock_cron_trigger.from_crontab.assert_called_once_with("*/5 * * * *")
+        mock_scheduler.start.assert_called_once()
+        mock_scheduler.shutdown.assert_called_once_with(wait=False)
+        HybridProcessor.process_cron.assert_called_once_with()
+        HybridProcessor.process.assert_not_called()
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.get_message_adapter')
+    @patch('process.logger')
+    def test_main_hybrid_without_process_cron(self, mock_logger, mock_get_adapter, mock_get_processor, mock_config_cls):
+        """Test HYBRID refuses a processor without process_cron()"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "HYBRID",
+            "PROCESSOR_TYPE": "TestProcessor"
+        }.get(key)
+        mock_config.messaging_type = "RabbitMqConnection"
+
+        class MessageProcessor:
+            """Processor without a process_cron() hook"""
+            def process(self, message):
+                return message
+
+        mock_get_processor.return_value = MessageProcessor()
+
+        main()
+
+        mock_get_adapter.assert_not_called()
+        self.assertTrue(any("process_cron" in str(logged.args[0])
+                            for logged in mock_logger.error.call_args_list))
+
     @patch('process.Config')
     @patch('process.get_service_processor')
     @patch('process.schedule')
@@ -113,7 +799,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_simple_cron_seconds(self, mock_logger, mock_sleep, mock_schedule, mock_get_processor, mock_config_cls):
         """Test main execution with simple cron (seconds)"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.side_effect = lambda key: {
@@ -125,6 +811,7 @@ class TestProcessMain(unittest.TestCase):
         mock_config.run_at_startup = False
         
         # Break infinite loop
+        mock_schedule.idle_seconds.return_value = 30
         mock_sleep.side_effect = StopIteration
         
         # Execute
@@ -133,9 +820,73 @@ class TestProcessMain(unittest.TestCase):
         except StopIteration:
             pass
         
-        # Verify
+        # Verify it sleeps until the next run is due
         mock_schedule.every.assert_called_with(30.0)
         mock_schedule.every.return_value.seconds.do.assert_called()
+        mock_sleep.assert_called_once_with(30)
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.schedule')
+    @patch('process.sleep')
+    @patch('process.logger')
+    def test_main_simple_cron_sigterm(self, mock_logger, mock_sleep, mock_schedule, mock_get_processor, mock_config_cls):
+        """Test SIGTERM wakes the simple cron loop while it waits for the next run"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.side_effect = lambda key: {
+            "EXECUTION_TYPE": "CRON",
+            "CRON_TIME_UNIT": "seconds",
+            "CRON_TIME_AMOUNT": "30"
+        }.get(key)
+        mock_config.cron_expressions = []
+        mock_config.run_at_startup = False
+        mock_config.shutdown_grace_seconds = 5
+        mock_schedule.idle_seconds.return_value = 3600
+        mock_schedule.run_pending.side_effect = lambda: os.kill(os.getpid(), signal.SIGTERM)
+
+        # Execute, SIGTERM cuts the wait for the next run short
+        main()
+
+        mock_schedule.run_pending.assert_called_once()
+        mock_sleep.assert_not_called()
+        mock_logger.error.assert_not_called()
+
+    @patch('process.Config')
+    @patch('process.get_service_processor')
+    @patch('process.BlockingScheduler')
+    @patch('process.CronTrigger')
+    @patch('process.logger')
+    def test_main_cron_expressions_sigterm(self, mock_logger, mock_cron_trigger, mock_scheduler_cls, mock_get_processor, mock_config_cls):
+        """Test SIGTERM stops the scheduler and waits for the running job"""
+        mock_config = _mock_config()
+        mock_config_cls.return_value = mock_config
+        mock_config.validate_env_vars.return_value = True
+        mock_config.get_env_var.return_value = "CRON"
+        mock_config.cron_expressions = ["* * * * *"]
+        mock_config.run_at_startup = False
+        mock_config.shutdown_grace_seconds = 5
+        mock_scheduler = mock_scheduler_cls.return_value
+        entered = threading.Event()
+        stopped = threading.Event()
+        mock_scheduler.shutdown.side_effect = lambda wait: stopped.set()
+        mock_get_processor.return_value.process.side_effect = lambda: (entered.set(), stopped.wait(5))
+
+        def _start():
+            # A job is running when SIGTERM arrives and finishes during the grace period
+            threading.Thread(target=mock_scheduler.add_job.call_args.args[0]).start()
+            entered.wait(5)
+            os.kill(os.getpid(), signal.SIGTERM)
+            stopped.wait(5)
+
+        mock_scheduler.start.side_effect = _start
+
+        # Execute
+        main()
+
+        mock_scheduler.shutdown.assert_called_once_with(wait=False)
+        mock_get_processor.return_value.process.assert_called_once()
 
     @patch('process.Config')
     @patch('process.get_service_processor')
@@ -145,7 +896,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_simple_cron_days_run_at(self, mock_logger, mock_sleep, mock_schedule, mock_get_processor, mock_config_cls):
         """Test main execution with simple cron (days) and RUN_AT"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.side_effect = lambda key: {
@@ -157,6 +908,7 @@ class TestProcessMain(unittest.TestCase):
         mock_config.cron_expressions = []
         
         # Break infinite loop
+        mock_schedule.idle_seconds.return_value = 30
         mock_sleep.side_effect = StopIteration
         
         # Execute
@@ -175,7 +927,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_invalid_env_vars(self, mock_logger, mock_get_processor, mock_config_cls):
         """Test main execution with invalid env vars"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = False
         
@@ -191,7 +943,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_keyboard_interrupt(self, mock_config_cls):
         """Test main execution handling KeyboardInterrupt"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.side_effect = KeyboardInterrupt
         
@@ -206,7 +958,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_unsupported_cron_unit(self, mock_sleep, mock_schedule, mock_get_processor, mock_config_cls):
         """Test main execution with unsupported cron unit"""
          # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.side_effect = lambda key: {
@@ -229,7 +981,7 @@ class TestProcessMain(unittest.TestCase):
         units = ["minutes", "hours", "weeks"]
         
         for unit in units:
-            mock_config = MagicMock()
+            mock_config = _mock_config()
             mock_config_cls.return_value = mock_config
             mock_config.validate_env_vars.return_value = True
             mock_config.get_env_var.side_effect = lambda key, u=unit: {
@@ -240,6 +992,7 @@ class TestProcessMain(unittest.TestCase):
             }.get(key)
             mock_config.cron_expressions = []
             
+            mock_schedule.idle_seconds.return_value = 30
             mock_sleep.side_effect = StopIteration
             
             try:
@@ -256,7 +1009,7 @@ class TestProcessMain(unittest.TestCase):
     @patch('process.sleep')
     def test_main_simple_cron_days_no_run_at(self, mock_sleep, mock_schedule, mock_get_processor, mock_config_cls):
         """Test simple cron days without RUN_AT"""
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.side_effect = lambda key: {
@@ -267,6 +1020,7 @@ class TestProcessMain(unittest.TestCase):
         }.get(key)
         mock_config.cron_expressions = []
         
+        mock_schedule.idle_seconds.return_value = 30
         mock_sleep.side_effect = StopIteration
         
         try:
@@ -284,7 +1038,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_load_toml_exception(self, mock_logger, mock_get_adapter, mock_get_processor, mock_config_cls):
         """Test main execution when load_toml raises exception"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         
         # Simulate load_toml failing
@@ -346,7 +1100,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_message_execution_sqs(self, mock_logger, mock_get_adapter, mock_get_processor, mock_config_cls):
         """Test main execution with SQS message processor"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.side_effect = lambda key: {
@@ -380,7 +1134,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_processor_returns_none(self, mock_logger, mock_get_processor, mock_config_cls):
         """Test main execution when get_service_processor returns None"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.return_value = "CRON"
@@ -404,7 +1158,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_cron_time_amount_non_numeric(self, mock_logger, mock_sleep, mock_schedule, mock_get_processor, mock_config_cls):
         """Test main execution with non-numeric CRON_TIME_AMOUNT"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.side_effect = lambda key: {
@@ -428,7 +1182,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_cron_time_amount_negative(self, mock_logger, mock_sleep, mock_schedule, mock_get_processor, mock_config_cls):
         """Test main execution with negative CRON_TIME_AMOUNT"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.side_effect = lambda key: {
@@ -438,6 +1192,7 @@ class TestProcessMain(unittest.TestCase):
         }.get(key)
         mock_config.cron_expressions = []
 
+        mock_schedule.idle_seconds.return_value = 30
         mock_sleep.side_effect = StopIteration
 
         # Execute - negative values are technically valid floats
@@ -457,7 +1212,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_cron_time_amount_scientific(self, mock_logger, mock_sleep, mock_schedule, mock_get_processor, mock_config_cls):
         """Test main execution with scientific notation CRON_TIME_AMOUNT"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.side_effect = lambda key: {
@@ -467,6 +1222,7 @@ class TestProcessMain(unittest.TestCase):
         }.get(key)
         mock_config.cron_expressions = []
 
+        mock_schedule.idle_seconds.return_value = 30
         mock_sleep.side_effect = StopIteration
 
         # Execute
@@ -486,7 +1242,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_cron_run_at_invalid_format(self, mock_logger, mock_sleep, mock_schedule, mock_get_processor, mock_config_cls):
         """Test main execution with invalid CRON_RUN_AT format"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.side_effect = lambda key: {
@@ -515,7 +1271,7 @@ class TestProcessMain(unittest.TestCase):
     def test_main_multiple_cron_expressions(self, mock_logger, mock_cron_trigger, mock_scheduler_cls, mock_get_processor, mock_config_cls):
         """Test main execution with multiple cron expressions"""
         # Setup mocks
-        mock_config = MagicMock()
+        mock_config = _mock_config()
         mock_config_cls.return_value = mock_config
         mock_config.validate_env_vars.return_value = True
         mock_config.get_env_var.return_value = "CRON"
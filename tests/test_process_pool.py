@@ -0,0 +1,91 @@
+"""
+Unit tests for dispatch/process_pool.py
+"""
+import unittest
+import sys
+import os
+import tempfile
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dispatch import ProcessPool
+
+
+class PidProcessor:  # pylint: disable=R0903
+    """Processor that records which process handled the message in message["dir"]"""
+
+    def process(self, message):
+        with open(os.path.join(message["dir"], str(message["n"])), "w", encoding="UTF-8") as f:
+            f.write(str(os.getpid()))
+
+
+class LockProcessor:  # pylint: disable=R0903
+    """Processor returning a value that can't be pickled"""
+
+    def process(self, message):
+        return threading.Lock()
+
+
+class FailingProcessor:  # pylint: disable=R0903
+    """Processor that always raises"""
+
+    def process(self, message):
+        raise ValueError(f"bad message {message}")
+
+
+class DyingProcessor:  # pylint: disable=R0903
+    """Processor whose worker process dies on a "die" message"""
+
+    def process(self, message):
+        if message.get("die"):
+            os._exit(1)  # pylint: disable=W0212
+        return message["n"] * 2
+
+
+class TestProcessPool(unittest.TestCase):
+    """Test cases for ProcessPool"""
+
+    def test_process_runs_in_worker_process(self):
+        """Test messages are processed by forked workers"""
+        with tempfile.TemporaryDirectory() as directory:
+            with ProcessPool(PidProcessor, num_workers=2) as pool:
+                for n in range(4):
+                    pool.process({"dir": directory, "n": n})
+
+            self.assertEqual(sorted(os.listdir(directory)), ["0", "1", "2", "3"])
+            for name in os.listdir(directory):
+                with open(os.path.join(directory, name), encoding="UTF-8") as f:
+                    self.assertNotEqual(int(f.read()), os.getpid())
+
+    def test_process_ignores_return_value(self):
+        """Test a processor returning something that can't be pickled still succeeds"""
+        with ProcessPool(LockProcessor, num_workers=1) as pool:
+            self.assertIsNone(pool.process({"n": 1}))
+
+    def test_process_reraises_processor_errors(self):
+        """Test processor exceptions are raised in the parent"""
+        with ProcessPool(FailingProcessor, num_workers=1) as pool:
+            with self.assertRaises(ValueError):
+                pool.process({"n": 1})
+
+    @patch('dispatch.process_pool.logger')
+    def test_dead_worker_is_replaced(self, mock_logger):
+        """Test messages after a worker died are still processed"""
+        with ProcessPool(DyingProcessor, num_workers=2) as pool:
+            pool.process({"n": 1})
+            with self.assertRaises(BrokenProcessPool):
+                pool.process({"die": True})
+            for n in range(4):
+                pool.process({"n": n})
+            # The host has threads by now, so the new workers are not forked from it
+            self.assertNotEqual(pool._executor._mp_context.get_start_method(), "fork")
+
+        mock_logger.error.assert_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
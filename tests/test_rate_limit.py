@@ -0,0 +1,122 @@
+"""
+Unit tests for rate_limit.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from rate_limit import TokenBucket, FileTokenBucket, RateLimiter
+from factories import Config, get_rate_limiter
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test cases for TokenBucket"""
+
+    @patch('rate_limit.time.monotonic')
+    def test_burst_then_paced(self, mock_monotonic):
+        """Test a full bucket allows burst calls, then one per 1/rate seconds"""
+        mock_monotonic.return_value = 100.0
+        bucket = TokenBucket(rate=10, burst=3)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+        self.assertAlmostEqual(bucket.reserve(), 0.2)
+
+    @patch('rate_limit.time.monotonic')
+    def test_refills_up_to_burst(self, mock_monotonic):
+        """Test tokens come back over time but never above burst"""
+        mock_monotonic.return_value = 100.0
+        bucket = TokenBucket(rate=10, burst=2)
+        bucket.reserve(2)
+        mock_monotonic.return_value = 200.0
+        self.assertEqual(bucket.reserve(2), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1)
+
+
+class TestFileTokenBucket(unittest.TestCase):
+    """Test cases for FileTokenBucket"""
+
+    @patch('rate_limit.time.time')
+    def test_buckets_share_the_file(self, mock_time):
+        """Test two buckets on the same file draw from the same tokens"""
+        mock_time.return_value = 1000.0
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bucket.json")
+            first = FileTokenBucket(path, rate=5, burst=2)
+            second = FileTokenBucket(path, rate=5, burst=2)
+            self.assertEqual(first.reserve(), 0.0)
+            self.assertEqual(second.reserve(), 0.0)
+            self.assertAlmostEqual(first.reserve(), 0.2)
+            self.assertAlmostEqual(second.reserve(), 0.4)
+            mock_time.return_value = 1001.0
+            self.assertEqual(second.reserve(), 0.0)
+
+    def test_corrupt_file_starts_full(self):
+        """Test an unreadable state file is treated as a full bucket"""
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as state_file:
+            state_file.write("not json")
+        try:
+            self.assertEqual(FileTokenBucket(state_file.name, rate=1, burst=1).reserve(), 0.0)
+        finally:
+            os.remove(state_file.name)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for RateLimiter"""
+
+    @patch('rate_limit.time.sleep')
+    def test_wrap_waits_for_a_token(self, mock_sleep):
+        """Test a wrapped call sleeps for the wait its bucket asks for"""
+        bucket = MagicMock()
+        bucket.reserve.side_effect = [0.0, 0.25]
+        process = RateLimiter(bucket).wrap(MagicMock(return_value="done"))
+
+        self.assertEqual(process({"n": 1}), "done")
+        self.assertEqual(process({"n": 2}), "done")
+
+        mock_sleep.assert_called_once_with(0.25)
+
+    def test_wrap_batch_takes_a_token_per_message(self):
+        """Test a batch reserves one token per message"""
+        bucket = MagicMock()
+        bucket.reserve.return_value = 0.0
+        RateLimiter(bucket).wrap_batch(MagicMock())([1, 2, 3])
+        bucket.reserve.assert_called_once_with(3)
+
+    def test_wrap_async(self):
+        """Test async processors wait on the event loop"""
+        bucket = MagicMock()
+        bucket.reserve.return_value = 0.01
+
+        async def _process(message):
+            return message
+
+        process = RateLimiter(bucket).wrap(_process)
+        self.assertTrue(asyncio.iscoroutinefunction(process))
+        self.assertEqual(asyncio.run(process("m")), "m")
+
+    def test_factory(self):
+        """Test get_rate_limiter builds the configured backend"""
+        config = Config()
+        self.assertIsNone(get_rate_limiter(config))
+
+        config.rate_limit_per_second = 5.0
+        config.rate_limit_burst = 10.0
+        self.assertIsInstance(get_rate_limiter(config).bucket, TokenBucket)
+
+        config.rate_limit_backend = "rate_limit.TokenBucket"
+        self.assertEqual(get_rate_limiter(config).bucket.burst, 10.0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            config.rate_limit_backend = "file"
+            config.rate_limit_file = os.path.join(directory, "bucket.json")
+            self.assertIsInstance(get_rate_limiter(config).bucket, FileTokenBucket)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Unit tests for reload.py
+"""
+import os
+import signal
+import sys
+import tempfile
+import time
+import unittest
+import uuid
+from unittest.mock import MagicMock
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from reload import ReloadableProcessor, ReloadWatcher
+from factories import Config, get_service_processor
+
+PROCESSOR_SOURCE = """
+class ReloadedProcessor:
+    def process(self, message):
+        return {result!r}
+"""
+
+
+class TestHotReload(unittest.TestCase):
+    """Test cases for ReloadableProcessor and ReloadWatcher"""
+
+    def setUp(self):
+        self.module_dir = tempfile.TemporaryDirectory()
+        sys.path.insert(0, self.module_dir.name)
+        self.module_name = f"reloaded_processor_{uuid.uuid4().hex}"
+        self.module_path = os.path.join(self.module_dir.name, self.module_name + ".py")
+        self._writes = 0
+        self._write("v1")
+        self.config = Config()
+        self.config.processor_type = "ReloadedProcessor"
+        self.config.get_env_var = MagicMock(
+            side_effect=lambda key: self.module_name if key == "PROCESSOR_MODULE" else None)
+
+    def tearDown(self):
+        sys.path.remove(self.module_dir.name)
+        sys.modules.pop(self.module_name, None)
+        self.module_dir.cleanup()
+
+    def _write(self, result=None, source=None):
+        """Rewrites the processor module, each time with a later modification time"""
+        with open(self.module_path, "w", encoding="UTF-8") as module_file:
+            module_file.write(source or PROCESSOR_SOURCE.format(result=result))
+        # Whole seconds apart, so the import system doesn't reuse the cached bytecode
+        self._writes += 1
+        stamp = time.time_ns() + self._writes * 10**9
+        os.utime(self.module_path, ns=(stamp, stamp))
+
+    def _reloadable(self):
+        return ReloadableProcessor(get_service_processor(self.config),
+                                   lambda: get_service_processor(self.config, reload=True))
+
+    def test_reload_swaps_the_instance(self):
+        """Test process calls go to the new code after a reload"""
+        processor = self._reloadable()
+        process = processor.process
+        self.assertEqual(process({}), "v1")
+
+        self._write("v2")
+        self.assertTrue(processor.reload())
+
+        self.assertEqual(process({}), "v2")
+
+    def test_failed_reload_keeps_running_version(self):
+        """Test a module that no longer imports leaves the old instance in place"""
+        processor = self._reloadable()
+        self._write(source="class ReloadedProcessor(:\n")
+
+        self.assertFalse(processor.reload())
+
+        self.assertEqual(processor.process({}), "v1")
+
+    def test_watcher_reloads_changed_source(self):
+        """Test the watcher reloads once the source file's mtime changes"""
+        processor = self._reloadable()
+        with ReloadWatcher([processor], on_sighup=False, poll_seconds=0.05):
+            self._write("v2")
+            deadline = time.monotonic() + 5
+            while processor.process({}) != "v2" and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+        self.assertEqual(processor.process({}), "v2")
+
+    def test_sighup_reloads(self):
+        """Test SIGHUP reloads every processor and the old handler comes back"""
+        processor = self._reloadable()
+        previous_handler = signal.getsignal(signal.SIGHUP)
+        with ReloadWatcher([processor]):
+            self._write("v2")
+            os.kill(os.getpid(), signal.SIGHUP)
+            deadline = time.monotonic() + 5
+            while processor.process({}) != "v2" and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+        self.assertEqual(processor.process({}), "v2")
+        self.assertEqual(signal.getsignal(signal.SIGHUP), previous_handler)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Unit tests for retry and dead-lettering of failed messages
+"""
+import json
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pika
+from adapters import Delivery, HostRabbitMqConnection, HostSqsConnection, LocalQueueConnection
+from dispatch import WorkerPool, RetryPolicy
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Test cases for RetryPolicy"""
+
+    def test_backoff_grows_with_jitter_and_cap(self):
+        """Test delays double per attempt, keep at least half and stop at the cap"""
+        policy = RetryPolicy(5, base_delay=1, max_delay=10)
+        for attempt, full_delay in [(1, 1), (2, 2), (3, 4), (5, 10), (1000, 10)]:
+            delay = policy.backoff(attempt)
+            self.assertGreaterEqual(delay, full_delay / 2)
+            self.assertLessEqual(delay, full_delay)
+
+    def test_retries_then_dead_letters(self):
+        """Test a failure is retried until max_attempts, then dead-lettered"""
+        policy = RetryPolicy(3, base_delay=1, max_delay=10, dead_letter_queue="jobs_dlq")
+        delivery = MagicMock(attempt=2)
+        policy(delivery)
+        self.assertGreaterEqual(delivery.retry.call_args.args[0], 1)
+
+        delivery = MagicMock(attempt=3)
+        policy(delivery)
+        delivery.retry.assert_not_called()
+        delivery.dead_letter.assert_called_once_with("jobs_dlq")
+
+    def test_drops_without_dead_letter_queue(self):
+        """Test exhausted messages are rejected when there is no dead-letter queue"""
+        delivery = MagicMock(attempt=1)
+        RetryPolicy(1, 1, 1)(delivery)
+        delivery.nack.assert_called_once_with(requeue=False)
+
+
+class TestDeliveryRetry(unittest.TestCase):
+    """Test cases for Delivery.retry and Delivery.dead_letter"""
+
+    def test_fallbacks_without_adapter_support(self):
+        """Test retry requeues and dead_letter drops when the adapter can't do better"""
+        on_nack = MagicMock()
+        Delivery({}, MagicMock(), on_nack).retry(5)
+        on_nack.assert_called_once_with(True)
+
+        on_nack = MagicMock()
+        Delivery({}, MagicMock(), on_nack).dead_letter("dlq")
+        on_nack.assert_called_once_with(False)
+
+
+class TestAdapterRetry(unittest.TestCase):
+    """Test cases for delayed retries and dead-lettering in the adapters"""
+
+    def test_local_queue_retries_then_dead_letters(self):
+        """Test a poison message is delivered max_attempts times, then moved to the DLQ"""
+        with tempfile.TemporaryDirectory() as queue_dir:
+            connection = LocalQueueConnection(queue_dir)
+            connection._read_consume_config = MagicMock(return_value={'EXIT_WHEN_FINISHED': '1'})
+            connection.send_message("jobs", {"job": 1})
+            callback = MagicMock(side_effect=RuntimeError("poison"))
+            attempts = []
+            policy = RetryPolicy(3, base_delay=0.01, max_delay=0.01, dead_letter_queue="jobs_dlq")
+            pool = WorkerPool(callback, 1, on_failure=policy)
+
+            def _on_delivery(delivery):
+                attempts.append(delivery.attempt)
+                pool.dispatch(delivery)
+
+            with pool:
+                connection.consume_deliveries("jobs", _on_delivery)
+
+            self.assertEqual(attempts, [1, 2, 3])
+            self.assertEqual(len(connection.get_queue("jobs")), 0)
+            dead_letter_queue = connection.get_queue("jobs_dlq")
+            self.assertEqual(json.loads(dead_letter_queue.get(timeout=0)[1]), {"job": 1})
+
+    @patch('rococo.messaging.sqs.boto3')
+    def test_sqs_retry_uses_visibility_timeout(self, mock_boto3):
+        """Test SQS retries hide the message for the delay and dead-letters resend it"""
+        connection = HostSqsConnection('key', 'secret', 'us-east-1')
+        queue = MagicMock(url='https://sqs/queue')
+        connection._sqs.create_queue.return_value = queue
+        connection._sqs.meta.client.create_queue.side_effect = lambda QueueName: {
+            'QueueUrl': f'https://sqs/{QueueName}'}
+        connection._read_consume_config = MagicMock(return_value={'EXIT_WHEN_FINISHED': '1'})
+        first = MagicMock(body='{"n": 1}', receipt_handle='rh1', message_id='id-1',
+                          attributes={'ApproximateReceiveCount': '1'})
+        last = MagicMock(body='{"n": 2}', receipt_handle='rh2', message_id='id-2',
+                         attributes={'ApproximateReceiveCount': '4'})
+        queue.receive_messages.side_effect = [[first, last], []]
+        client = connection._sqs.meta.client
+        received = []
+
+        def _on_delivery(delivery):
+            received.append(delivery.attempt)
+            if delivery.attempt == 1:
+                delivery.retry(2.5)
+            else:
+                delivery.dead_letter('queue_dlq')
+
+        connection.consume_deliveries('queue', _on_delivery, prefetch_count=2)
+
+        self.assertEqual(received, [1, 4])
+        client.change_message_visibility.assert_called_once_with(
+            QueueUrl='https://sqs/queue', ReceiptHandle='rh1', VisibilityTimeout=3)
+        client.send_message.assert_called_once_with(QueueUrl='https://sqs/queue_dlq',
+                                                    MessageBody='{"n": 2}')
+        client.delete_message.assert_called_once_with(QueueUrl='https://sqs/queue',
+                                                      ReceiptHandle='rh2')
+
+    def test_rabbitmq_retry_republishes_to_delay_queue(self):
+        """Test RabbitMQ retries go through a TTL queue that expires back into the queue"""
+        connection = HostRabbitMqConnection('localhost', 5672, 'user', 'password', '/')
+        channel = MagicMock()
+        method = MagicMock(delivery_tag=5, redelivered=False)
+        properties = pika.BasicProperties(message_id='m1', headers={'x-attempt': 2})
+        channel.consume.return_value = iter([(method, properties, b'{"n": 1}'),
+                                             (None, None, None)])
+        connection._channel = channel
+        connection._connection = MagicMock()
+        connection._connection.add_callback_threadsafe.side_effect = lambda cb: cb()
+        connection._read_consume_config = MagicMock(return_value={'EXIT_WHEN_FINISHED': '1'})
+        received = []
+
+        def _on_delivery(delivery):
+            received.append(delivery.attempt)
+            delivery.retry(1.5)
+
+        connection.consume_deliveries('jobs', _on_delivery)
+
+        self.assertEqual(received, [2])
+        channel.queue_declare.assert_any_call(
+            queue='jobs.retry.2', durable=True,
+            arguments={'x-dead-letter-exchange': '', 'x-dead-letter-routing-key': 'jobs'})
+        publish = channel.basic_publish.call_args.kwargs
+        self.assertEqual(publish['routing_key'], 'jobs.retry.2')
+        self.assertEqual(publish['body'], b'{"n": 1}')
+        self.assertEqual(publish['properties'].expiration, '1500')
+        self.assertEqual(publish['properties'].headers, {'x-attempt': 3})
+        channel.basic_ack.assert_called_once_with(5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Unit tests for dispatch/scheduling.py
+"""
+import unittest
+from types import SimpleNamespace
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from dispatch import WeightedFair, StrictPriority
+
+
+def _state(name, weight=1, priority=0):
+    """Helper to build the queue state a policy schedules"""
+    return SimpleNamespace(name=name, weight=weight, priority=priority,
+                           virtual_time=0.0, cost_estimate=1.0)
+
+
+def _serve(policy, states, picks, durations):
+    """Picks and completes picks deliveries, all queues staying backlogged"""
+    served = []
+    for _ in range(picks):
+        state, charged = policy.pick(states)
+        policy.complete(state, durations[state.name], charged)
+        served.append(state.name)
+    return served
+
+
+class TestWeightedFair(unittest.TestCase):
+    """Test cases for WeightedFair"""
+
+    def test_shares_worker_time_by_weight(self):
+        """Test a queue with weight 3 gets three times the worker time"""
+        heavy, light = _state("heavy", weight=3), _state("light", weight=1)
+        served = _serve(WeightedFair(), [heavy, light], 400, {"heavy": 1.0, "light": 1.0})
+        self.assertAlmostEqual(served.count("heavy") / served.count("light"), 3, delta=0.2)
+
+    def test_slow_messages_get_fewer_turns(self):
+        """Test equal weights share time, not turns, when one queue is slower"""
+        slow, fast = _state("slow"), _state("fast")
+        served = _serve(WeightedFair(), [slow, fast], 400, {"slow": 4.0, "fast": 1.0})
+        self.assertAlmostEqual(served.count("fast") / served.count("slow"), 4, delta=0.3)
+
+    def test_idle_queue_does_not_bank_credit(self):
+        """Test a queue that was idle starts from the current virtual time"""
+        policy = WeightedFair()
+        busy, idle = _state("busy"), _state("idle")
+        _serve(policy, [busy], 50, {"busy": 1.0})
+
+        served = _serve(policy, [busy, idle], 10, {"busy": 1.0, "idle": 1.0})
+
+        self.assertLessEqual(served.count("idle"), 6)
+
+    def test_several_workers_spread_picks(self):
+        """Test picks before any completion still alternate between queues"""
+        policy = WeightedFair()
+        states = [_state("a"), _state("b")]
+        picked = [policy.pick(states)[0].name for _ in range(4)]
+        self.assertEqual(sorted(picked), ["a", "a", "b", "b"])
+
+
+class TestStrictPriority(unittest.TestCase):
+    """Test cases for StrictPriority"""
+
+    def test_higher_priority_always_first(self):
+        """Test a lower priority queue is never picked while a higher one has work"""
+        live, backfill = _state("live", priority=10), _state("backfill", weight=100)
+        served = _serve(StrictPriority(), [live, backfill], 50, {"live": 1.0, "backfill": 0.1})
+        self.assertEqual(set(served), {"live"})
+
+    def test_same_priority_is_weighted(self):
+        """Test queues sharing a priority are served by weight"""
+        a, b = _state("a", weight=2, priority=5), _state("b", priority=5)
+        served = _serve(StrictPriority(), [a, b, _state("low")], 300, {"a": 1.0, "b": 1.0, "low": 1.0})
+        self.assertNotIn("low", served)
+        self.assertAlmostEqual(served.count("a") / served.count("b"), 2, delta=0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
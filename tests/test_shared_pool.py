@@ -0,0 +1,137 @@
+"""
+Unit tests for dispatch/shared_pool.py
+"""
+import unittest
+from unittest.mock import patch, MagicMock
+import threading
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adapters import Delivery
+from dispatch import SharedPool, StrictPriority
+from circuit_breaker import CircuitBreaker
+
+
+class TestSharedPool(unittest.TestCase):
+    """Test cases for SharedPool"""
+
+    def test_capacity_is_the_sum_of_the_queues(self):
+        """Test the pool holds what every queue may hold"""
+        pool = SharedPool(num_workers=2)
+        pool.add_queue("a", MagicMock(), capacity=3)
+        pool.add_queue("b", MagicMock(), capacity=5)
+        self.assertEqual(pool.capacity, 8)
+
+    def test_dispatch_runs_the_queue_callback(self):
+        """Test each delivery is run by its own queue's callback and acked"""
+        callback_a, callback_b = MagicMock(), MagicMock()
+        pool = SharedPool(num_workers=2)
+        pool.add_queue("a", callback_a, capacity=2)
+        pool.add_queue("b", callback_b, capacity=2)
+        deliveries = [Delivery(1, MagicMock(), MagicMock(), queue_name="a"),
+                      Delivery(2, MagicMock(), MagicMock(), queue_name="b")]
+
+        with pool:
+            for delivery in deliveries:
+                pool.dispatch(delivery)
+
+        callback_a.assert_called_once_with(1)
+        callback_b.assert_called_once_with(2)
+        for delivery in deliveries:
+            delivery._on_ack.assert_called_once()
+
+    def test_strict_priority(self):
+        """Test the higher priority queue is drained before the lower one"""
+        order = []
+        pool = SharedPool(num_workers=1, policy=StrictPriority())
+        pool.add_queue("backfill", lambda body: order.append("backfill"), capacity=4, priority=0)
+        pool.add_queue("live", lambda body: order.append("live"), capacity=4, priority=10)
+        for n in range(3):
+            pool.dispatch(Delivery(n, MagicMock(), MagicMock(), queue_name="backfill"))
+            pool.dispatch(Delivery(n, MagicMock(), MagicMock(), queue_name="live"))
+
+        with pool:
+            pass
+
+        self.assertEqual(order, ["live"] * 3 + ["backfill"] * 3)
+
+    def test_failure_goes_to_the_queue_handler(self):
+        """Test a failed delivery is handed to its queue's on_failure"""
+        on_failure = MagicMock()
+        pool = SharedPool(num_workers=1)
+        pool.add_queue("a", MagicMock(side_effect=RuntimeError("boom")), capacity=1,
+                       on_failure=on_failure)
+        delivery = Delivery({}, MagicMock(), MagicMock(), queue_name="a")
+
+        with pool:
+            pool.dispatch(delivery)
+
+        on_failure.assert_called_once_with(delivery)
+        delivery._on_ack.assert_not_called()
+
+    def test_queued_deliveries_are_requeued_on_shutdown(self):
+        """Test deliveries still queued once a shutdown is requested are nacked back"""
+        shutdown = MagicMock()
+        shutdown.requested = False
+        started = threading.Event()
+        release = threading.Event()
+
+        def _callback(_body):
+            started.set()
+            release.wait(5)
+
+        pool = SharedPool(num_workers=1, shutdown=shutdown)
+        pool.add_queue("a", _callback, capacity=2)
+        running = Delivery(1, MagicMock(), MagicMock(), queue_name="a")
+        queued = Delivery(2, MagicMock(), MagicMock(), queue_name="a")
+        pool.start()
+        pool.dispatch(running)
+        self.assertTrue(started.wait(5))
+        pool.dispatch(queued)
+        shutdown.requested = True
+        release.set()
+        pool.shutdown()
+
+        running._on_ack.assert_called_once()
+        queued._on_nack.assert_called_once_with(True)
+
+    @patch('circuit_breaker.logger')
+    @patch('dispatch.shared_pool.logger')
+    def test_open_breaker_does_not_hold_workers(self, mock_pool_logger, mock_breaker_logger):
+        """Test queue B keeps flowing on every worker while queue A's breaker is open"""
+        shutdown = MagicMock()
+        shutdown.requested = False
+        breaker = CircuitBreaker("a", failure_ratio=1, min_calls=1, open_seconds=30,
+                                 shutdown=shutdown)
+        failing = MagicMock(side_effect=RuntimeError("downstream is down"))
+        done = threading.Semaphore(0)
+        pool = SharedPool(num_workers=2, shutdown=shutdown)
+        pool.add_queue("a", breaker.wrap(failing), capacity=4,
+                       on_failure=lambda delivery: done.release(), circuit_breaker=breaker)
+        pool.add_queue("b", lambda body: done.release(), capacity=4)
+        pool.start()
+        pool.dispatch(Delivery(0, MagicMock(), MagicMock(), queue_name="a"))
+        self.assertTrue(done.acquire(timeout=5))
+        self.assertFalse(breaker.closed)
+
+        held = [Delivery(n, MagicMock(), MagicMock(), queue_name="a") for n in range(3)]
+        flowing = [Delivery(n, MagicMock(), MagicMock(), queue_name="b") for n in range(8)]
+        for delivery in held + flowing:
+            pool.dispatch(delivery)
+        for _ in flowing:
+            self.assertTrue(done.acquire(timeout=5))
+        shutdown.requested = True
+        pool.shutdown(5)
+
+        failing.assert_called_once()
+        for delivery in flowing:
+            delivery._on_ack.assert_called_once()
+        for delivery in held:
+            delivery._on_nack.assert_called_once_with(True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Unit tests for graceful shutdown
+"""
+import os
+import signal
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+import sys
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adapters import LocalQueueConnection
+from dispatch import WorkerPool
+from shutdown import ShutdownCoordinator
+
+
+class TestShutdownCoordinator(unittest.TestCase):
+    """Test cases for ShutdownCoordinator"""
+
+    def test_sigterm_requests_shutdown(self):
+        """Test SIGTERM starts the grace period and runs callbacks off the handler"""
+        previous = signal.getsignal(signal.SIGTERM)
+        callback_threads = []
+        with ShutdownCoordinator(5) as shutdown:
+            shutdown.on_request(lambda: callback_threads.append(threading.current_thread()))
+            self.assertFalse(shutdown.requested)
+            self.assertEqual(shutdown.remaining(), 5)
+            os.kill(os.getpid(), signal.SIGTERM)
+            self.assertTrue(shutdown.wait(5))
+            self.assertLessEqual(shutdown.remaining(), 5)
+        self.assertEqual(len(callback_threads), 1)
+        self.assertIsNot(callback_threads[0], threading.main_thread())
+        self.assertIs(signal.getsignal(signal.SIGTERM), previous)
+
+    def test_remaining_runs_out(self):
+        """Test remaining() counts down from the first request"""
+        shutdown = ShutdownCoordinator(0.05)
+        shutdown.request()
+        time.sleep(0.1)
+        shutdown.request()
+        self.assertEqual(shutdown.remaining(), 0)
+
+
+class TestGracefulDrain(unittest.TestCase):
+    """Test cases for draining in-flight deliveries"""
+
+    def test_local_queue_drains_in_flight_and_requeues_backlog(self):
+        """Test the running message is acked and queued ones go back to the queue"""
+        queue_name = "test_shutdown_drain_queue"
+        connection = LocalQueueConnection()
+        for n in range(5):
+            connection.send_message(queue_name, {"n": n})
+
+        shutdown = ShutdownCoordinator(5)
+        started = threading.Event()
+        processed = []
+
+        def _process(message):
+            started.set()
+            time.sleep(0.2)
+            processed.append(message)
+
+        pool = WorkerPool(_process, 1, queue_size=4, shutdown=shutdown)
+        pool.start()
+        threading.Thread(target=lambda: started.wait(5) and shutdown.request()).start()
+        connection.consume_deliveries(queue_name, pool.dispatch, prefetch_count=pool.capacity,
+                                      shutdown=shutdown)
+        pool.shutdown(shutdown.remaining())
+
+        self.assertEqual(processed, [{"n": 0}])
+        queue = connection.get_queue(queue_name)
+        requeued = sorted(queue.get(timeout=0)[1] for _ in range(len(queue)))
+        self.assertEqual(requeued, ['{"n": 1}', '{"n": 2}', '{"n": 3}', '{"n": 4}'])
+
+    def test_worker_pool_shutdown_timeout(self):
+        """Test shutdown gives up on a stuck worker after the timeout"""
+        release = threading.Event()
+        pool = WorkerPool(lambda message: release.wait(5), 1)
+        pool.start()
+        pool.dispatch(MagicMock(body={}))
+        started_at = time.monotonic()
+        pool.shutdown(timeout=0.1)
+        self.assertLess(time.monotonic() - started_at, 1)
+        release.set()
@@ -0,0 +1,47 @@
+"""
+Unit tests for startup.py
+"""
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from startup import StartupProfile
+
+
+class TestStartupProfile(unittest.TestCase):
+    """Test cases for StartupProfile"""
+
+    @patch('startup.time.perf_counter')
+    @patch('startup.logger')
+    def test_report_logs_phases_once(self, mock_logger, mock_perf_counter):
+        """Test the breakdown lists every phase and is logged only once"""
+        mock_perf_counter.side_effect = [10.0, 10.25, 10.5]
+        profile = StartupProfile(started_at=9.8)
+        profile.enabled = True
+        profile.record("imports", 0.2)
+        with profile.phase("validation"):
+            pass
+
+        profile.report()
+        profile.report()
+
+        mock_logger.info.assert_called_once()
+        args = mock_logger.info.call_args.args
+        self.assertAlmostEqual(args[1], 700)
+        self.assertEqual(args[2], "imports 200 ms, validation 250 ms")
+
+    @patch('startup.logger')
+    def test_report_disabled(self, mock_logger):
+        """Test nothing is logged without STARTUP_PROFILE"""
+        profile = StartupProfile()
+        profile.record("imports", 0.2)
+        profile.report()
+        mock_logger.info.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
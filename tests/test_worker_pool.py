@@ -0,0 +1,112 @@
+"""
+Unit tests for dispatch/worker_pool.py
+"""
+import unittest
+from unittest.mock import MagicMock
+import threading
+import time
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from adapters import Delivery
+from dispatch import WorkerPool, AdaptiveLimiter
+
+
+class TestWorkerPool(unittest.TestCase):
+    """Test cases for WorkerPool"""
+
+    def test_capacity_defaults_to_twice_the_workers(self):
+        """Test queue size defaults to the number of workers"""
+        pool = WorkerPool(MagicMock(), num_workers=4)
+        self.assertEqual(pool.queue_size, 4)
+        self.assertEqual(pool.capacity, 8)
+
+    def test_capacity_with_queue_size(self):
+        """Test explicit queue size is added to the worker count"""
+        pool = WorkerPool(MagicMock(), num_workers=4, queue_size=10)
+        self.assertEqual(pool.capacity, 14)
+
+    def test_dispatch_processes_and_acks(self):
+        """Test every dispatched delivery is processed and acked"""
+        callback = MagicMock()
+        deliveries = [Delivery({"n": n}, MagicMock(), MagicMock()) for n in range(20)]
+
+        with WorkerPool(callback, num_workers=3) as pool:
+            for delivery in deliveries:
+                pool.dispatch(delivery)
+
+        self.assertEqual(callback.call_count, 20)
+        for delivery in deliveries:
+            delivery._on_ack.assert_called_once()
+
+    def test_ack_happens_after_callback(self):
+        """Test a delivery is not acked while its callback is still running"""
+        started = threading.Event()
+        release = threading.Event()
+
+        def _callback(_body):
+            started.set()
+            release.wait(5)
+
+        delivery = Delivery({}, MagicMock(), MagicMock())
+        with WorkerPool(_callback, num_workers=1) as pool:
+            pool.dispatch(delivery)
+            started.wait(5)
+            delivery._on_ack.assert_not_called()
+            release.set()
+
+        delivery._on_ack.assert_called_once()
+
+    def test_callbacks_run_concurrently(self):
+        """Test workers process deliveries in parallel"""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def _callback(_body):
+            barrier.wait()
+
+        deliveries = [Delivery({}, MagicMock(), MagicMock()) for _ in range(3)]
+        with WorkerPool(_callback, num_workers=3) as pool:
+            for delivery in deliveries:
+                pool.dispatch(delivery)
+
+        self.assertFalse(barrier.broken)
+        for delivery in deliveries:
+            delivery._on_ack.assert_called_once()
+
+    def test_failed_callback_is_still_acked(self):
+        """Test an exception in the processor is logged and the delivery acked"""
+        callback = MagicMock(side_effect=RuntimeError("boom"))
+        delivery = Delivery({}, MagicMock(), MagicMock())
+
+        with WorkerPool(callback, num_workers=1) as pool:
+            pool.dispatch(delivery)
+
+        delivery._on_ack.assert_called_once()
+
+
+    def test_limiter_bounds_running_workers(self):
+        """Test no more callbacks run at once than the limiter allows"""
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def _callback(_body):
+            with lock:
+                running[0] += 1
+                running[1] = max(running[1], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+
+        limiter = AdaptiveLimiter(2, 2)
+        with WorkerPool(_callback, num_workers=6, limiter=limiter) as pool:
+            for n in range(20):
+                pool.dispatch(Delivery({"n": n}, MagicMock(), MagicMock()))
+
+        self.assertEqual(running[1], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()